@@ -1,35 +1,42 @@
-from typing import Union
+from typing import Union, Optional
 
 
 class Card:
-    _expansions: list[str]
+    __slots__ = ("_expansions", "_name", "_amount", "_registry_id", "_hash")
+    _expansions: tuple[str, ...]
     _name: str
     _amount: int
+    _registry_id: Optional[int]
+    _hash: int
 
-    def __init__(self, expansions: Union[list[str], str], name: str, amount: int = 1):
+    def __init__(self, expansions: Union[list[str], str], name: str, amount: int = 1,
+                 registry_id: Optional[int] = None):
         if isinstance(expansions, str):
             expansions = [expansions]
-        self._expansions = expansions
-        self._expansions.sort()
+        self._expansions = tuple(sorted(expansions))
         self._name = name
         self._amount = amount
+        self._registry_id = registry_id
+        self._hash = hash((self._name, self._expansions))
 
     def __str__(self):
         return f"{', '.join(self._expansions)} // {self._name} x {self.amount}"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Card):
             return False
-        return self.name == other.name and self.expansions == other.expansions
+        return self._name == other._name and self._expansions == other._expansions
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        return hash(str(self))
+        return self._hash
 
     @property
-    def expansions(self) -> list[str]:
+    def expansions(self) -> tuple[str, ...]:
         return self._expansions
 
     @property
@@ -39,3 +46,8 @@ class Card:
     @property
     def amount(self) -> int:
         return self._amount
+
+    @property
+    def registry_id(self) -> Optional[int]:
+        """Dense id assigned by the Registry, None if the card was not interned"""
+        return self._registry_id
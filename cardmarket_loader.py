@@ -1,18 +1,41 @@
+import concurrent.futures
 import enum
 import logging
 import re
-from bs4 import BeautifulSoup
+import time
+import urllib.parse
 
 import requests
-from typing import Optional, List, Union
+import requests.adapters
+from typing import Optional, List, Union, Iterator, Tuple
 
 from card import Card
 from offer import Offer
-from seller import Seller
+from offer_filter import OfferFilter
+from registry import Registry
+from request_scheduler import RequestScheduler
+from response_cache import ResponseCache, CachedResponse
 from settings_loader import SearchSettings
 
 _base_url = "https://www.cardmarket.com/de/Magic/Products/Singles"
 
+# Default amount of pages loaded at the same time, which is also the size of the connection pool
+default_concurrency = 8
+# Times a request is repeated after a 429, a server error or a failed connection
+_max_retries = 4
+_retry_status = {429, 500, 502, 503, 504}
+
+_expansion_error = "Fehler: Ungültige Erweiterung"
+_product_error = "Ungültiges Produkt"
+_error_pattern = re.compile(f"class=\"alert-heading\">({_expansion_error}|{_product_error})</")
+_row_pattern = re.compile("<div id=\"(articleRow\\d+?)\" class=\"[^\"]+? article-row\">")
+_div_pattern = re.compile("<div\\b|</div>")
+_name_pattern = re.compile("<a href=\"/de/Magic/Users/([^\"]+?)\">")
+_count_pattern = re.compile("<span class=\"item-count small text-right\">(\\d+?)</span></div>")
+_price_pattern = re.compile("\">(\\d[\\d.]*,\\d+?) €</span>")
+# The offers of an expansion are split into pages sorted by price, further pages are requested with the site parameter
+_page_count_pattern = re.compile("<span class=\"mx-1\">Seite \\d+ von (\\d+)</span>")
+
 
 class DataLoadError(Exception):
     code: int
@@ -32,14 +55,109 @@ class ExpansionError(Exception):
     pass
 
 
+class _CardLoad:
+    """
+    State of a card whose pages are being loaded, with the parsed rows of every loaded page
+    """
+    card: Card
+    params: dict
+    pages: dict[tuple[str, int], list[tuple[str, Offer]]]
+    futures: dict[concurrent.futures.Future, tuple[str, int]]
+    error: Optional[Exception]
+
+    def __init__(self, card: Card, params: dict):
+        self.card = card
+        self.params = params
+        self.pages = {}
+        self.futures = {}
+        self.error = None
+
+    def offers(self) -> List[Offer]:
+        """
+        :return: The offers of all loaded pages by expansion and page, without rows appearing on multiple pages
+        """
+        offers = {}
+        for expansion in self.card.expansions:
+            for page in sorted([x for y, x in self.pages if y == expansion]):
+                for row_id, offer in self.pages[(expansion, page)]:
+                    if (expansion, row_id) not in offers:
+                        offers[(expansion, row_id)] = offer
+        return list(offers.values())
+
+    def last_pages(self) -> dict[str, int]:
+        """
+        Finds the pages after which only offers the OfferFilter removes can follow. Since the pages are sorted
+        by price, that is the case after a page whose most expensive offer exceeds the price limit of the card.
+
+        :return: The last needed page per expansion for which it is known
+        """
+        limit = OfferFilter.price_limit(sorted(self.offers(), key=lambda x: x.price), self.card.amount)
+        last_pages = {}
+        for expansion, page in sorted(self.pages):
+            rows = self.pages[(expansion, page)]
+            if expansion not in last_pages and (not rows or max([x.price for _, x in rows]) > limit):
+                last_pages[expansion] = page
+        return last_pages
+
+
 class CardmarketLoader:
     _logger: logging.Logger
     _settings: SearchSettings
+    _registry: Registry
+    _base_url: str
+    _session: requests.Session
+    _cache: Optional[ResponseCache]
+    _scheduler: RequestScheduler
+    _max_retries: int
+    _max_sellers: Optional[int]
 
-    def __init__(self, config: SearchSettings):
+    def __init__(self, config: SearchSettings, registry: Optional[Registry] = None, base_url: str = _base_url,
+                 max_concurrency: int = default_concurrency, cache: Optional[ResponseCache] = None,
+                 scheduler: Optional[RequestScheduler] = None, max_retries: int = _max_retries,
+                 max_sellers: Optional[int] = None):
         self._logger = logging.getLogger(self.__class__.__name__)
         self._logger.info(f"Creating CardmarketLoader")
         self._settings = config
+        self._registry = registry if registry is not None else Registry()
+        self._base_url = base_url
+        self._cache = cache
+        self._scheduler = scheduler if scheduler is not None else RequestScheduler(max_concurrency)
+        self._max_retries = max_retries
+        self._max_sellers = max_sellers
+        # All requests share the connections of one session, so they are kept alive between requests
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_concurrency))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def close(self):
+        self._session.close()
+
+    @property
+    def registry(self) -> Registry:
+        """Registry all loaded cards, sellers and offers are interned in"""
+        return self._registry
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """Cache the pages are loaded from and stored in, None if pages are always downloaded"""
+        return self._cache
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        """Scheduler deciding when requests are sent, with the current rate and the amount of retries"""
+        return self._scheduler
+
+    @property
+    def request_rate(self) -> float:
+        """Requests per second currently allowed for cardmarket"""
+        return self._scheduler.rate(urllib.parse.urlsplit(self._base_url).netloc)
 
     @staticmethod
     def _build_uri(base_uri: str, *args: str) -> str:
@@ -66,43 +184,158 @@ class CardmarketLoader:
             params["sellerCountry"] = self._format_param(self._settings.seller_country)
         return params
 
-    @staticmethod
-    def _check_for_errors(html: str, expansion: str) -> None:
+    def _parse_offers(self, data: str, card: Card, expansion: str) -> List[Offer]:
         """
-        Checks the html response for any displayed errors
-
-        :param html: HTML-Code to parse
-        :return: None
+        :return: The offers of all rows of the page that could be parsed
         :raises ExpansionError: If the website displays an expansion error
-        :raises ProductError: If the website raises a prodict error
+        :raises ProductError: If the website displays a product error
+        """
+        return [x for _, x in self._parse_rows(data, card, expansion)]
+
+    def _parse_rows(self, data: str, card: Card, expansion: str) -> List[Tuple[str, Offer]]:
         """
-        expansion_error = True if re.findall("class=\"alert-heading\">Fehler: Ungültige Erweiterung</", html) else False
-        if expansion_error:
-            raise ExpansionError(expansion)
+        Extracts all offers from the page of a card in a single pass.
+        Every article row ends at its matching closing div, or at the next row if it is never closed,
+        so the patterns for seller, count and price only search the row itself.
 
-        product_error = True if re.findall("class=\"alert-heading\">Ungültiges Produkt</", html) else False
-        if product_error:
+        :param data: HTML-Code to parse
+        :param card: The card the page belongs to
+        :param expansion: The expansion the page belongs to
+        :return: The offers of all rows that could be parsed, with the id of their row
+        :raises ExpansionError: If the website displays an expansion error
+        :raises ProductError: If the website displays a product error
+        """
+        error = _error_pattern.search(data)
+        if error is not None:
+            if error.group(1) == _expansion_error:
+                raise ExpansionError(expansion)
             raise ProductError(expansion)
 
-    def _parse_offers(self, data: str, card: Card, expansion: str) -> List[Offer]:
-        sellers = re.findall("<div id=\"(articleRow\\d+?)\" class=\".+? article-row\">",
-                             data)
+        card = self._registry.card(card)
         offers = []
-        for key in sellers:
-            seller_data = BeautifulSoup(data, 'html.parser').find('div', id=key)
-            str_data = str(seller_data)
-            try:
-                name = re.findall("<a href=\"/de/Magic/Users/(.+?)\">", str_data)
-                count = re.findall("<span class=\"item-count small text-right\">(\\d+?)</span></div>", str_data)
-                price = re.findall("\">(\\d+?,\\d+?) €</span>", str_data)
-                name = name[0]
-                count = int(count[0])
-                price = float(price[0].replace(",", "."))
-                offers.append(Offer(card, Seller(name, 1.15), count, price, expansion))
-            except (IndexError, ValueError) as err:
-                self._logger.error(err.args[0])
+        rows = list(_row_pattern.finditer(data))
+        for i, row in enumerate(rows):
+            row_end = self._find_row_end(data, row.end(), rows[i + 1].start() if i + 1 < len(rows) else len(data))
+            name = _name_pattern.search(data, row.end(), row_end)
+            count = _count_pattern.search(data, row.end(), row_end)
+            price = _price_pattern.search(data, row.end(), row_end)
+            if name is None or count is None or price is None:
+                self._logger.error(f"Could not parse {row.group(1)}")
+                continue
+            price = float(price.group(1).replace(".", "").replace(",", "."))
+            seller = self._registry.seller(name.group(1), 1.15)
+            offers.append((row.group(1), self._registry.offer(card, seller, int(count.group(1)), price, expansion)))
         return offers
 
+    @staticmethod
+    def _find_row_end(data: str, start: int, end: int) -> int:
+        """
+        :param data: HTML-Code to search
+        :param start: Position just after the opening div of the row
+        :param end: Position the row ends at in any case, where the next row starts
+        :return: The position after the closing div of the row, end if the row is not closed before
+        """
+        depth = 1
+        for tag in _div_pattern.finditer(data, start, end):
+            if tag.group() == "</div>":
+                depth -= 1
+                if depth == 0:
+                    return tag.end()
+            else:
+                depth += 1
+        return end
+
+    @staticmethod
+    def _page_count(data: str) -> int:
+        """
+        :return: The amount of pages the offers of the expansion are split into
+        """
+        match = _page_count_pattern.search(data)
+        return int(match.group(1)) if match is not None else 1
+
+    def _get_page(self, uri: str, params: dict) -> str:
+        """
+        Downloads a page, or takes it from the cache if the cached page is fresh or the server confirms
+        it to be unchanged
+
+        :param uri: URI of the page
+        :param params: Query parameters of the page
+        :return: The HTML of the page
+        :raises DataLoadError: If loading the data fails for any reason
+        """
+        cached = self._cache.get(uri, params) if self._cache is not None else None
+        if cached is not None and self._cache.is_fresh(cached):
+            return cached.text
+
+        headers = cached.validators() if cached is not None else {}
+        resp = self._request(uri, params, headers)
+        if resp.status_code == 304 and cached is not None:
+            self._cache.revalidated(uri, params, cached)
+            return cached.text
+        if not resp.status_code == 200:
+            raise DataLoadError(resp.status_code)
+        if self._cache is not None:
+            self._cache.store(uri, params, CachedResponse(resp.text, resp.headers.get("ETag"),
+                                                          resp.headers.get("Last-Modified")))
+        return resp.text
+
+    def _request(self, uri: str, params: dict, headers: dict) -> requests.Response:
+        """
+        Sends a request when the scheduler allows it, repeating it after 429, server errors and failed connections
+
+        :return: The response of the last attempt, if it was no 429 or server error
+        :raises DataLoadError: If the request still fails after all retries
+        """
+        host = urllib.parse.urlsplit(uri).netloc
+        for attempt in range(self._max_retries + 1):
+            retry_after = None
+            self._scheduler.acquire(host)
+            try:
+                resp = self._session.get(uri, params=params, headers=headers)
+            except requests.RequestException as err:
+                self._scheduler.release(host, None)
+                error = DataLoadError(0, f"Request for '{uri}' failed: {err}")
+            else:
+                retry_after = self._scheduler.parse_retry_after(resp.headers.get("Retry-After"))
+                self._scheduler.release(host, resp.status_code, retry_after)
+                if resp.status_code not in _retry_status:
+                    return resp
+                error = DataLoadError(resp.status_code)
+            if attempt < self._max_retries:
+                delay = self._scheduler.retry_delay(attempt, retry_after)
+                self._logger.debug(f"Retrying '{uri}' in {round(delay, 2)}s after: {error}")
+                time.sleep(delay)
+        raise error
+
+    def _submit_page(self, executor: concurrent.futures.Executor, load: _CardLoad, expansion: str, page: int) \
+            -> concurrent.futures.Future:
+        params = load.params if page == 1 else {**load.params, "site": str(page)}
+        future = executor.submit(self._get_page, self._build_uri(self._base_url, expansion, load.card.name), params)
+        load.futures[future] = (expansion, page)
+        return future
+
+    def _last_pages(self, load: _CardLoad) -> dict[str, int]:
+        """
+        The price limit of the OfferFilter does not hold if the amount of sellers is limited, since an expensive
+        offer of a seller that is needed anyway can then be part of the cheapest combination
+
+        :return: The last needed page per expansion for which it is known, none if the amount of sellers is limited
+        """
+        return load.last_pages() if self._max_sellers is None else {}
+
+    def _skip_pages(self, load: _CardLoad, loads: dict[concurrent.futures.Future, _CardLoad]):
+        """
+        Cancels the pages of the card that can only contain offers above its price limit, or all of them
+        if loading the card failed
+        """
+        last_pages = self._last_pages(load) if load.error is None else {}
+        for future, (expansion, page) in list(load.futures.items()):
+            if load.error is not None or page > last_pages.get(expansion, page):
+                self._logger.debug(f"Skipping page {page} of '{load.card.name}' in '{expansion}'")
+                future.cancel()
+                del load.futures[future]
+                del loads[future]
+
     def load_offers_for_card(self, card: Card) -> List[Offer]:
         """
         Loads the offers for the selected card from cardmarket
@@ -113,29 +346,60 @@ class CardmarketLoader:
         :raises ExpansionError: If The expansion of the card is not legal
         :raises ProductError: If the card does not exist
         """
-        self._logger.info(f"Loading offers for '{card}'")
-        uris = [(self._build_uri(_base_url, exp, card.name), exp) for exp in card.expansions]
-        # uri = self._build_uri(_base_url, card.expansion, card.name)
-        params = self._prepare_params()
-        all_offers = []
-        for uri, expansion in uris:
-            resp = requests.get(uri, params=params)
-            if not resp.status_code == 200:
-                raise DataLoadError(resp.status_code)
+        for _, offers, error in self.load_offers_for_cards([card]):
+            if error is not None:
+                raise error
+            return offers
 
-            self._check_for_errors(resp.text, expansion)
+    def load_offers_for_cards(self, cards: List[Card], max_concurrency: int = default_concurrency) \
+            -> Iterator[Tuple[Card, List[Offer], Optional[Exception]]]:
+        """
+        Loads the offers for multiple cards from cardmarket, downloading up to max_concurrency pages at the same time.
+        Once the first page of an expansion shows how many pages its offers are split into, the remaining pages
+        are downloaded as well, unless they can only contain offers above the price limit of the card.
+        If the amount of sellers is limited, all pages are downloaded.
+        The pages are parsed in the calling thread as soon as they arrive.
 
-            self._logger.debug("Got response without errors")
+        :param cards: Cards to look for
+        :param max_concurrency: Highest amount of pages downloaded at the same time
+        :return: Generator yielding every card in the order its download finished, with its offers or
+        the DataLoadError, ExpansionError or ProductError that occurred while loading it
+        """
+        params = self._prepare_params()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_concurrency),
+                                                   thread_name_prefix=self.__class__.__name__) as executor:
+            loads: dict[concurrent.futures.Future, _CardLoad] = {}
+            for card in cards:
+                self._logger.info(f"Loading offers for '{card}'")
+                load = _CardLoad(card, params)
+                for expansion in card.expansions:
+                    loads[self._submit_page(executor, load, expansion, 1)] = load
+                if not load.futures:
+                    yield card, [], None
 
-            offers = self._parse_offers(resp.text, card, expansion)
-            all_offers += offers
-        return all_offers
+            while loads:
+                done, _ = concurrent.futures.wait(loads, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    load = loads.pop(future)
+                    expansion, page = load.futures.pop(future)
+                    try:
+                        data = future.result()
+                        load.pages[(expansion, page)] = self._parse_rows(data, load.card, expansion)
+                    except (DataLoadError, ExpansionError, ProductError) as err:
+                        load.error = err
+                    else:
+                        if page == 1 and self._last_pages(load).get(expansion) != 1:
+                            for next_page in range(2, self._page_count(data) + 1):
+                                loads[self._submit_page(executor, load, expansion, next_page)] = load
+                    self._skip_pages(load, loads)
+                    if not load.futures:
+                        yield load.card, load.offers() if load.error is None else [], load.error
 
     def find_expansion(self, card_id: str) -> List[str]:
         # https://www.cardmarket.com/de/Magic/Products/Search?searchString=Entdeckungen+der+Sippe
         uri = self._build_uri("https://www.cardmarket.com/de/Magic/Products/Search")
         params = {"searchString": card_id.replace(" ", "+")}
-        resp = requests.get(uri, params=params)
+        resp = self._session.get(uri, params=params)
         if not resp.status_code == 200:
             raise DataLoadError(resp.status_code)
         exp_data = re.findall("<a href=\"/de/Magic/Products/Singles/(.+?)/(.+?)\">.+?</a>", resp.text)
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+from card import Card
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from order_finder import OrderFinder, CardOrder, SetOrder, counter_performed, counter_skipped, counter_visited, \
+    counter_pruned
+from search_state import SearchState
+
+# Nodes processed between two checks whether a checkpoint is due
+_check_interval = 4096
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class CheckpointOrderFinder(OrderFinder):
+    """
+    OrderFinder searching with an explicit stack instead of recursion.
+    The position of the search is the index of the current offer set per card, which is written
+    to a checkpoint file regularly and on SIGINT, so an interrupted search can be resumed later on.
+    """
+    _checkpoint_file: str
+    _checkpoint_interval: float
+    _card_order: CardOrder
+    _resume: bool
+    _interrupted: bool
+    _last_checkpoint: float
+
+    def __init__(self, all_offers: dict[Card, list[OfferSet]], checkpoint_file: str,
+                 checkpoint_interval: float = 60.0, branch_and_bound: bool = True, vectorized_levels: int = 0,
+                 card_order: CardOrder = CardOrder.SetCount, set_order: SetOrder = SetOrder.Price,
+                 greedy_start: bool = False, max_sellers: Optional[int] = None, resume: bool = False):
+        """
+        :param checkpoint_file: File the search progress is saved to
+        :param checkpoint_interval: Seconds between two checkpoints
+        :param resume: Resumes the search from the checkpoint file instead of starting over
+        """
+        super().__init__(all_offers, branch_and_bound=branch_and_bound, vectorized_levels=vectorized_levels,
+                         card_order=card_order, set_order=set_order, greedy_start=greedy_start,
+                         max_sellers=max_sellers)
+        self._checkpoint_file = os.path.realpath(checkpoint_file)
+        self._checkpoint_interval = checkpoint_interval
+        self._card_order = card_order
+        self._resume = resume
+        self._interrupted = False
+        self._last_checkpoint = 0.0
+
+    @property
+    def checkpoint_file(self) -> str:
+        return self._checkpoint_file
+
+    def _card_ids(self) -> list[str]:
+        return [f"{offer_sets[0].card} ({len(offer_sets)} sets)" for offer_sets in self._offer_sets]
+
+    def _search_id(self) -> dict:
+        """
+        The saved position and best combination are indices into the ordered offer sets, so they are only valid
+        for the same orders, the same seller limit and exactly the same offer sets
+
+        :return: Fingerprint of everything the indices depend on
+        """
+        offer_sets = [[[(x.seller.name, x.seller.shipping, x.amount, x.price, offer_set.get_amount_for_offer(x))
+                        for x in offer_set.offers] for offer_set in card_sets] for card_sets in self._offer_sets]
+        return {
+            "card_order": self._card_order.value,
+            "set_order": self._set_order.value,
+            "max_sellers": self._max_sellers,
+            "offer_sets": hashlib.sha256(json.dumps(offer_sets).encode("utf-8")).hexdigest()
+        }
+
+    def _best_indices(self) -> Optional[list[int]]:
+        if self._lowest_offer is None:
+            return None
+        best_sets = {x.card: x for x in self._lowest_offer.offer_sets}
+        return [offer_sets.index(best_sets[offer_sets[0].card]) for offer_sets in self._offer_sets]
+
+    def save_checkpoint(self, indices: list[int]):
+        """
+        Writes the position of the search to the checkpoint file
+
+        :param indices: Index of the current offer set for all cards up to the current depth
+        :return: None
+        """
+        with self._lock:
+            data = {
+                "cards": self._card_ids(),
+                "search": self._search_id(),
+                "indices": indices,
+                "best": self._best_indices(),
+                "performed_checks": self.performed_checks,
+                "skipped_checks": self.skipped_checks,
+                "nodes_visited": self.nodes_visited,
+                "nodes_pruned": self.nodes_pruned
+            }
+        temp_file = self._checkpoint_file + ".tmp"
+        with open(temp_file, "w") as file_p:
+            json.dump(data, file_p)
+        os.replace(temp_file, self._checkpoint_file)
+        self._last_checkpoint = time.monotonic()
+        self._logger.info(f"Saved checkpoint at {indices} to {self._checkpoint_file}")
+
+    def load_checkpoint(self) -> list[int]:
+        """
+        Restores the best combination and the counters from the checkpoint file
+
+        :return: The position to resume the search at
+        :raises CheckpointError: If the checkpoint can not be read or was created for another search
+        """
+        try:
+            with open(self._checkpoint_file, "r") as file_p:
+                data = json.load(file_p)
+        except (OSError, ValueError) as err:
+            raise CheckpointError(f"Checkpoint '{self._checkpoint_file}' can not be read: {err}")
+        if data.get("cards") != self._card_ids():
+            raise CheckpointError(f"Checkpoint '{self._checkpoint_file}' does not match the searched cards")
+        search_id = self._search_id()
+        saved_id = data.get("search", {})
+        changed = [x for x in search_id if saved_id.get(x) != search_id[x]]
+        if changed:
+            raise CheckpointError(f"Checkpoint '{self._checkpoint_file}' was created with other "
+                                  f"{', '.join(changed)}")
+
+        with self._lock:
+            best = data["best"]
+            if best is not None:
+                best = OfferCollection([self._offer_sets[i][x] for i, x in enumerate(best)])
+            self._reset_best(best)
+            self._counters.set(counter_performed, data["performed_checks"])
+            self._counters.set(counter_skipped, data["skipped_checks"])
+            self._counters.set(counter_visited, data["nodes_visited"])
+            self._counters.set(counter_pruned, data["nodes_pruned"])
+        self._logger.info(f"Resuming search at {data['indices']} with {self._threshold()}")
+        return data["indices"]
+
+    def _handle_interrupt(self, signum, frame):
+        self._interrupted = True
+
+    def find_lowest_offer(self, thread_count: int = 5) -> OfferCollection:
+        """
+        :param thread_count: Ignored, the search always runs in the calling thread so its position is well-defined
+        :return: The lowest combination
+        :raises KeyboardInterrupt: If the search was interrupted, after saving a checkpoint
+        :raises CheckpointError: If the checkpoint to resume from can not be read or was created for another search
+        """
+        self._logger.info(f"Searching for lowest combination in {self.total_checks} total combinations")
+        indices = self.load_checkpoint() if self._resume else [0]
+
+        install_handler = threading.current_thread() is threading.main_thread()
+        if install_handler:
+            previous_handler = signal.signal(signal.SIGINT, self._handle_interrupt)
+        try:
+            finished = self._search(indices)
+        finally:
+            if install_handler:
+                signal.signal(signal.SIGINT, previous_handler)
+
+        if not finished:
+            raise KeyboardInterrupt()
+        return self._result()
+
+    def _search(self, position: list[int]) -> bool:
+        card_count = len(self._offer_sets)
+        indices = position + [0] * (card_count - len(position))
+        depth = len(position) - 1
+        state = SearchState()
+        ordered: list[list[OfferSet]] = [[] for _ in range(card_count)]
+        for card_id in range(depth + 1):
+            ordered[card_id] = self._ordered_sets(state, card_id)
+            if card_id < depth:
+                state.push(ordered[card_id][indices[card_id]])
+
+        self._last_checkpoint = time.monotonic()
+        nodes = 0
+        while depth >= 0:
+            nodes += 1
+            if nodes % _check_interval == 0:
+                if self._interrupted:
+                    self.save_checkpoint(indices[:depth + 1])
+                    return False
+                if time.monotonic() - self._last_checkpoint >= self._checkpoint_interval:
+                    self.save_checkpoint(indices[:depth + 1])
+
+            offer_sets = ordered[depth]
+            if indices[depth] >= len(offer_sets):
+                indices[depth] = 0
+                depth -= 1
+                if depth >= 0:
+                    state.pop()
+                    indices[depth] += 1
+                continue
+
+            state.push(offer_sets[indices[depth]])
+            self._increment_visited()
+            if self._exceeds_seller_limit(state):
+                self._increment_pruned(depth + 1)
+            elif depth < card_count - 1:
+                new_id = depth + 1
+                if self._branch_and_bound and self._lower_bound(state, new_id) >= self._threshold():
+                    if self._prunes_siblings():
+                        self._increment_pruned(new_id, len(offer_sets) - indices[depth])
+                        indices[depth] = len(offer_sets) - 1
+                    else:
+                        self._increment_pruned(new_id)
+                elif new_id == self._vectorized_card:
+                    self._evaluate_leaves(state)
+                else:
+                    depth = new_id
+                    ordered[depth] = self._ordered_sets(state, depth)
+                    continue
+            else:
+                self._increment_check()
+                if state.sum() < self._threshold():
+                    self._update_lowest_offer(state.to_collection())
+            state.pop()
+            indices[depth] += 1
+
+        if os.path.isfile(self._checkpoint_file):
+            os.remove(self._checkpoint_file)
+        return True
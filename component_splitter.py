@@ -0,0 +1,93 @@
+import concurrent.futures
+import heapq
+import logging
+from typing import Callable
+
+from card import Card
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from seller import Seller
+
+
+class ComponentSplitter:
+    """
+    Splits the offer sets into groups of cards that share no seller with any other group.
+    The shipping of one group never depends on another one, so every group can be solved on its own.
+    """
+    _logger: logging.Logger
+    _components: list[dict[Card, list[OfferSet]]]
+
+    def __init__(self, data: dict[Card, list[OfferSet]]):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._components = self._split(data)
+        self._logger.info(f"Split {len(data)} cards into {len(self._components)} independent components")
+
+    @property
+    def components(self) -> list[dict[Card, list[OfferSet]]]:
+        return self._components
+
+    @staticmethod
+    def _split(data: dict[Card, list[OfferSet]]) -> list[dict[Card, list[OfferSet]]]:
+        cards = list(data.keys())
+        parents = list(range(len(cards)))
+
+        def find(card_id: int) -> int:
+            while parents[card_id] != card_id:
+                parents[card_id] = parents[parents[card_id]]
+                card_id = parents[card_id]
+            return card_id
+
+        seller_cards: dict[Seller, int] = {}
+        for card_id, card in enumerate(cards):
+            for offer_set in data[card]:
+                for seller in offer_set.sellers:
+                    if seller not in seller_cards:
+                        seller_cards[seller] = card_id
+                    else:
+                        parents[find(card_id)] = find(seller_cards[seller])
+
+        components: dict[int, dict[Card, list[OfferSet]]] = {}
+        for card_id, card in enumerate(cards):
+            components.setdefault(find(card_id), {})[card] = data[card]
+        return list(components.values())
+
+    @staticmethod
+    def merge(results: list[OfferCollection]) -> OfferCollection:
+        """
+        Merges the results of all components into one collection
+
+        :param results: The cheapest combination for every component
+        :return: The cheapest combination for all cards
+        """
+        return OfferCollection([offer_set for result in results for offer_set in result.offer_sets])
+
+    @staticmethod
+    def merge_alternatives(results: list[list[OfferCollection]], k: int) -> list[OfferCollection]:
+        """
+        Merges the cheapest combinations of all components into the k cheapest combinations for all cards.
+        The components share no seller, so the total of a merged combination is the sum of its parts.
+
+        :param results: The cheapest combinations for every component, ordered by their total
+        :param k: Amount of combinations to return
+        :return: The cheapest combinations for all cards, ordered by their total
+        """
+        partial: list[tuple[float, list[OfferCollection]]] = [(0.0, [])]
+        for result in results:
+            partial = heapq.nsmallest(k, [(total + x.sum(), parts + [x]) for total, parts in partial for x in result],
+                                      key=lambda x: x[0])
+        return [ComponentSplitter.merge(parts) for _, parts in partial]
+
+    def solve(self, solver: Callable[[dict[Card, list[OfferSet]]], OfferCollection],
+              process_count: int = 1) -> OfferCollection:
+        """
+        Solves all components and merges the results
+
+        :param solver: Function finding the cheapest combination for one component, has to be picklable
+        if more than one process is used
+        :param process_count: Amount of processes to solve components in parallel
+        :return: The cheapest combination for all cards
+        """
+        if process_count <= 1 or len(self._components) <= 1:
+            return self.merge([solver(x) for x in self._components])
+        with concurrent.futures.ProcessPoolExecutor(max_workers=process_count) as executor:
+            return self.merge(list(executor.map(solver, self._components)))
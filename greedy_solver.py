@@ -0,0 +1,74 @@
+import logging
+
+from card import Card
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from seller import Seller
+
+# Minimal improvement of the total needed to change a set, prevents cycling on rounding errors
+_epsilon = 1e-9
+
+
+class GreedySolver:
+    """
+    Builds a combination by consolidating sellers greedily.
+    Cards are assigned one after another to the set with the lowest price plus shipping for not yet used sellers,
+    afterwards every card is reassigned to its cheapest set given all other cards until nothing improves.
+    """
+    _logger: logging.Logger
+    _offer_sets: list[list[OfferSet]]
+
+    def __init__(self, all_offers: dict[Card, list[OfferSet]]):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._offer_sets = [y for x, y in all_offers.items()]
+
+    @staticmethod
+    def marginal_price(offer_set: OfferSet, seller_refs: dict[Seller, int]) -> float:
+        """
+        Calculates the price of an offer set including the shipping for sellers not used yet
+
+        :param offer_set: Offer set to calculate the price for
+        :param seller_refs: Amount of chosen sets per seller
+        :return: The price the total would rise by if the set was added
+        """
+        return offer_set.price + sum([x.shipping for x in offer_set.seller_set if not seller_refs.get(x)])
+
+    @staticmethod
+    def add_refs(offer_set: OfferSet, seller_refs: dict[Seller, int]):
+        for seller in offer_set.sellers:
+            seller_refs[seller] = seller_refs.get(seller, 0) + 1
+
+    @staticmethod
+    def remove_refs(offer_set: OfferSet, seller_refs: dict[Seller, int]):
+        for seller in offer_set.sellers:
+            seller_refs[seller] -= 1
+            if seller_refs[seller] == 0:
+                del seller_refs[seller]
+
+    def solve(self) -> list[OfferSet]:
+        """
+        :return: The chosen offer set for every card, in the order of the input data
+        """
+        seller_refs: dict[Seller, int] = {}
+        chosen: list[OfferSet] = [None] * len(self._offer_sets)
+        for card_id in sorted(range(len(self._offer_sets)), key=lambda x: len(self._offer_sets[x])):
+            chosen[card_id] = min(self._offer_sets[card_id], key=lambda x: self.marginal_price(x, seller_refs))
+            self.add_refs(chosen[card_id], seller_refs)
+
+        improved = True
+        while improved:
+            improved = False
+            for card_id, offer_sets in enumerate(self._offer_sets):
+                self.remove_refs(chosen[card_id], seller_refs)
+                best = min(offer_sets, key=lambda x: self.marginal_price(x, seller_refs))
+                current_price = self.marginal_price(chosen[card_id], seller_refs)
+                if self.marginal_price(best, seller_refs) + _epsilon < current_price:
+                    chosen[card_id] = best
+                    improved = True
+                self.add_refs(chosen[card_id], seller_refs)
+        return chosen
+
+    def find_lowest_offer(self) -> OfferCollection:
+        result = OfferCollection(self.solve())
+        self._logger.info(f"Greedy solution costs {result.sum()}")
+        return result
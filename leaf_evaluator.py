@@ -0,0 +1,107 @@
+from typing import Optional
+
+import numpy as np
+
+from offer_set import OfferSet
+from search_state import SearchState
+from seller import Seller
+
+
+class LeafEvaluator:
+    """
+    Evaluates the whole cross product of the last levels of the search in one batch.
+    Every combination is stored as its price and a boolean seller-membership vector, the shipping
+    of sellers already contained in the search state is subtracted column by column.
+    """
+    _offer_sets: list[list[OfferSet]]
+    _sellers: list[Seller]
+    _shape: tuple[int, ...]
+    _prices: np.ndarray
+    _membership: np.ndarray
+    _shipping: np.ndarray
+    _full_shipping: np.ndarray
+    _seller_counts: np.ndarray
+
+    def __init__(self, offer_sets: list[list[OfferSet]]):
+        self._offer_sets = offer_sets
+        seller_ids: dict[Seller, int] = {}
+        for card_sets in offer_sets:
+            for offer_set in card_sets:
+                for seller in offer_set.sellers:
+                    if seller not in seller_ids:
+                        seller_ids[seller] = len(seller_ids)
+        self._sellers = list(seller_ids.keys())
+        self._shape = tuple(len(x) for x in offer_sets)
+
+        prices = np.zeros(1)
+        membership = np.zeros((1, len(self._sellers)), dtype=bool)
+        for card_sets in offer_sets:
+            card_prices = np.array([x.price for x in card_sets])
+            card_membership = np.zeros((len(card_sets), len(self._sellers)), dtype=bool)
+            for i, offer_set in enumerate(card_sets):
+                for seller in offer_set.sellers:
+                    card_membership[i, seller_ids[seller]] = True
+            prices = (prices[:, None] + card_prices[None, :]).reshape(-1)
+            membership = (membership[:, None, :] | card_membership[None, :, :]).reshape(-1, len(self._sellers))
+
+        self._prices = prices
+        self._membership = membership
+        self._shipping = np.array([x.shipping for x in self._sellers])
+        self._full_shipping = np.zeros(len(prices))
+        for column, shipping in zip(membership.T, self._shipping):
+            self._full_shipping[column] += shipping
+        self._seller_counts = np.count_nonzero(membership, axis=1)
+
+    @staticmethod
+    def required_bytes(offer_sets: list[list[OfferSet]]) -> int:
+        """
+        Estimates the memory needed to evaluate the cross product of the offer sets
+
+        :param offer_sets: Offer sets of every evaluated card
+        :return: Size of the stored arrays in bytes
+        """
+        combinations = 1
+        for card_sets in offer_sets:
+            combinations *= len(card_sets)
+        sellers = {seller for card_sets in offer_sets for x in card_sets for seller in x.seller_set}
+        # One byte per seller in the membership, prices, shipping and seller counts as 8 byte numbers
+        return combinations * (len(sellers) + 3 * 8)
+
+    @property
+    def size(self) -> int:
+        """The amount of combinations evaluated per call"""
+        return len(self._prices)
+
+    def evaluate(self, state: SearchState, count: int = 1,
+                 max_sellers: Optional[int] = None) -> list[tuple[float, list[OfferSet]]]:
+        """
+        Finds the cheapest completions of the search state
+
+        :param state: Search state containing the offer sets for all cards before the evaluated levels
+        :param count: Amount of completions to return
+        :param max_sellers: Highest amount of sellers a completed combination may contain, None for no limit
+        :return: Total price of the completed combination and the offer sets completing it, cheapest first.
+        Completions exceeding the seller limit have an infinite total.
+        """
+        totals = self._prices + self._full_shipping
+        new_sellers = self._seller_counts.copy()
+        for seller_id, seller in enumerate(self._sellers):
+            if state.has_seller(seller):
+                column = self._membership[:, seller_id]
+                totals[column] -= self._shipping[seller_id]
+                new_sellers -= column
+        if max_sellers is not None:
+            totals[new_sellers > max_sellers - state.seller_count] = np.inf
+        if count == 1:
+            best = np.array([np.argmin(totals)])
+        else:
+            count = min(count, len(totals))
+            best = np.argpartition(totals, count - 1)[:count]
+            best = best[np.lexsort((best, totals[best]))]
+
+        results = []
+        base = state.sum()
+        for index in best:
+            indices = np.unravel_index(int(index), self._shape)
+            results.append((base + float(totals[index]), [self._offer_sets[i][x] for i, x in enumerate(indices)]))
+        return results
@@ -0,0 +1,215 @@
+import logging
+import math
+import random
+import threading
+import time
+from typing import Optional, Callable
+
+from card import Card
+from greedy_solver import GreedySolver
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from seller import Seller
+
+# Temperatures of the simulated annealing at the start and the end of the time budget, in €
+_start_temperature = 2.0
+_end_temperature = 0.01
+
+
+class LocalSearchFinder:
+    """
+    Heuristic search for a cheap combination within a time budget.
+    Starts with the greedy solution and improves it by simulated annealing, using three moves:
+    swapping the offer set of a single card, dropping a seller and reassigning all of their cards,
+    and opening a seller, moving every card to them that gets cheaper once their shipping is paid.
+    The best combination found so far can be returned at any time.
+    """
+    _logger: logging.Logger
+    _lock: threading.Lock
+    _offer_sets: list[list[OfferSet]]
+    _time_budget: float
+    _max_iterations: Optional[int]
+    _random: random.Random
+    _clock: Callable[[], float]
+    _sellers: list[Seller]
+
+    _chosen: list[int]
+    _seller_refs: dict[Seller, int]
+    _total: float
+    _best: list[int]
+    _best_total: float
+    _iterations: int
+    _started: Optional[float]
+
+    def __init__(self, all_offers: dict[Card, list[OfferSet]], time_budget: float,
+                 max_iterations: Optional[int] = None, seed: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._offer_sets = [y for x, y in all_offers.items()]
+        self._time_budget = time_budget
+        self._max_iterations = max_iterations
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._sellers = list({seller for offer_sets in self._offer_sets for x in offer_sets for seller in x.sellers})
+        self._sellers.sort()
+
+        greedy = GreedySolver(all_offers).solve()
+        self._chosen = [offer_sets.index(x) for offer_sets, x in zip(self._offer_sets, greedy)]
+        self._seller_refs = {}
+        self._total = 0.0
+        for card_id, index in enumerate(self._chosen):
+            self._total += self._add(card_id, index)
+        self._best = list(self._chosen)
+        self._best_total = self._total
+        self._iterations = 0
+        self._started = None
+        self._logger.info(f"Created LocalSearchFinder for {len(all_offers)} cards, starting at {self._total}")
+
+    @property
+    def best_total(self) -> float:
+        """The total price of the best combination found so far"""
+        with self._lock:
+            return round(self._best_total, 2)
+
+    @property
+    def iterations(self) -> int:
+        return self._iterations
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds passed since the search was started"""
+        if self._started is None:
+            return 0.0
+        return self._clock() - self._started
+
+    @property
+    def time_budget(self) -> float:
+        return self._time_budget
+
+    def _add(self, card_id: int, index: int) -> float:
+        offer_set = self._offer_sets[card_id][index]
+        added = offer_set.price
+        for seller in offer_set.sellers:
+            refs = self._seller_refs.get(seller, 0)
+            if refs == 0:
+                added += seller.shipping
+            self._seller_refs[seller] = refs + 1
+        return added
+
+    def _remove(self, card_id: int, index: int) -> float:
+        offer_set = self._offer_sets[card_id][index]
+        removed = offer_set.price
+        for seller in offer_set.sellers:
+            self._seller_refs[seller] -= 1
+            if self._seller_refs[seller] == 0:
+                removed += seller.shipping
+                del self._seller_refs[seller]
+        return removed
+
+    def _assign(self, assignments: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """
+        Assigns new offer sets to the given cards
+
+        :param assignments: Tuples of card id and index of the new offer set
+        :return: The assignments needed to revert the change
+        """
+        revert = []
+        for card_id, index in assignments:
+            revert.append((card_id, self._chosen[card_id]))
+            self._total -= self._remove(card_id, self._chosen[card_id])
+            self._total += self._add(card_id, index)
+            self._chosen[card_id] = index
+        revert.reverse()
+        return revert
+
+    def _swap_move(self) -> list[tuple[int, int]]:
+        card_id = self._random.randrange(len(self._offer_sets))
+        return [(card_id, self._random.randrange(len(self._offer_sets[card_id])))]
+
+    def _drop_seller_move(self) -> list[tuple[int, int]]:
+        seller = self._random.choice(list(self._seller_refs.keys()))
+        affected = [i for i, x in enumerate(self._chosen) if seller in self._offer_sets[i][x].seller_set]
+        refs = dict(self._seller_refs)
+        for card_id in affected:
+            GreedySolver.remove_refs(self._offer_sets[card_id][self._chosen[card_id]], refs)
+
+        assignments = []
+        for card_id in affected:
+            candidates = [i for i, x in enumerate(self._offer_sets[card_id]) if seller not in x.seller_set]
+            if not candidates:
+                return []
+            index = min(candidates, key=lambda x: GreedySolver.marginal_price(self._offer_sets[card_id][x], refs))
+            GreedySolver.add_refs(self._offer_sets[card_id][index], refs)
+            assignments.append((card_id, index))
+        return assignments
+
+    def _open_seller_move(self) -> list[tuple[int, int]]:
+        seller = self._random.choice(self._sellers)
+        refs = dict(self._seller_refs)
+        refs[seller] = refs.get(seller, 0) + 1
+
+        assignments = []
+        for card_id, offer_sets in enumerate(self._offer_sets):
+            current = offer_sets[self._chosen[card_id]]
+            if seller in current.seller_set:
+                continue
+            candidates = [i for i, x in enumerate(offer_sets) if seller in x.seller_set]
+            if not candidates:
+                continue
+            GreedySolver.remove_refs(current, refs)
+            index = min(candidates, key=lambda x: GreedySolver.marginal_price(offer_sets[x], refs))
+            if GreedySolver.marginal_price(offer_sets[index], refs) < GreedySolver.marginal_price(current, refs):
+                GreedySolver.add_refs(offer_sets[index], refs)
+                assignments.append((card_id, index))
+            else:
+                GreedySolver.add_refs(current, refs)
+        return assignments
+
+    def _temperature(self) -> float:
+        if self._max_iterations is not None:
+            progress = self._iterations / self._max_iterations
+        else:
+            progress = min(1.0, self.elapsed / self._time_budget) if self._time_budget > 0 else 1.0
+        return _start_temperature * (_end_temperature / _start_temperature) ** progress
+
+    def _is_finished(self) -> bool:
+        if self._max_iterations is not None and self._iterations >= self._max_iterations:
+            return True
+        return self.elapsed >= self._time_budget
+
+    def find_lowest_offer(self) -> OfferCollection:
+        self._logger.info(f"Searching for a cheap combination within {self._time_budget} seconds")
+        self._started = self._clock()
+        try:
+            while self._offer_sets and not self._is_finished():
+                self._iterations += 1
+                move = self._random.random()
+                if move < 0.3:
+                    assignments = self._drop_seller_move()
+                elif move < 0.6:
+                    assignments = self._open_seller_move()
+                else:
+                    assignments = self._swap_move()
+                if not assignments:
+                    continue
+
+                old_total = self._total
+                revert = self._assign(assignments)
+                delta = self._total - old_total
+                if delta > 0 and self._random.random() >= math.exp(-delta / self._temperature()):
+                    self._assign(revert)
+                    continue
+
+                if self._total < self._best_total:
+                    with self._lock:
+                        self._best = list(self._chosen)
+                        self._best_total = self._total
+                    self._logger.debug(f"Found combination for {round(self._total, 2)} "
+                                       f"after {self._iterations} iterations")
+        except KeyboardInterrupt:
+            self._logger.info("Search interrupted, returning the best combination found so far")
+
+        self._logger.info(f"Finished after {self._iterations} iterations with {self.best_total}")
+        with self._lock:
+            return OfferCollection([self._offer_sets[i][x] for i, x in enumerate(self._best)])
@@ -1,32 +1,98 @@
 import argparse
 import enum
+import json
 import logging
 import sys
 from typing import Tuple
 
-from cardmarket_loader import CardmarketLoader, DataLoadError, ExpansionError, ProductError
+from card import Card
+from cardmarket_loader import CardmarketLoader, DataLoadError, ExpansionError, ProductError, default_concurrency
+from checkpoint_order_finder import CheckpointOrderFinder, CheckpointError
+from component_splitter import ComponentSplitter
 from file_loader import FileLoader
+from local_search_finder import LocalSearchFinder
 from offer import Offer
+from offer_collection import OfferCollection
 from offer_filter import OfferFilter
+from offer_set import OfferSet
 from offer_set_transformer import OfferSetTransformer
-from order_finder import OrderFinder
+from order_finder import OrderFinder, CardOrder, SetOrder, NoCombinationError
+from process_order_finder import ProcessOrderFinder, SearchWorkerError
+from registry import Registry
+from response_cache import ResponseCache, default_max_age
 from search_settings import SearchSettings
+from seller_dominance_filter import SellerDominanceFilter
+from seller_subset_finder import SellerSubsetFinder
 from settings_loader import SettingsLoader
+from snapshot_store import SnapshotStore, SnapshotError
 from utils.animated_loading_indicator import AnimatedLoadingIndicator
+from utils.progress_indicator import ProgressIndicator
 from utils.updated_loading_indicator import UpdatedLoadingIndicator
 
 _indicator_size = 4
+_subset_seller_limit = 16
+_vectorized_levels = 3
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="CLI to get and group offers from cardmarket.com to get the lowest combined price")
-    parser.add_argument("--file", "-f", type=str, required=True, help="File to load the card identifiers from")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", "-f", type=str, help="File to load the card identifiers from")
+    source.add_argument("--offline", type=str,
+                        help="Snapshot database to take the offers from instead of loading them from cardmarket")
     parser.add_argument("--config", "-c", type=str, help="File to configure the filter parameters")
     parser.add_argument("--verbose", "-v", action="store_true", help="Activates debug output")
     parser.add_argument("--non_interactive", action="store_true",
                         help="Always answers questions posed to the user with 'yes, continue'")
+    parser.add_argument("--processes", "-p", type=int, default=1,
+                        help="Amount of worker processes used to search for the lowest combination")
+    parser.add_argument("--time-budget", "-t", type=float,
+                        help="Searches heuristically for the given amount of seconds instead of exhaustively")
+    parser.add_argument("--checkpoint", type=str,
+                        help="File to regularly save the search progress to, so an interrupted search can be resumed")
+    parser.add_argument("--resume", action="store_true", help="Resumes the search from the checkpoint file")
+    parser.add_argument("--alternatives", "-a", type=int, default=1,
+                        help="Amount of cheapest combinations to search for, in case sellers sell out")
+    parser.add_argument("--export", "-e", type=str, help="JSON file to export the found combinations to")
+    parser.add_argument("--card-order", type=CardOrder, choices=list(CardOrder), default=CardOrder.MostConstrained,
+                        metavar="{" + ",".join([x.value for x in CardOrder]) + "}",
+                        help="Order the cards are searched in")
+    parser.add_argument("--set-order", type=SetOrder, choices=list(SetOrder), default=SetOrder.MarginalPrice,
+                        metavar="{" + ",".join([x.value for x in SetOrder]) + "}",
+                        help="Order the offer sets of a card are searched in")
+    parser.add_argument("--concurrency", type=int,
+                        help=f"Amount of pages loaded from cardmarket at the same time, {default_concurrency} "
+                             f"if not given")
+    parser.add_argument("--cache-dir", type=str,
+                        help="Directory to cache the loaded pages in, so repeated runs do not load them again")
+    parser.add_argument("--max-age", type=float, default=default_max_age,
+                        help="Seconds a cached page is used before asking cardmarket whether it changed")
+    parser.add_argument("--snapshot", type=str, help="Snapshot database to save the loaded offers to")
+    parser.add_argument("--snapshot-id", type=int,
+                        help="Snapshot to search with --offline, the newest one if not given")
+    parser.add_argument("--max-sellers", "-m", type=int,
+                        help="Highest amount of sellers to order from, even if more sellers would be cheaper")
     args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+    if args.max_sellers is not None and args.max_sellers < 1:
+        parser.error("--max-sellers has to be at least 1")
+    if args.offline:
+        for name, value in [("--snapshot", args.snapshot), ("--config", args.config), ("--cache-dir", args.cache_dir),
+                            ("--concurrency", args.concurrency)]:
+            if value is not None:
+                parser.error(f"{name} can not be combined with --offline")
+    if args.snapshot_id is not None and not args.offline:
+        parser.error("--snapshot-id requires --offline")
+    if args.max_age < 0:
+        parser.error("--max-age can not be negative")
+    if args.max_sellers is not None and args.time_budget is not None:
+        parser.error("--max-sellers can not be combined with --time-budget")
+    if args.alternatives > 1 and args.time_budget is not None:
+        parser.error("--alternatives can not be combined with --time-budget")
+    if args.alternatives > 1 and args.checkpoint:
+        parser.error("--alternatives can not be combined with --checkpoint")
     return args
 
 
@@ -45,7 +111,7 @@ def format_amount(number: int) -> str:
 
     base_nr = ((len(str(number)) - 1) // 3) * 3
     if base_nr < 3:
-        return str(base_nr)
+        return str(number)
     if base_nr > 27:
         return f"over 10^{base_nr}"
     buf_number = number // (10 ** base_nr)
@@ -85,13 +151,146 @@ def format_list_out(data: list[enum.Enum]):
     return ', '.join([x.name for x in data])
 
 
-def main():
-    args = parse_args()
-    if args.verbose:
-        logging.basicConfig(level=logging.DEBUG)
+def search_heuristically(args: argparse.Namespace, data: dict[Card, list[OfferSet]]) -> OfferCollection:
+    local_finder = LocalSearchFinder(data, args.time_budget)
+    budget_ms = max(1, int(args.time_budget * 1000))
+    indicator = UpdatedLoadingIndicator(budget_ms, lambda: min(int(local_finder.elapsed * 1000), budget_ms),
+                                        message=f"Improving combination for {args.time_budget} seconds...")
+    with indicator:
+        cheapest_combination = local_finder.find_lowest_offer()
+    print(f"[i] {local_finder.iterations} local search moves have been tried.")
+    return cheapest_combination
+
+
+def search_exhaustively(args: argparse.Namespace, data: dict[Card, list[OfferSet]]) -> list[OfferCollection]:
+    if args.checkpoint:
+        order_finder = CheckpointOrderFinder(data, args.checkpoint, vectorized_levels=_vectorized_levels,
+                                             card_order=args.card_order, set_order=args.set_order, greedy_start=True,
+                                             max_sellers=args.max_sellers, resume=args.resume)
+    elif args.processes > 1 and args.alternatives <= 1:
+        order_finder = ProcessOrderFinder(data, card_order=args.card_order, greedy_start=True,
+                                          max_sellers=args.max_sellers)
     else:
-        logging.basicConfig(level=logging.CRITICAL)
+        order_finder = OrderFinder(data, branch_and_bound=True, vectorized_levels=_vectorized_levels,
+                                   card_order=args.card_order, set_order=args.set_order, greedy_start=True,
+                                   max_sellers=args.max_sellers)
+    indicator = ProgressIndicator(order_finder.total_checks,
+                                  lambda: order_finder.performed_checks + order_finder.skipped_checks,
+                                  lambda: order_finder.nodes_visited,
+                                  lambda: order_finder.nodes_pruned,
+                                  precision=1,
+                                  message="Searching for lowest combination of sellers...")
+    with indicator:
+        try:
+            if args.alternatives > 1:
+                combinations = order_finder.find_lowest_offers(args.alternatives, 1)
+            else:
+                combinations = [order_finder.find_lowest_offer(args.processes)]
+        except KeyboardInterrupt:
+            if args.checkpoint:
+                indicator.stop()
+                print(f"[i] Search progress saved to {args.checkpoint}, continue with --resume.")
+            raise
+
+    print(f"[i] {format_amount(order_finder.performed_checks)} of {format_amount(order_finder.total_checks)} "
+          f"combinations have been checked.")
+    print(f"[i] {order_finder.nodes_visited} search nodes visited, {order_finder.nodes_pruned} subtrees pruned "
+          f"({format_amount(order_finder.skipped_checks)} combinations skipped).")
+    return combinations
+
+
+def search_cheapest_combination(args: argparse.Namespace, data: dict[Card, list[OfferSet]]) \
+        -> list[OfferCollection]:
+    if args.time_budget is not None:
+        return [search_heuristically(args, data)]
+
+    subset_finder = SellerSubsetFinder(data)
+    if subset_finder.seller_count <= _subset_seller_limit and not args.checkpoint and args.alternatives <= 1:
+        with AnimatedLoadingIndicator(size=_indicator_size,
+                                      message=f"Searching subsets of {subset_finder.seller_count} sellers..."):
+            cheapest_combination = subset_finder.find_lowest_offer()
+        print(f"[i] {subset_finder.states_checked} seller subsets have been checked.")
+        return [cheapest_combination]
+
+    return search_exhaustively(args, data)
+
+
+def solve_component(data: dict[Card, list[OfferSet]]) -> OfferCollection:
+    subset_finder = SellerSubsetFinder(data)
+    if subset_finder.seller_count <= _subset_seller_limit:
+        return subset_finder.find_lowest_offer()
+    order_finder = OrderFinder(data, branch_and_bound=True, vectorized_levels=_vectorized_levels,
+                               card_order=CardOrder.MostConstrained, set_order=SetOrder.MarginalPrice, greedy_start=True)
+    return order_finder.find_lowest_offer(1)
+
+
+def search_components(args: argparse.Namespace, data: dict[Card, list[OfferSet]]) -> list[OfferCollection]:
+    if args.checkpoint:
+        # A single checkpoint file can only describe one search
+        return search_cheapest_combination(args, data)
+    if args.time_budget is not None:
+        # A single local search over all groups keeps the whole run within the time budget
+        return search_cheapest_combination(args, data)
+
+    splitter = ComponentSplitter(data)
+    components = splitter.components
+    if len(components) == 1:
+        return search_cheapest_combination(args, data)
+    print(f"[i] Cards split into {len(components)} groups without shared sellers")
+
+    if args.processes > 1 and args.alternatives <= 1:
+        with AnimatedLoadingIndicator(size=_indicator_size,
+                                      message=f"Searching {len(components)} groups in {args.processes} processes..."):
+            return [splitter.solve(solve_component, args.processes)]
+
+    results = []
+    for i, component in enumerate(components):
+        print(f"[i] Searching group {i + 1}/{len(components)} with {len(component)} cards")
+        results.append(search_cheapest_combination(args, component))
+    return splitter.merge_alternatives(results, args.alternatives)
+
+
+def print_combination(combination: OfferCollection):
+    sellers = sorted(combination.sellers)
+    for seller in sellers:
+        offers: list[Tuple[Offer, int]] = []
+        for offer_set in combination.offer_sets:
+            for offer in offer_set.offers:
+                if offer.seller == seller:
+                    offers.append((offer, offer_set.get_amount_for_offer(offer)))
+        total = format_price(seller.shipping + sum([offer.price * amount for offer, amount in offers]))
+        print(f"{seller.name} ({format_price(seller.shipping)}€ Shipping, {total} total):")
+        offers.sort()
+        for offer, amount in offers:
+            print(f"    {offer.expansion} // {offer.card.name} - {format_price(offer.price)}€ "
+                  f"x {amount} ({offer.amount} available)")
+        print()
 
+    print(f"Total: {format_price(combination.sum())}€")
+
+
+def export_combinations(file: str, combinations: list[OfferCollection]):
+    data = []
+    for combination in combinations:
+        sellers = sorted(combination.sellers)
+        data.append({
+            "total": combination.sum(),
+            "sellers": [{
+                "name": seller.name,
+                "shipping": seller.shipping,
+                "offers": [{
+                    "card": offer.card.name,
+                    "expansion": offer.expansion,
+                    "price": offer.price,
+                    "amount": offer_set.get_amount_for_offer(offer)
+                } for offer_set in combination.offer_sets for offer in offer_set.offers if offer.seller == seller]
+            } for seller in sellers]
+        })
+    with open(file, "w") as file_p:
+        json.dump(data, file_p, indent=2)
+
+
+def load_offers(args: argparse.Namespace, registry: Registry) -> dict[Card, list[Offer]]:
     if not args.config:
         config = SearchSettings()
     else:
@@ -118,73 +317,120 @@ def main():
             sys.exit(1)
     print()
 
-    c_loader = CardmarketLoader(config)
+    concurrency = args.concurrency if args.concurrency is not None else default_concurrency
+    cache = ResponseCache(args.cache_dir, args.max_age) if args.cache_dir else None
+    c_loader = CardmarketLoader(config, registry, max_concurrency=concurrency, cache=cache,
+                                max_sellers=args.max_sellers)
 
-    all_offers = {}
+    loaded_offers = {}
     load_errs = 0
     exp_errs = 0
     product_errs = 0
-    for card in cards:
-        try:
-            with AnimatedLoadingIndicator(size=_indicator_size, message=f"Loading offers for {card.name}..."):
-                card_offers = c_loader.load_offers_for_card(card)
+    with c_loader, AnimatedLoadingIndicator(size=_indicator_size,
+                                            message=f"Loading offers for {len(cards)} cards...") as indicator:
+        for card, card_offers, error in c_loader.load_offers_for_cards(cards, concurrency):
+            indicator.stop()
+            if isinstance(error, DataLoadError):
+                print(f"[x] Data for '{card.name}' could not be loaded: {error}")
+                load_errs += 1
+            elif isinstance(error, ExpansionError):
+                print(f"[x] '{error.args[0]}' is no legal expansion")
+                exp_errs += 1
+            elif isinstance(error, ProductError):
+                print(f"[x] Card '{card.name}' does not exist in '{error.args[0]}'")
+                product_errs += 1
+            else:
                 card_offers.sort()
-            all_offers[card] = card_offers
-            min_price = min([x.price for x in card_offers])
-            max_price = max([x.price for x in card_offers])
-            print(f"[✓] {len(card_offers)} offers fetched between {format_price(min_price)}€ and "
-                  f"{format_price(max_price)}€ for {card.name}", " " * (10 + len(str(card.name))))
-        except DataLoadError as err:
-            print(f"[x] Data could not be loaded, server responded with code {err.code}")
-            load_errs += 1
-        except ExpansionError as err:
-            print(f"[x] '{err.args[0]}' is no legal expansion")
-            exp_errs += 1
-        except ProductError as err:
-            print(f"[x] Card '{card.name}' does not exist in '{err.args[0]}'")
-            product_errs += 1
+                loaded_offers[card] = card_offers
+                min_price = min([x.price for x in card_offers])
+                max_price = max([x.price for x in card_offers])
+                print(f"[✓] {len(card_offers)} offers fetched between {format_price(min_price)}€ and "
+                      f"{format_price(max_price)}€ for {card.name}", " " * (10 + len(str(card.name))))
+            indicator.run()
+    if cache is not None:
+        print(f"[i] {cache.hits} pages taken from the cache, {cache.revalidations} revalidated, "
+              f"{cache.misses} downloaded")
+    if c_loader.scheduler.retries:
+        print(f"[i] {c_loader.scheduler.retries} requests retried after {c_loader.scheduler.throttled} failures, "
+              f"now sending {round(c_loader.request_rate, 1)} requests per second")
+    # Keep the order of the file, independent of the order the downloads finished in
+    all_offers = {card: loaded_offers[card] for card in cards if card in loaded_offers}
+    if args.snapshot:
+        try:
+            with SnapshotStore(args.snapshot) as store:
+                snapshot_id = store.save(all_offers)
+            print(f"[i] Offers saved as snapshot {snapshot_id} to {args.snapshot}")
+        except SnapshotError as err:
+            # The offers are already loaded, so the search continues without the snapshot
+            log_error(str(err))
+    return all_offers
+
+
+def load_snapshot(args: argparse.Namespace, registry: Registry) -> dict[Card, list[Offer]]:
+    try:
+        with SnapshotStore(args.offline, read_only=True) as store:
+            all_offers = store.load(args.snapshot_id, registry)
+    except SnapshotError as err:
+        log_error(str(err))
+        sys.exit(1)
+    print(f"[✓] {len(all_offers)} different Cards loaded from the snapshot, "
+          f"{sum([x.amount for x in all_offers])} in total.")
+    return all_offers
+
+
+def main():
+    args = parse_args()
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.CRITICAL)
+
+    registry = Registry()
+    all_offers = load_snapshot(args, registry) if args.offline else load_offers(args, registry)
     total_offers = sum([len(x) for y, x in all_offers.items()])
     legal_cards = len(all_offers.keys())
     print(f"[i] {total_offers} total offers collected for {legal_cards} cards")
 
-    offer_filter = OfferFilter(all_offers)
+    offer_filter = OfferFilter(all_offers, args.max_sellers, registry)
     total_offers = sum([len(x) for y, x in offer_filter.data.items()])
     max_offers = max([len(x) for y, x in offer_filter.data.items()])
     print(f"[i] Reduced offers to {total_offers} viable ones (max: {max_offers})")
 
-    set_transformer = OfferSetTransformer(offer_filter.data)
+    dominance_filter = SellerDominanceFilter(offer_filter.data, registry)
+    print(f"[i] Removed {dominance_filter.removed_sellers} dominated sellers with "
+          f"{dominance_filter.removed_offers} offers")
+
+    set_transformer = OfferSetTransformer(dominance_filter.data, args.max_sellers, registry)
     total_offers = sum([len(x) for y, x in set_transformer.data.items()])
     max_offers = max([len(x) for y, x in set_transformer.data.items()])
     print(f"[i] Transformed offers to {total_offers} sets (max: {max_offers})")
 
     print()
-    order_finder = OrderFinder(set_transformer.data)
-    indicator = UpdatedLoadingIndicator(order_finder.total_checks, lambda: order_finder.performed_checks, precision=1,
-                                        message="Searching for lowest combination of sellers...")
-    with indicator:
-        cheapest_combination = order_finder.find_lowest_offer(thread_count=1)
-
-    sellers = cheapest_combination.sellers
-    sellers.sort()
-
-    print(f"[i] {format_amount(order_finder.total_checks)} combinations have been checked.")
+    try:
+        if args.max_sellers is not None:
+            # The seller limit applies to all cards together, so they can not be split into groups
+            combinations = search_exhaustively(args, set_transformer.data)
+        else:
+            combinations = search_components(args, set_transformer.data)
+    except (NoCombinationError, SearchWorkerError, CheckpointError) as err:
+        print(f"[x] {err.args[0]}")
+        return
+    if not combinations:
+        print(f"[x] No combination with at most {args.max_sellers} sellers exists")
+        return
     print()
     print("Cheapest possible combination found:" + " " * 60)
-    for seller in sellers:
-        offers: list[Tuple[Offer, int]] = []
-        for offer_set in cheapest_combination.offer_sets:
-            for offer in offer_set.offers:
-                if offer.seller == seller:
-                    offers.append((offer, offer_set.get_amount_for_offer(offer)))
-        total = format_price(seller.shipping + sum([offer.price * amount for offer, amount in offers]))
-        print(f"{seller.name} ({format_price(seller.shipping)}€ Shipping, {total} total):")
-        offers.sort()
-        for offer, amount in offers:
-            print(f"    {offer.expansion} // {offer.card.name} - {format_price(offer.price)}€ "
-                  f"x {amount} ({offer.amount} available)")
+    print_combination(combinations[0])
+
+    for i, combination in enumerate(combinations[1:]):
         print()
+        print(f"Alternative {i + 1} (+{format_price(combination.sum() - combinations[0].sum())}€):")
+        print_combination(combination)
 
-    print(f"Total: {format_price(cheapest_combination.sum())}€")
+    if args.export:
+        export_combinations(args.export, combinations)
+        print()
+        print(f"[✓] {len(combinations)} combinations exported to {args.export}")
 
 
 if __name__ == '__main__':
@@ -1,28 +1,36 @@
+from typing import Optional
+
 from card import Card
 from seller import Seller
 
 
 class Offer:
+    __slots__ = ("_card", "_seller", "_amount", "_price", "_shipping", "_expansion", "_registry_id", "_hash")
     _card: Card
     _seller: Seller
     _amount: int
     _price: float
     _expansion: str
+    _registry_id: Optional[int]
+    _hash: int
 
-    def __init__(self, card: Card, seller: Seller, amount: int, price: float, expansion: str):
+    def __init__(self, card: Card, seller: Seller, amount: int, price: float, expansion: str,
+                 registry_id: Optional[int] = None):
         self._card = card
         self._seller = seller
         self._amount = amount
         self._price = price
         self._shipping = 1.15
         self._expansion = expansion
+        self._registry_id = registry_id
+        self._hash = hash((card, seller, amount, price))
 
     def __str__(self):
         # return f"{self._seller}: {self._amount} for {self._price}"
         return f"{self._card}: {self._amount} for {self._price} by {self._seller}"
 
     def __hash__(self):
-        return hash(str(self))
+        return self._hash
 
     def __lt__(self, other):
         if not isinstance(other, Offer):
@@ -30,6 +38,8 @@ class Offer:
         return self.price < other.price
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Offer):
             raise NotImplementedError()
         return (self.price == other.price and
@@ -56,3 +66,8 @@ class Offer:
     @property
     def expansion(self) -> str:
         return self._expansion
+
+    @property
+    def registry_id(self) -> Optional[int]:
+        """Dense id assigned by the Registry, None if the offer was not interned"""
+        return self._registry_id
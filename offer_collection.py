@@ -1,55 +1,66 @@
-from copy import copy
-
 from card import Card
 from offer_set import OfferSet
 from seller import Seller
 
 
 class OfferCollection:
-    offer_sets: list[OfferSet]
+    """
+    Combination of offer sets, one per card.
+    Immutable, the sellers, the total and the hash are calculated once on creation.
+    """
+    __slots__ = ("_offer_sets", "_sellers", "_sum", "_hash")
+    _offer_sets: tuple[OfferSet, ...]
+    _sellers: tuple[Seller, ...]
     _sum: float
+    _hash: int
 
     def __init__(self, offers: list[OfferSet]):
-        self.offer_sets = offers
-        self.offer_sets.sort()
-        self._sum = round(sum([x.price for x in self.offer_sets]) + sum(x.shipping for x in self.sellers), 2)
+        self._offer_sets = tuple(sorted(offers))
+        sellers = {}
+        for offer_set in self._offer_sets:
+            for seller in offer_set.sellers:
+                sellers[seller] = None
+        self._sellers = tuple(sellers)
+        self._sum = round(sum([x.price for x in self._offer_sets]) + sum(x.shipping for x in self._sellers), 2)
+        self._hash = hash(frozenset(self._offer_sets))
 
     def __str__(self):
-        return str([str(x) for x in self.offer_sets]) + f" for a total of {self.sum()}€"
+        return str([str(x) for x in self._offer_sets]) + f" for a total of {self.sum()}€"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, OfferCollection):
             raise NotImplementedError()
-        if not len(self.offer_sets) == len(other.offer_sets):
+        if not len(self._offer_sets) == len(other._offer_sets):
             return False
-        for offer in self.offer_sets:
-            if offer not in other.offer_sets:
+        for offer in self._offer_sets:
+            if offer not in other._offer_sets:
                 return False
         return True
 
     def __hash__(self):
-        return hash(str([str(x) for x in self.offer_sets]))
+        return self._hash
 
     @property
-    def sellers(self) -> list[Seller]:
-        sellers = []
-        for offer_set in self.offer_sets:
-            for seller in offer_set.sellers:
-                if seller not in sellers:
-                    sellers.append(seller)
-        return sellers
+    def offer_sets(self) -> tuple[OfferSet, ...]:
+        return self._offer_sets
+
+    @property
+    def sellers(self) -> tuple[Seller, ...]:
+        return self._sellers
 
     def sum(self) -> float:
         return self._sum
 
     def add(self, offer: OfferSet):
-        new_offers = copy(self.offer_sets)
+        new_offers = list(self._offer_sets)
         new_offers.append(offer)
         new_collection = OfferCollection(new_offers)
         return new_collection
 
     def remove(self, card: Card):
-        new_offers = copy(self.offer_sets)
+        new_offers = list(self._offer_sets)
         for offer in new_offers:
             if offer.card == card:
                 new_offers.remove(offer)
@@ -1,61 +1,78 @@
 import logging
+import math
+from typing import Optional
 
 from card import Card
 from offer import Offer
+from registry import Registry
+from seller import Seller
 
 
 class OfferFilter:
+    """
+    Removes offers that can never be part of the cheapest combination, in a single pass over the offers of every card.
+    Offers for single copies are dropped if their seller sells nothing else, unless they are the cheapest offer.
+    Offers for any amount of copies are dropped if they are more expensive than the price limit of the card.
+    The price limit assumes that sellers can be added to a combination freely, so it is not applied
+    if the amount of sellers is limited.
+    """
     _logger: logging.Logger
+    _max_sellers: Optional[int]
+    _registry: Registry
     _data: dict[Card, list[Offer]]
 
-    def __init__(self, data: dict[Card, list[Offer]]):
+    def __init__(self, data: dict[Card, list[Offer]], max_sellers: Optional[int] = None,
+                 registry: Optional[Registry] = None):
+        """
+        :param data: The offers per card
+        :param max_sellers: The highest amount of sellers a combination may contain, None if there is no limit
+        :param registry: Registry the offers were interned in, sellers are counted by their id in it
+        """
         self._logger = logging.getLogger(self.__class__.__name__)
-        self._data = data
-        self._data = self._remove_single_sellers(self._data)
-        self._data = self._remove_expensive_offers(self._data)
+        self._max_sellers = max_sellers
+        self._registry = registry if registry is not None else Registry()
+        self._data = self._filter(data)
 
     @property
     def data(self) -> dict[Card, list[Offer]]:
         return self._data
 
-    def _remove_single_sellers(self, in_data: dict[Card, list[Offer]]) -> dict[Card, list[Offer]]:
-        all_sellers = {}
-        for card, offers in in_data.items():
-            for offer in offers:
-                if offer.seller in all_sellers:
-                    all_sellers[offer.seller] += 1
-                else:
-                    all_sellers[offer.seller] = 1
-
-        double_sellers = [x for x, y in all_sellers.items() if y > 1]
-        out_data = {}
-
-        for card, offers in in_data.items():
-            if card.amount > 1:
-                out_data[card] = offers
-                continue
-            new_offers = [x for x in offers if x.seller in double_sellers]
-            new_offers.sort(key=lambda x: x.price)
-            cheapest_offer = offers[0]
-            if cheapest_offer not in new_offers:
-                new_offers.append(cheapest_offer)
-            self._logger.info(f"Reduced offer-count for '{card.name}' from {len(offers)} to {len(new_offers)}")
-            out_data[card] = new_offers
+    @staticmethod
+    def price_limit(offers: list[Offer], amount: int) -> float:
+        """
+        Calculates the highest price an offer may have to be part of a set that can be cheaper than buying the
+        cheapest copies. A set containing the offer costs at least its price plus the cheapest amount - 1 copies,
+        the cheapest copies including the shipping of all their sellers are an upper bound for the set.
 
-        return out_data
+        :param offers: The offers for the card, sorted by price
+        :param amount: The amount of copies wanted
+        :return: Price of the most expensive of the cheapest copies plus the shipping of their sellers,
+        infinite if the offers do not contain enough copies
+        """
+        missing = amount
+        sellers: set[Seller] = set()
+        for offer in offers:
+            sellers.add(offer.seller)
+            missing -= offer.amount
+            if missing <= 0:
+                return offer.price + sum([x.shipping for x in sellers])
+        return math.inf
 
-    def _remove_expensive_offers(self, in_data: dict[Card, list[Offer]]) -> dict[Card, list[Offer]]:
+    def _filter(self, in_data: dict[Card, list[Offer]]) -> dict[Card, list[Offer]]:
+        seller_ids = {card: [self._registry.seller_id(x.seller) for x in offers] for card, offers in in_data.items()}
+        seller_counts = [0] * len(self._registry.sellers)
+        for ids in seller_ids.values():
+            for seller_id in ids:
+                seller_counts[seller_id] += 1
         out_data = {}
         for card, offers in in_data.items():
-            if card.amount > 1:
+            if not offers:
                 out_data[card] = offers
                 continue
-            offers.sort(key=lambda x: x.price)
-            base_price = offers[0].price + offers[0].seller.shipping
-            new_offers = []
-            for offer in offers:
-                if offer.price <= base_price:
-                    new_offers.append(offer)
-            out_data[card] = new_offers
-            self._logger.info(f"Reduced amount of offers for {card.name} from {len(offers)} to {len(new_offers)}")
+            offers = sorted(zip(offers, seller_ids[card]), key=lambda x: x[0].price)
+            limit = self.price_limit([x for x, _ in offers], card.amount) if self._max_sellers is None else math.inf
+            cheapest_offer = offers[0][0]
+            out_data[card] = [x for x, seller_id in offers if x.price <= limit and
+                              (card.amount > 1 or x is cheapest_offer or seller_counts[seller_id] > 1)]
+            self._logger.info(f"Reduced offer-count for '{card.name}' from {len(offers)} to {len(out_data[card])}")
         return out_data
@@ -1,67 +1,71 @@
-import copy
-import logging
+from typing import Optional
 
+from card import Card
 from offer import Offer
+from seller import Seller
 
 
 class OfferSet:
+    """
+    Cheapest distribution of the wanted amount of a card over a set of offers.
+    Immutable, the offers and sellers are calculated once on creation, the seller set and the hash on first use.
+    """
+    __slots__ = ("_price", "_offers", "_amounts", "_sellers", "_seller_set", "_hash")
     _price: float
-    _distribution: dict[Offer, int]
-    _logger: logging.Logger
+    _offers: tuple[Offer, ...]
+    _amounts: tuple[int, ...]
+    _sellers: tuple[Seller, ...]
+    _seller_set: Optional[frozenset[Seller]]
+    _hash: Optional[int]
 
     def __init__(self, offers: list[Offer]):
-        self._logger = logging.getLogger(self.__class__.__name__)
-
-        checked = []
+        if len(set(offers)) != len(offers):
+            raise ValueError(f"Double Element detected in '{[str(x) for x in offers]}'")
+        card = offers[0].card
         for offer in offers:
-            if offer in checked:
-                raise ValueError(f"Double Element '{offer}' detected")
-            if offer.card != offers[0].card:
+            if offer.card != card:
                 raise ValueError("All offers must be for the same card")
-            checked.append(offer)
 
-        self._distribution = self._calc_distribution(offers)
-        self._distribution = self._remove_unused_offers()
-        self._price = sum([offer.price * amount for offer, amount in self._distribution.items()])
+        used = []
+        amounts = []
+        missing = card.amount
+        for offer in sorted(offers, key=lambda x: (x.price, -x.amount)):
+            if missing <= 0:
+                break
+            amount = min(offer.amount, missing)
+            if amount > 0:
+                used.append(offer)
+                amounts.append(amount)
+                missing -= amount
+        self._offers = tuple(used)
+        self._amounts = tuple(amounts)
+        self._price = sum([offer.price * amount for offer, amount in zip(used, amounts)])
+        self._sellers = tuple([x.seller for x in used])
+        self._seller_set = None
+        self._hash = None
 
     def __str__(self):
-        return f"{len(self._distribution)} offers for {self.card.name} by {', '.join([x.name for x in self.sellers])}"
+        return f"{len(self._offers)} offers for {self.card.name} by {', '.join([x.name for x in self.sellers])}"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, OfferSet):
             raise NotImplementedError()
-        return self.offers == other.offers
+        return self._offers == other._offers
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self._offers)
+        return self._hash
 
     def __lt__(self, other):
         if not isinstance(other, OfferSet):
             raise NotImplementedError()
         return self.price < other.price
 
-    def _remove_unused_offers(self):
-        out_distribution = {}
-        for offer, amount in self._distribution.items():
-            if amount != 0:
-                out_distribution[offer] = amount
-        return out_distribution
-
-    @staticmethod
-    def _calc_distribution(offers: list[Offer]) -> dict[Offer, int]:
-        offers.sort(key=lambda x: (x.price, -x.amount))
-        dist = {}
-        added_cards = 0
-        target_amount = offers[0].card.amount
-        for offer in offers:
-            local_amount = 0
-            for i in range(offer.amount):
-                if added_cards >= target_amount:
-                    break
-                local_amount += 1
-                added_cards += 1
-            dist[offer] = local_amount
-        return dist
-
     def get_amount_for_offer(self, offer: Offer) -> int:
-        return self._distribution[offer]
+        return self._amounts[self._offers.index(offer)]
 
     @property
     def price(self) -> float:
@@ -71,17 +75,24 @@ class OfferSet:
         return self._price
 
     @property
-    def offers(self) -> list[Offer]:
-        return [x for x in self._distribution]
+    def offers(self) -> tuple[Offer, ...]:
+        return self._offers
+
+    @property
+    def card(self) -> Card:
+        return self._offers[0].card
 
     @property
-    def card(self):
-        return self.offers[0].card
+    def sellers(self) -> tuple[Seller, ...]:
+        return self._sellers
 
     @property
-    def sellers(self):
-        return [x.seller for x in self._distribution]
+    def seller_set(self) -> frozenset[Seller]:
+        """The sellers as a set, for fast membership tests"""
+        if self._seller_set is None:
+            self._seller_set = frozenset(self._sellers)
+        return self._seller_set
 
     @property
     def cards_available(self) -> int:
-        return sum([x.amount for x in self._distribution])
+        return sum([x.amount for x in self._offers])
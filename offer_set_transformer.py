@@ -1,18 +1,33 @@
 import logging
+import math
+from typing import Optional
 
 from card import Card
 from offer import Offer
 from offer_set import OfferSet
+from registry import Registry
+from seller import Seller
 from set_creator import OfferSetCreator
 
 
 class OfferSetTransformer:
     _logger: logging.Logger
+    _max_sellers: Optional[int]
+    _registry: Registry
     _data: dict[Card, list[OfferSet]]
 
-    def __init__(self, in_data: dict[Card, list[Offer]]):
+    def __init__(self, in_data: dict[Card, list[Offer]], max_sellers: Optional[int] = None,
+                 registry: Optional[Registry] = None):
+        """
+        :param in_data: The offers per card
+        :param max_sellers: The highest amount of sellers a combination may contain, None if there is no limit
+        :param registry: Registry the offers were interned in, passed on to the OfferSetCreator
+        """
         self._logger = logging.getLogger(self.__class__.__name__)
+        self._max_sellers = max_sellers
+        self._registry = registry if registry is not None else Registry()
         self._data = self._transform_to_sets(in_data)
+        self._data = self._remove_dominated_sets(self._data)
 
     @property
     def data(self):
@@ -21,6 +36,45 @@ class OfferSetTransformer:
     def _transform_to_sets(self, in_data: dict[Card, list[Offer]]) -> dict[Card, list[OfferSet]]:
         out_data: dict[Card, list[OfferSet]] = {}
         for card, offers in in_data.items():
-            out_data[card] = OfferSetCreator(offers).sets
+            out_data[card] = self._create_sets(offers, self._max_sellers is None, self._registry)
             self._logger.info(f"Created {len(out_data[card])} offer-sets for '{card.name}'")
         return out_data
+
+    @staticmethod
+    def _create_sets(offers: list[Offer], bounded: bool = True, registry: Optional[Registry] = None) \
+            -> list[OfferSet]:
+        """
+        Creates the offer sets for a card in ascending price, until no further set can be part of a cheaper
+        combination. A set costing more than an already created set plus the shipping of all its sellers can
+        always be replaced by that set. The replacement may add sellers to the combination, so the bound only
+        holds as long as sellers can be added freely.
+
+        :param offers: The offers for the card
+        :param bounded: Stops at the first set above the bound, all sets are created otherwise
+        :param registry: Registry the offers were interned in
+        :return: The offer sets in ascending price
+        """
+        sets: list[OfferSet] = []
+        limit = math.inf
+        for offer_set in OfferSetCreator(offers, registry).sets_by_price():
+            if bounded and round(offer_set.price, 2) > round(limit, 2):
+                break
+            sets.append(offer_set)
+            limit = min(limit, offer_set.price + sum([x.shipping for x in offer_set.sellers]))
+        return sets
+
+    def _remove_dominated_sets(self, in_data: dict[Card, list[OfferSet]]) -> dict[Card, list[OfferSet]]:
+        """
+        Removes every offer set for which another set for the same card exists, that costs no more
+        and only uses a subset of its sellers, since such a set can never be part of a unique optimum.
+        """
+        out_data: dict[Card, list[OfferSet]] = {}
+        for card, offer_sets in in_data.items():
+            kept: list[tuple[OfferSet, frozenset[Seller]]] = []
+            for offer_set in sorted(offer_sets, key=lambda x: (x.price, len(x.sellers))):
+                sellers = offer_set.seller_set
+                if not any(other_sellers <= sellers for _, other_sellers in kept):
+                    kept.append((offer_set, sellers))
+            out_data[card] = [x for x, _ in kept]
+            self._logger.info(f"Reduced offer-sets for '{card.name}' from {len(offer_sets)} to {len(out_data[card])}")
+        return out_data
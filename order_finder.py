@@ -1,10 +1,50 @@
+import enum
+import heapq
+import itertools
 import logging
+import math
 import threading
 from typing import Optional
 
 from card import Card
+from greedy_solver import GreedySolver
 from offer_collection import OfferCollection
 from offer_set import OfferSet
+from leaf_evaluator import LeafEvaluator
+from search_counters import SearchCounters
+from search_state import SearchState
+
+# Upper limit for the amount of combinations evaluated in one batch by the LeafEvaluator
+_max_vectorized_checks = 2 ** 18
+# Upper limit for the memory in bytes the LeafEvaluator may use for one batch
+_max_vectorized_bytes = 2 ** 25
+
+# Fields of the SearchCounters of a search, shared with the searches running in other threads or processes
+counter_performed = 0
+counter_skipped = 1
+counter_visited = 2
+counter_pruned = 3
+counter_fields = 4
+
+
+class NoCombinationError(Exception):
+    pass
+
+
+class CardOrder(enum.Enum):
+    SetCount = "set-count"
+    """Cards with the most offer sets first"""
+    MostConstrained = "most-constrained"
+    """Cards with the fewest offer sets and sellers first"""
+    PriceSpread = "price-spread"
+    """Cards with the highest difference between their cheapest and most expensive set first"""
+
+
+class SetOrder(enum.Enum):
+    Price = "price"
+    """Offer sets ordered by their price"""
+    MarginalPrice = "marginal-price"
+    """Offer sets ordered by their price plus shipping for sellers not used by the current combination yet"""
 
 
 class OrderFinder:
@@ -12,8 +52,20 @@ class OrderFinder:
     _lock: threading.Lock
     _offer_sets: list[list[OfferSet]]
     _all_cards: list[Card]
-    _performed_checks: int
+    _counters: SearchCounters
     _total_checks: int
+    _branch_and_bound: bool
+    _remaining_min: list[float]
+    _subtree_checks: list[int]
+    _leaf_evaluator: Optional[LeafEvaluator]
+    _vectorized_card: int
+    _set_order: SetOrder
+    _max_sellers: Optional[int]
+    _alternatives: int
+    _best_offers: list[tuple[float, int, OfferCollection]]
+    _best_keys: set[frozenset[int]]
+    _best_counter: itertools.count
+    _lowest_offer: Optional[OfferCollection]
 
     _total_threads: int
     _threads_started: int
@@ -21,24 +73,52 @@ class OrderFinder:
     _lock: threading.Lock
     _returned_offer_collections: list[OfferCollection]
 
-    def __init__(self, all_offers: dict[Card, list[OfferSet]]):
+    def __init__(self, all_offers: dict[Card, list[OfferSet]], branch_and_bound: bool = False,
+                 vectorized_levels: int = 0, card_order: CardOrder = CardOrder.SetCount,
+                 set_order: SetOrder = SetOrder.Price, greedy_start: bool = False, max_sellers: Optional[int] = None):
         self._logger = logging.getLogger(self.__class__.__name__)
         self._lock = threading.Lock()
         self._all_cards = [x for x in all_offers.keys()]
-        self._performed_checks = 0
+        self._counters = SearchCounters(counter_fields)
+        self._branch_and_bound = branch_and_bound
+        self._set_order = set_order
+        self._max_sellers = max_sellers
 
-        self._offer_sets = [y for x, y in all_offers.items()]
-        self._offer_sets.sort(key=len)
-        self._offer_sets.reverse()
+        all_offers = self._limit_sellers(all_offers)
+        self._offer_sets = [sorted(y) for x, y in all_offers.items()]
+        self._sort_cards(card_order)
 
         self._total_checks = 1
         for offer_sets in self._offer_sets:
             self._total_checks *= len(offer_sets)
+
+        # Cheapest possible price and number of leaves for every suffix of the card list
+        self._remaining_min = [0.0]
+        self._subtree_checks = [1]
+        for offer_sets in reversed(self._offer_sets):
+            self._remaining_min.insert(0, self._remaining_min[0] + min([x.price for x in offer_sets]))
+            self._subtree_checks.insert(0, self._subtree_checks[0] * len(offer_sets))
+
+        # The first card is never vectorized, since the threads split the search on it
+        vectorized_levels = max(0, min(vectorized_levels, len(self._offer_sets) - 1))
+        while vectorized_levels > 0 and (
+                self._subtree_checks[-vectorized_levels - 1] > _max_vectorized_checks or
+                LeafEvaluator.required_bytes(self._offer_sets[-vectorized_levels:]) > _max_vectorized_bytes):
+            vectorized_levels -= 1
+        self._vectorized_card = len(self._offer_sets) - vectorized_levels
+        self._leaf_evaluator = None
+        if vectorized_levels > 0:
+            self._leaf_evaluator = LeafEvaluator(self._offer_sets[self._vectorized_card:])
         self._logger.info(f"Created OrderFinder for {len(all_offers)} cards")
 
         self._lock = threading.Lock()
-        reference_sets = [x[0] for x in self._offer_sets]
-        self._lowest_offer = OfferCollection(reference_sets)
+        self._alternatives = 1
+        if greedy_start:
+            start_offer = GreedySolver(all_offers).find_lowest_offer()
+        else:
+            start_offer = OfferCollection([x[0] for x in self._offer_sets])
+        # Without a valid starting combination the first complete combination found becomes the best one
+        self._reset_best(start_offer if self._within_seller_limit(start_offer) else None)
 
     @property
     def total_checks(self) -> int:
@@ -46,16 +126,158 @@ class OrderFinder:
 
     @property
     def performed_checks(self) -> int:
-        with self._lock:
-            return self._performed_checks
+        return self._counters.get(counter_performed)
+
+    @property
+    def nodes_visited(self) -> int:
+        """The amount of partial and complete combinations evaluated during the search"""
+        return self._counters.get(counter_visited)
+
+    @property
+    def nodes_pruned(self) -> int:
+        """The amount of subtrees cut off by the branch-and-bound search"""
+        return self._counters.get(counter_pruned)
+
+    @property
+    def skipped_checks(self) -> int:
+        """The amount of complete combinations contained in the pruned subtrees"""
+        return self._counters.get(counter_skipped)
+
+    def _increment_check(self, amount: int = 1):
+        self._counters.slot()[counter_performed] += amount
+
+    def _increment_visited(self, amount: int = 1):
+        self._counters.slot()[counter_visited] += amount
+
+    def _increment_pruned(self, card_id: int, amount: int = 1):
+        counters = self._counters.slot()
+        counters[counter_pruned] += amount
+        counters[counter_skipped] += self._subtree_checks[card_id] * amount
+
+    @property
+    def max_sellers(self) -> Optional[int]:
+        """The highest amount of sellers a combination may contain, None if there is no limit"""
+        return self._max_sellers
+
+    def _limit_sellers(self, all_offers: dict[Card, list[OfferSet]]) -> dict[Card, list[OfferSet]]:
+        """
+        Drops all offer sets that exceed the seller limit on their own
 
-    def _increment_check(self):
+        :param all_offers: Offer sets for all cards
+        :return: The offer sets that can be part of a combination within the seller limit
+        :raises NoCombinationError: If no offer set of a card is within the seller limit
+        """
+        if self._max_sellers is None:
+            return all_offers
+        limited = {}
+        for card, offer_sets in all_offers.items():
+            limited[card] = [x for x in offer_sets if len(x.seller_set) <= self._max_sellers]
+            if not limited[card]:
+                raise NoCombinationError(f"'{card.name}' can not be bought from at most {self._max_sellers} sellers")
+            if len(limited[card]) < len(offer_sets):
+                self._logger.info(f"Reduced offer-sets for '{card.name}' from {len(offer_sets)} to "
+                                  f"{len(limited[card])} for at most {self._max_sellers} sellers")
+        return limited
+
+    def _within_seller_limit(self, offer: OfferCollection) -> bool:
+        return self._max_sellers is None or len(offer.sellers) <= self._max_sellers
+
+    def _exceeds_seller_limit(self, state: SearchState) -> bool:
+        return self._max_sellers is not None and state.seller_count > self._max_sellers
+
+    def _sort_cards(self, card_order: CardOrder):
+        if card_order == CardOrder.SetCount:
+            self._offer_sets.sort(key=len)
+            self._offer_sets.reverse()
+        elif card_order == CardOrder.MostConstrained:
+            self._offer_sets.sort(key=lambda x: (len(x), len({y for z in x for y in z.sellers})))
+        elif card_order == CardOrder.PriceSpread:
+            self._offer_sets.sort(key=lambda x: x[-1].price - x[0].price, reverse=True)
+
+    def _ordered_sets(self, state: SearchState, card_id: int) -> list[OfferSet]:
+        """
+        :return: The offer sets for the card in the order they should be checked in, given the search state
+        """
+        offer_sets = self._offer_sets[card_id]
+        if self._set_order == SetOrder.MarginalPrice:
+            return sorted(offer_sets, key=lambda x: GreedySolver.marginal_price(x, state.seller_refs))
+        return offer_sets
+
+    def _prunes_siblings(self) -> bool:
+        """
+        :return: If a pruned offer set implies, that all following sets for the same card can be pruned as well
+        """
+        return self._set_order == SetOrder.MarginalPrice
+
+    def _lower_bound(self, state: SearchState, card_id: int) -> float:
+        """
+        Calculates a price no combination starting with the partial offers can go below
+
+        :param state: Search state containing the offer sets for all cards before card_id
+        :param card_id: Index of the first card not contained in the search state
+        :return: The lower bound for the total price
+        """
+        return state.sum() + self._remaining_min[card_id]
+
+    def _reset_best(self, offer: Optional[OfferCollection]):
+        self._lowest_offer = offer
+        self._best_offers = []
+        self._best_keys = set()
+        self._best_counter = itertools.count()
+        if offer is not None:
+            self._insert_best(offer)
+
+    def _insert_best(self, offer: OfferCollection):
+        key = frozenset(id(x) for x in offer.offer_sets)
+        if key in self._best_keys:
+            return
+        # The counter keeps the heap from ever comparing two collections with the same total
+        heapq.heappush(self._best_offers, (-offer.sum(), next(self._best_counter), offer))
+        self._best_keys.add(key)
+        if len(self._best_offers) > self._alternatives:
+            _, _, removed = heapq.heappop(self._best_offers)
+            self._best_keys.remove(frozenset(id(x) for x in removed.offer_sets))
+
+    def _threshold(self) -> float:
+        """
+        :return: The total a combination has to go below to be recorded, the k-th best total found so far
+        """
+        best_offers = self._best_offers
+        if len(best_offers) < self._alternatives:
+            return math.inf
+        return -best_offers[0][0]
+
+    def _result(self) -> OfferCollection:
+        """
+        :return: The lowest combination found by the search
+        :raises NoCombinationError: If no combination is within the seller limit
+        """
         with self._lock:
-            self._performed_checks += 1
+            if self._lowest_offer is None:
+                raise NoCombinationError(f"No combination with at most {self._max_sellers} sellers exists")
+            return self._lowest_offer
 
     def find_lowest_offer(self, thread_count: int = 5) -> OfferCollection:
         self._logger.info(f"Searching for lowest combination in {self.total_checks} total combinations")
+        self._run_threads(thread_count)
+        return self._result()
+
+    def find_lowest_offers(self, k: int, thread_count: int = 5) -> list[OfferCollection]:
+        """
+        Searches for the k cheapest distinct combinations in a single search
+
+        :param k: Amount of combinations to return
+        :param thread_count: Amount of threads to search with
+        :return: The cheapest combinations, ordered by their total
+        """
+        self._logger.info(f"Searching for the {k} lowest combinations in {self.total_checks} total combinations")
+        with self._lock:
+            self._alternatives = max(1, k)
+        self._run_threads(thread_count)
+        with self._lock:
+            return [x for _, _, x in sorted(self._best_offers, key=lambda x: (-x[0], x[1]))]
 
+    def _run_threads(self, thread_count: int):
         if thread_count < 1:
             thread_count = 1
 
@@ -75,7 +297,7 @@ class OrderFinder:
         for i, t_range in enumerate(thread_ranges):
             t_name = f"Thread_[{t_range[0]}-{t_range[-1]}]"
             thread = threading.Thread(target=self._find_lowest,
-                                      args=[self._lowest_offer, 0, t_range],
+                                      args=[SearchState(), 0, t_range],
                                       name=t_name,
                                       daemon=True)
             self._logger.info(f"Creating thread {t_name} ({i + 1}/{len(thread_ranges)})")
@@ -88,28 +310,55 @@ class OrderFinder:
         for thread in threads:
             thread.join()
 
-        with self._lock:
-            return self._lowest_offer
-
-    def _find_lowest(self, reference_offers: OfferCollection, card_id: int, offer_range: Optional[list[int]] = None):
+    def _find_lowest(self, state: SearchState, card_id: int, offer_range: Optional[list[int]] = None):
         if offer_range is None:
             offer_range = range(len(self._offer_sets[card_id]))
-        card = self._offer_sets[card_id][0].card
-        buf_offer = reference_offers.remove(card)
-        offer_sets = self._offer_sets[card_id]
+        offer_sets = self._ordered_sets(state, card_id)
 
-        for i in offer_range:
-            offer = offer_sets[i]
-            checked_offer = buf_offer.add(offer)
-            if card_id < len(self._offer_sets) - 1:
+        for position, i in enumerate(offer_range):
+            state.push(offer_sets[i])
+            self._increment_visited()
+            if self._exceeds_seller_limit(state):
+                self._increment_pruned(card_id + 1)
+            elif card_id < len(self._offer_sets) - 1:
                 new_id = card_id + 1
-                self._find_lowest(checked_offer, new_id)
+                if self._branch_and_bound and self._lower_bound(state, new_id) >= self._threshold():
+                    if self._prunes_siblings():
+                        self._increment_pruned(new_id, len(offer_range) - position)
+                        state.pop()
+                        break
+                    self._increment_pruned(new_id)
+                elif new_id == self._vectorized_card:
+                    self._evaluate_leaves(state)
+                else:
+                    self._find_lowest(state, new_id)
             else:
                 self._increment_check()
-                self._update_lowest_offer(checked_offer)
+                if state.sum() < self._threshold():
+                    self._update_lowest_offer(state.to_collection())
+            state.pop()
+
+    def _evaluate_leaves(self, state: SearchState):
+        results = self._leaf_evaluator.evaluate(state, self._alternatives, self._max_sellers)
+        self._increment_visited(self._leaf_evaluator.size)
+        self._increment_check(self._leaf_evaluator.size)
+        for total, offer_sets in results:
+            if total >= self._threshold():
+                break
+            for offer_set in offer_sets:
+                state.push(offer_set)
+            self._update_lowest_offer(state.to_collection())
+            for _ in offer_sets:
+                state.pop()
 
     def _update_lowest_offer(self, offer: OfferCollection):
         with self._lock:
-            if offer.sum() < self._lowest_offer.sum():
+            if offer.sum() >= self._threshold():
+                return
+            if self._lowest_offer is None:
+                self._logger.info(f"Found first combination with {offer.sum()}")
+                self._lowest_offer = offer
+            elif offer.sum() < self._lowest_offer.sum():
                 self._logger.info(f"Replacing {self._lowest_offer.sum()} with {offer.sum()}")
                 self._lowest_offer = offer
+            self._insert_best(offer)
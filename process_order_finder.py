@@ -0,0 +1,336 @@
+import logging
+import multiprocessing
+import queue
+from typing import Optional
+
+from card import Card
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from order_finder import OrderFinder, CardOrder, counter_performed, counter_skipped, counter_visited, \
+    counter_pruned, counter_fields
+from seller import Seller
+
+# Nodes a worker processes between checking for idle workers and publishing its counters
+_split_interval = 1024
+# Seconds the parent waits for a result before checking whether a worker died
+_result_timeout = 1.0
+
+
+class SearchWorkerError(Exception):
+    pass
+
+
+class _SearchWorker:
+    """Branch-and-bound search over the compact offer set encoding, running inside a worker process"""
+    _worker_id: int
+    _prices: list[list[float]]
+    _sellers: list[list[tuple[int, ...]]]
+    _shipping: list[float]
+    _remaining_min: list[float]
+    _subtree_checks: list[int]
+    _max_sellers: int
+    _tasks: multiprocessing.Queue
+    _best_total: multiprocessing.Value
+    _pending: multiprocessing.Value
+    _idle: multiprocessing.Value
+    _counters: multiprocessing.Array
+
+    _local_counters: list[int]
+    _best: Optional[tuple[float, list[int]]]
+
+    def __init__(self, worker_id: int, prices: list[list[float]], sellers: list[list[tuple[int, ...]]],
+                 shipping: list[float], remaining_min: list[float], subtree_checks: list[int], max_sellers: int,
+                 tasks: multiprocessing.Queue, best_total: multiprocessing.Value, pending: multiprocessing.Value,
+                 idle: multiprocessing.Value, counters: multiprocessing.Array):
+        self._worker_id = worker_id
+        self._prices = prices
+        self._sellers = sellers
+        self._shipping = shipping
+        self._remaining_min = remaining_min
+        self._subtree_checks = subtree_checks
+        self._max_sellers = max_sellers
+        self._tasks = tasks
+        self._best_total = best_total
+        self._pending = pending
+        self._idle = idle
+        self._counters = counters
+        self._local_counters = [0] * counter_fields
+        self._best = None
+
+    def run(self) -> Optional[tuple[float, list[int]]]:
+        while True:
+            task = self._get_task()
+            if task is None:
+                break
+            self._search(task)
+            self._publish_counters()
+            with self._pending.get_lock():
+                self._pending.value -= 1
+        return self._best
+
+    def _get_task(self) -> Optional[list[int]]:
+        with self._idle.get_lock():
+            self._idle.value += 1
+        try:
+            while True:
+                try:
+                    return self._tasks.get(timeout=0.01)
+                except queue.Empty:
+                    if self._pending.value == 0:
+                        return None
+        finally:
+            with self._idle.get_lock():
+                self._idle.value -= 1
+
+    def _publish_counters(self):
+        base = self._worker_id * counter_fields
+        for i, value in enumerate(self._local_counters):
+            self._counters[base + i] = value
+
+    def _put_task(self, prefix: list[int]):
+        with self._pending.get_lock():
+            self._pending.value += 1
+        self._tasks.put(prefix)
+
+    def _split(self, stack: list[list[int]], chosen: list[int]):
+        """Hands the unexplored siblings of the shallowest open search level to the idle workers"""
+        for frame in stack:
+            card_id, next_index, end_index = frame
+            if next_index < end_index:
+                for i in range(next_index, end_index):
+                    self._put_task(chosen[:card_id] + [i])
+                frame[2] = next_index
+                return
+
+    def _search(self, prefix: list[int]):
+        prices = self._prices
+        sellers = self._sellers
+        shipping = self._shipping
+        remaining_min = self._remaining_min
+        max_sellers = self._max_sellers
+        counters = self._local_counters
+        last_card = len(prices) - 1
+        seller_refs = [0] * len(shipping)
+
+        total = 0.0
+        seller_count = 0
+        chosen = []
+
+        def push(card_id: int, index: int) -> float:
+            nonlocal seller_count
+            added = prices[card_id][index]
+            for seller in sellers[card_id][index]:
+                if seller_refs[seller] == 0:
+                    added += shipping[seller]
+                    seller_count += 1
+                seller_refs[seller] += 1
+            chosen.append(index)
+            return added
+
+        def pop(card_id: int) -> float:
+            nonlocal seller_count
+            index = chosen.pop()
+            removed = prices[card_id][index]
+            for seller in sellers[card_id][index]:
+                seller_refs[seller] -= 1
+                if seller_refs[seller] == 0:
+                    removed += shipping[seller]
+                    seller_count -= 1
+            return removed
+
+        for card_id, index in enumerate(prefix):
+            total += push(card_id, index)
+
+        if seller_count > max_sellers:
+            counters[counter_pruned] += 1
+            counters[counter_skipped] += self._subtree_checks[len(prefix)]
+            return
+
+        if len(prefix) > last_card:
+            counters[counter_performed] += 1
+            self._record(total, chosen)
+            return
+
+        if total + remaining_min[len(prefix)] >= self._best_total.value:
+            counters[counter_pruned] += 1
+            counters[counter_skipped] += self._subtree_checks[len(prefix)]
+            return
+
+        stack = [[len(prefix), 0, len(prices[len(prefix)])]]
+        nodes = 0
+        while stack:
+            frame = stack[-1]
+            card_id, index, end_index = frame
+            if index >= end_index:
+                stack.pop()
+                if stack:
+                    total -= pop(card_id - 1)
+                continue
+            frame[1] += 1
+
+            nodes += 1
+            if nodes % _split_interval == 0:
+                self._publish_counters()
+                if self._idle.value > 0:
+                    self._split(stack, chosen)
+
+            total += push(card_id, index)
+            counters[counter_visited] += 1
+            if seller_count > max_sellers:
+                counters[counter_pruned] += 1
+                counters[counter_skipped] += self._subtree_checks[card_id + 1]
+                total -= pop(card_id)
+            elif card_id == last_card:
+                counters[counter_performed] += 1
+                self._record(total, chosen)
+                total -= pop(card_id)
+            elif total + remaining_min[card_id + 1] >= self._best_total.value:
+                counters[counter_pruned] += 1
+                counters[counter_skipped] += self._subtree_checks[card_id + 1]
+                total -= pop(card_id)
+            else:
+                stack.append([card_id + 1, 0, len(prices[card_id + 1])])
+
+    def _record(self, total: float, chosen: list[int]):
+        if total >= self._best_total.value:
+            return
+        with self._best_total.get_lock():
+            if total < self._best_total.value:
+                self._best_total.value = total
+        if self._best is None or total < self._best[0]:
+            self._best = (total, list(chosen))
+
+
+def _run_worker(results: multiprocessing.Queue, *args):
+    worker = _SearchWorker(*args)
+    results.put(worker.run())
+
+
+class ProcessOrderFinder(OrderFinder):
+    """
+    Branch-and-bound OrderFinder running in multiple processes.
+    Subtrees are handed to idle workers on demand and the best known total is shared for pruning.
+    """
+    _sellers: list[Seller]
+    _counters: Optional[multiprocessing.Array]
+
+    def __init__(self, all_offers: dict[Card, list[OfferSet]], card_order: CardOrder = CardOrder.SetCount,
+                 greedy_start: bool = False, max_sellers: Optional[int] = None):
+        super().__init__(all_offers, branch_and_bound=True, card_order=card_order, greedy_start=greedy_start,
+                         max_sellers=max_sellers)
+        self._sellers = []
+        self._counters = None
+
+    @property
+    def performed_checks(self) -> int:
+        return self._read_counter(counter_performed)
+
+    @property
+    def skipped_checks(self) -> int:
+        return self._read_counter(counter_skipped)
+
+    @property
+    def nodes_visited(self) -> int:
+        return self._read_counter(counter_visited)
+
+    @property
+    def nodes_pruned(self) -> int:
+        return self._read_counter(counter_pruned)
+
+    def _read_counter(self, field: int) -> int:
+        counters = self._counters
+        if counters is None:
+            return 0
+        return sum(counters[i] for i in range(field, len(counters), counter_fields))
+
+    def _encode(self) -> tuple[list[list[float]], list[list[tuple[int, ...]]], list[float]]:
+        seller_ids: dict[Seller, int] = {}
+        prices = []
+        sellers = []
+        for offer_sets in self._offer_sets:
+            prices.append([x.price for x in offer_sets])
+            card_sellers = []
+            for offer_set in offer_sets:
+                ids = []
+                for seller in offer_set.sellers:
+                    if seller not in seller_ids:
+                        seller_ids[seller] = len(seller_ids)
+                    ids.append(seller_ids[seller])
+                card_sellers.append(tuple(ids))
+            sellers.append(card_sellers)
+        self._sellers = list(seller_ids.keys())
+        return prices, sellers, [x.shipping for x in self._sellers]
+
+    def find_lowest_offer(self, process_count: Optional[int] = None) -> OfferCollection:
+        """
+        :param process_count: Amount of worker processes, one per CPU if not given
+        :return: The lowest combination
+        :raises SearchWorkerError: If a worker process died before finishing its search
+        """
+        if process_count is None:
+            process_count = multiprocessing.cpu_count()
+        if process_count < 1:
+            process_count = 1
+        self._logger.info(f"Searching for lowest combination in {self.total_checks} total combinations "
+                          f"using {process_count} processes")
+
+        prices, sellers, shipping = self._encode()
+        max_sellers = len(shipping) if self._max_sellers is None else self._max_sellers
+        context = multiprocessing.get_context()
+        tasks = context.Queue()
+        results = context.Queue()
+        best_total = context.Value("d", self._threshold())
+        pending = context.Value("q", 1)
+        idle = context.Value("q", 0)
+        self._counters = context.Array("q", process_count * counter_fields, lock=False)
+        tasks.put([])
+
+        processes = []
+        for worker_id in range(process_count):
+            process = context.Process(target=_run_worker,
+                                      args=[results, worker_id, prices, sellers, shipping, self._remaining_min,
+                                            self._subtree_checks, max_sellers, tasks, best_total, pending, idle,
+                                            self._counters],
+                                      name=f"Worker_{worker_id}",
+                                      daemon=True)
+            self._logger.info(f"Starting process {process.name} ({worker_id + 1}/{process_count})")
+            process.start()
+            processes.append(process)
+
+        worker_results = self._collect_results(results, processes)
+
+        for result in worker_results:
+            if result is None:
+                continue
+            total, chosen = result
+            offer = OfferCollection([self._offer_sets[card_id][i] for card_id, i in enumerate(chosen)])
+            self._update_lowest_offer(offer)
+        return self._result()
+
+    def _collect_results(self, results: multiprocessing.Queue, processes: list[multiprocessing.Process]) \
+            -> list[Optional[tuple[float, list[int]]]]:
+        """
+        Waits for the result of every worker. The remaining workers would wait for the subtrees of a dead worker
+        forever, so all workers are stopped as soon as one of them dies.
+
+        :param results: Queue every worker puts its result into
+        :param processes: The worker processes
+        :return: The results of all workers
+        :raises SearchWorkerError: If a worker exited with an error
+        """
+        worker_results = []
+        while len(worker_results) < len(processes):
+            try:
+                worker_results.append(results.get(timeout=_result_timeout))
+            except queue.Empty:
+                failed = [x for x in processes if x.exitcode not in (None, 0)]
+                if failed:
+                    for process in processes:
+                        process.terminate()
+                        process.join()
+                    raise SearchWorkerError(f"Worker {failed[0].name} exited with code {failed[0].exitcode}")
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                raise SearchWorkerError(f"Worker {process.name} exited with code {process.exitcode}")
+        return worker_results
@@ -0,0 +1,108 @@
+import logging
+
+from card import Card
+from offer import Offer
+from seller import Seller
+
+
+class Registry:
+    """
+    Interns cards, sellers and offers, so equal objects loaded more than once share a single instance.
+    Every interned object gets a dense integer id, which is its index in the registry.
+    Objects are looked up by their value, so objects interned by another registry get an instance and id of their own.
+    """
+    _logger: logging.Logger
+    _cards: list[Card]
+    _sellers: list[Seller]
+    _offers: list[Offer]
+    _card_ids: dict[Card, int]
+    _seller_ids: dict[tuple[str, float], int]
+    _offer_ids: dict[tuple[Card, Seller, int, float, str], int]
+
+    def __init__(self):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._cards = []
+        self._sellers = []
+        self._offers = []
+        self._card_ids = {}
+        self._seller_ids = {}
+        self._offer_ids = {}
+
+    @property
+    def cards(self) -> list[Card]:
+        """All interned cards, indexed by their id"""
+        return self._cards
+
+    @property
+    def sellers(self) -> list[Seller]:
+        """All interned sellers, indexed by their id"""
+        return self._sellers
+
+    @property
+    def offers(self) -> list[Offer]:
+        """All interned offers, indexed by their id"""
+        return self._offers
+
+    def card(self, card: Card) -> Card:
+        """
+        :param card: Card to intern
+        :return: The interned card equal to the given one
+        """
+        if card not in self._card_ids:
+            self._card_ids[card] = len(self._cards)
+            self._cards.append(Card(list(card.expansions), card.name, card.amount, len(self._cards)))
+        return self._cards[self._card_ids[card]]
+
+    def seller(self, name: str, shipping: float) -> Seller:
+        """
+        :return: The interned seller with the name and shipping costs
+        """
+        key = (name, shipping)
+        if key not in self._seller_ids:
+            self._seller_ids[key] = len(self._sellers)
+            self._sellers.append(Seller(name, shipping, len(self._sellers)))
+        return self._sellers[self._seller_ids[key]]
+
+    def offer(self, card: Card, seller: Seller, amount: int, price: float, expansion: str) -> Offer:
+        """
+        :param card: The card of the offer, gets interned as well
+        :param seller: The seller of the offer, gets interned as well
+        :return: The interned offer with the given attributes
+        """
+        card = self.card(card)
+        seller = self.seller(seller.name, seller.shipping)
+        key = (card, seller, amount, price, expansion)
+        if key not in self._offer_ids:
+            self._offer_ids[key] = len(self._offers)
+            self._offers.append(Offer(card, seller, amount, price, expansion, len(self._offers)))
+        return self._offers[self._offer_ids[key]]
+
+    def card_id(self, card: Card) -> int:
+        """
+        :param card: Card interned by this registry, any other card gets interned first
+        :return: The id of the card in this registry
+        """
+        if card.registry_id is not None and card.registry_id < len(self._cards) and \
+                self._cards[card.registry_id] is card:
+            return card.registry_id
+        return self.card(card).registry_id
+
+    def seller_id(self, seller: Seller) -> int:
+        """
+        :param seller: Seller interned by this registry, any other seller gets interned first
+        :return: The id of the seller in this registry
+        """
+        if seller.registry_id is not None and seller.registry_id < len(self._sellers) and \
+                self._sellers[seller.registry_id] is seller:
+            return seller.registry_id
+        return self.seller(seller.name, seller.shipping).registry_id
+
+    def offer_id(self, offer: Offer) -> int:
+        """
+        :param offer: Offer interned by this registry, any other offer gets interned first
+        :return: The id of the offer in this registry
+        """
+        if offer.registry_id is not None and offer.registry_id < len(self._offers) and \
+                self._offers[offer.registry_id] is offer:
+            return offer.registry_id
+        return self.offer(offer.card, offer.seller, offer.amount, offer.price, offer.expansion).registry_id
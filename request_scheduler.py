@@ -0,0 +1,228 @@
+import datetime
+import email.utils
+import logging
+import math
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# Requests per second every host starts with, and the limits the rate is adjusted within
+_initial_rate = 8.0
+_min_rate = 0.2
+_max_rate = 64.0
+# Factor the rate and the concurrency are multiplied with when a host signals overload
+_decrease = 0.5
+# Seconds after a decrease in which further overload signals are considered part of the same episode
+_decrease_interval = 1.0
+# Base and cap in seconds of the exponential backoff between retries
+_backoff_base = 0.5
+_backoff_max = 30.0
+# Longest Retry-After in seconds that is honoured, so a misbehaving server can not stall the run
+_max_retry_after = 120.0
+
+
+class _HostState:
+    """
+    Token bucket and concurrency window of a single host
+    """
+    rate: float
+    tokens: float
+    refilled: float
+    limit: float
+    active: int
+    blocked_until: float
+    decreased: float
+
+    def __init__(self, rate: float, limit: float, burst: float, now: float):
+        self.rate = rate
+        self.tokens = burst
+        self.refilled = now
+        self.limit = limit
+        self.active = 0
+        self.blocked_until = now
+        self.decreased = now - _decrease_interval
+
+    def refill(self, now: float, burst: float):
+        self.tokens = min(burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        :return: Seconds until the host may be sent the next request, apart from the concurrency window
+        """
+        token_wait = (1.0 - self.tokens) / self.rate if self.tokens < 1.0 else 0.0
+        return max(self.blocked_until - now, token_wait)
+
+
+class RequestScheduler:
+    """
+    Decides when requests may be sent, to reach the highest throughput a host tolerates without manual tuning.
+    Every host gets a token bucket limiting its request rate and a window limiting its concurrent requests.
+    Both grow additively with every successful response and shrink multiplicatively when the host answers with
+    429 or a server error (AIMD), so they settle just below the limit of the host.
+    A Retry-After header pauses all requests to the host for the given time.
+    Safe to be used from multiple threads.
+    """
+    _logger: logging.Logger
+    _max_per_host: int
+    _initial_rate: float
+    _burst: float
+    _condition: threading.Condition
+    _hosts: dict[str, _HostState]
+    _rng: random.Random
+    _clock: Callable[[], float]
+    _requests: int
+    _throttled: int
+    _retries: int
+
+    def __init__(self, max_per_host: int, initial_rate: float = _initial_rate, rng: Optional[random.Random] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param max_per_host: Highest amount of requests sent to a single host at the same time
+        :param initial_rate: Requests per second every host starts with
+        :param rng: Random number generator for the backoff jitter
+        :param clock: Monotonic clock in seconds the rates and pauses are measured with
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._max_per_host = max(1, max_per_host)
+        self._initial_rate = min(_max_rate, max(_min_rate, initial_rate))
+        self._burst = float(self._max_per_host)
+        self._condition = threading.Condition()
+        self._hosts = {}
+        self._rng = rng if rng is not None else random.Random()
+        self._clock = clock
+        self._requests = 0
+        self._throttled = 0
+        self._retries = 0
+
+    @property
+    def requests(self) -> int:
+        """Amount of requests sent to all hosts"""
+        return self._requests
+
+    @property
+    def throttled(self) -> int:
+        """Amount of requests answered with 429, a server error or no answer at all"""
+        return self._throttled
+
+    @property
+    def retries(self) -> int:
+        """Amount of requests that were repeated after a backoff"""
+        return self._retries
+
+    def rate(self, host: str) -> float:
+        """
+        :return: Current requests per second allowed for the host
+        """
+        with self._condition:
+            return self._hosts[host].rate if host in self._hosts else self._initial_rate
+
+    def concurrency(self, host: str) -> int:
+        """
+        :return: Current amount of requests allowed to be sent to the host at the same time
+        """
+        with self._condition:
+            return max(1, int(self._hosts[host].limit)) if host in self._hosts else self._max_per_host
+
+    def _state(self, host: str) -> _HostState:
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self._initial_rate, self._max_per_host, self._burst, self._clock())
+        return self._hosts[host]
+
+    def _wait_time(self, state: _HostState) -> float:
+        now = self._clock()
+        state.refill(now, self._burst)
+        if state.active >= max(1, int(state.limit)):
+            return math.inf
+        return max(0.0, state.wait_time(now))
+
+    def wait_time(self, host: str) -> float:
+        """
+        :return: Seconds until a request may be sent to the host, infinite if it has to wait for a release
+        """
+        with self._condition:
+            return self._wait_time(self._state(host))
+
+    def acquire(self, host: str) -> None:
+        """
+        Blocks until a request may be sent to the host. Every call has to be followed by a call to release.
+
+        :param host: The host the request is sent to
+        :return: None
+        """
+        with self._condition:
+            state = self._state(host)
+            while True:
+                wait = self._wait_time(state)
+                if wait == 0:
+                    state.tokens -= 1.0
+                    state.active += 1
+                    self._requests += 1
+                    return
+                # Without a timeout woken up by release
+                self._condition.wait(wait if wait < math.inf else None)
+
+    def release(self, host: str, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """
+        Finishes a request and adjusts rate and concurrency of the host to its outcome
+
+        :param host: The host the request was sent to
+        :param status: Status code of the response, None if no response was received
+        :param retry_after: Seconds the host asked to wait before the next request
+        :return: None
+        """
+        with self._condition:
+            state = self._state(host)
+            state.active -= 1
+            now = self._clock()
+            if status is None or status == 429 or status >= 500:
+                self._throttled += 1
+                if now - state.decreased >= _decrease_interval:
+                    state.rate = max(_min_rate, state.rate * _decrease)
+                    state.limit = max(1.0, state.limit * _decrease)
+                    state.decreased = now
+                    self._logger.info(f"Slowing down requests to '{host}' to {round(state.rate, 2)}/s with "
+                                      f"{int(state.limit)} at the same time after status {status}")
+                if retry_after is not None:
+                    state.blocked_until = max(state.blocked_until, now + min(retry_after, _max_retry_after))
+            else:
+                # Additive increase of about one request per second and one concurrent request per window
+                state.rate = min(_max_rate, state.rate + 1.0 / state.rate)
+                state.limit = min(float(self._max_per_host), state.limit + 1.0 / state.limit)
+            self._condition.notify_all()
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Counts a retry and calculates how long to wait before it, with an exponential backoff and full jitter
+
+        :param attempt: Amount of previous retries of the request
+        :param retry_after: Seconds the host asked to wait, used as lower bound
+        :return: Seconds to wait before retrying
+        """
+        with self._condition:
+            self._retries += 1
+            delay = self._rng.uniform(0, min(_backoff_max, _backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, _max_retry_after))
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        :param value: Retry-After header, either in seconds or as HTTP date
+        :return: Seconds to wait, None if the header is missing or invalid
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=datetime.timezone.utc)
+        return max(0.0, date.timestamp() - time.time())
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+# Default time in seconds a cached page is used without asking the server
+default_max_age = 600.0
+# Default size in bytes the cache directory may grow to before the least recently used pages are removed
+_max_size = 256 * 1024 * 1024
+
+
+class CachedResponse:
+    """
+    Body of a cached page with the validators the server sent along with it
+    """
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    validated: float
+
+    def __init__(self, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 validated: Optional[float] = None):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.validated = validated if validated is not None else time.time()
+
+    def validators(self) -> dict[str, str]:
+        """
+        :return: Headers for a conditional request, empty if the server sent no validators
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Persistent cache of downloaded pages, keyed by URI and query parameters.
+    Every page is stored in its own file in the cache directory, so the cache survives between runs.
+    Pages younger than max_age are used without a request, older ones have to be revalidated with the server.
+    When the directory grows larger than max_size, the least recently used pages are removed.
+    Safe to be used from multiple threads.
+    """
+    _logger: logging.Logger
+    _cache_dir: str
+    _max_age: float
+    _max_size: int
+    _lock: threading.Lock
+    # Size and time of last use per cache file
+    _entries: dict[str, tuple[int, float]]
+    _size: int
+    _hits: int
+    _revalidations: int
+    _misses: int
+
+    def __init__(self, cache_dir: str, max_age: float = default_max_age, max_size: int = _max_size):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._cache_dir = os.path.realpath(cache_dir)
+        self._max_age = max_age
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._revalidations = 0
+        self._misses = 0
+        os.makedirs(self._cache_dir, exist_ok=True)
+        self._entries = {}
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self._cache_dir, name))
+            self._entries[name] = (stat.st_size, stat.st_mtime)
+        self._size = sum([x for x, _ in self._entries.values()])
+        self._logger.info(f"Opened cache with {len(self._entries)} pages and {self._size} bytes")
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @property
+    def size(self) -> int:
+        """Size of all cached pages in bytes"""
+        return self._size
+
+    @property
+    def hits(self) -> int:
+        """Amount of pages used without a request"""
+        return self._hits
+
+    @property
+    def revalidations(self) -> int:
+        """Amount of pages the server confirmed to be unchanged"""
+        return self._revalidations
+
+    @property
+    def misses(self) -> int:
+        """Amount of pages that had to be downloaded"""
+        return self._misses
+
+    @staticmethod
+    def _file_name(uri: str, params: dict) -> str:
+        key = json.dumps([uri, sorted(params.items())])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+
+    def is_fresh(self, response: CachedResponse) -> bool:
+        """
+        :return: If the response may be used without revalidating it
+        """
+        return time.time() - response.validated < self._max_age
+
+    def get(self, uri: str, params: dict) -> Optional[CachedResponse]:
+        """
+        Loads a page from the cache. Fresh pages count as hit, stale ones have to be revalidated or stored again.
+
+        :param uri: URI of the page
+        :param params: Query parameters of the page
+        :return: The cached page, None if it is not cached
+        """
+        name = self._file_name(uri, params)
+        path = os.path.join(self._cache_dir, name)
+        with self._lock:
+            if name not in self._entries:
+                return None
+        # The file is read without holding the lock, so other threads are not blocked by the I/O.
+        # Files are replaced atomically, a concurrent write or eviction can only make the read fail.
+        try:
+            with open(path, "r", encoding="utf-8") as file_p:
+                data = json.load(file_p)
+            response = CachedResponse(data["text"], data["etag"], data["last_modified"], data["validated"])
+            os.utime(path)
+        except (OSError, ValueError, KeyError) as err:
+            self._logger.warning(f"Dropping unreadable cache file '{name}': {err}")
+            with self._lock:
+                if name in self._entries:
+                    self._remove(name)
+            return None
+        with self._lock:
+            if name in self._entries:
+                self._entries[name] = (self._entries[name][0], time.time())
+            if self.is_fresh(response):
+                self._hits += 1
+        return response
+
+    def store(self, uri: str, params: dict, response: CachedResponse) -> None:
+        """
+        Stores a downloaded page, removing the least recently used pages if the cache gets too large
+
+        :param uri: URI of the page
+        :param params: Query parameters of the page
+        :param response: The downloaded page
+        :return: None
+        """
+        with self._lock:
+            self._misses += 1
+            self._write(self._file_name(uri, params), response)
+
+    def revalidated(self, uri: str, params: dict, response: CachedResponse) -> None:
+        """
+        Marks a cached page as fresh again after the server confirmed it to be unchanged
+
+        :param uri: URI of the page
+        :param params: Query parameters of the page
+        :param response: The cached page returned by get
+        :return: None
+        """
+        response.validated = time.time()
+        with self._lock:
+            self._revalidations += 1
+            self._write(self._file_name(uri, params), response)
+
+    def _write(self, name: str, response: CachedResponse) -> None:
+        data = json.dumps({
+            "text": response.text,
+            "etag": response.etag,
+            "last_modified": response.last_modified,
+            "validated": response.validated
+        }).encode("utf-8")
+        handle, temp_file = tempfile.mkstemp(suffix=".tmp", dir=self._cache_dir)
+        try:
+            with os.fdopen(handle, "wb") as file_p:
+                file_p.write(data)
+            os.replace(temp_file, os.path.join(self._cache_dir, name))
+        except OSError as err:
+            self._logger.warning(f"Could not write cache file '{name}': {err}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return
+        if name in self._entries:
+            self._size -= self._entries[name][0]
+        self._entries[name] = (len(data), time.time())
+        self._size += len(data)
+        self._evict(name)
+
+    def _evict(self, keep: str) -> None:
+        """
+        Removes the least recently used pages until the cache fits into max_size again
+
+        :param keep: Page that was just written and is kept in any case
+        :return: None
+        """
+        if self._size <= self._max_size:
+            return
+        for name, _ in sorted(self._entries.items(), key=lambda x: x[1][1]):
+            if self._size <= self._max_size:
+                break
+            if name != keep:
+                self._remove(name)
+
+    def _remove(self, name: str) -> None:
+        size, _ = self._entries.pop(name)
+        self._size -= size
+        try:
+            os.remove(os.path.join(self._cache_dir, name))
+        except OSError:
+            pass
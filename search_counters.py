@@ -0,0 +1,54 @@
+import threading
+
+
+class SearchCounters:
+    """
+    Progress counters of a search shared by multiple threads.
+    Every thread increments its own slot without locking, the slots are only summed up when a total is read,
+    so reading may lag behind the search by a few increments but never slows it down.
+    """
+    _field_count: int
+    _lock: threading.Lock
+    _local: threading.local
+    _slots: list[list[int]]
+
+    def __init__(self, field_count: int):
+        self._field_count = field_count
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._slots = []
+
+    def slot(self) -> list[int]:
+        """
+        :return: The counters of the calling thread, only this thread may modify them
+        """
+        try:
+            return self._local.slot
+        except AttributeError:
+            slot = [0] * self._field_count
+            with self._lock:
+                self._slots.append(slot)
+            self._local.slot = slot
+            return slot
+
+    def add(self, field: int, amount: int = 1):
+        self.slot()[field] += amount
+
+    def get(self, field: int) -> int:
+        """
+        :return: The sum of the field over all threads
+        """
+        return sum([x[field] for x in self._slots])
+
+    def set(self, field: int, value: int):
+        """
+        Overwrites the total of a field, must not be called while other threads are counting
+
+        :param field: The field to overwrite
+        :param value: The new total
+        :return: None
+        """
+        with self._lock:
+            for slot in self._slots:
+                slot[field] = 0
+        self.slot()[field] = value
@@ -0,0 +1,67 @@
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from seller import Seller
+
+
+class SearchState:
+    """
+    Mutable stack of offer sets used while searching.
+    Keeps a running price and reference counts per seller, so sets can be pushed and popped without copying.
+    """
+    _offer_sets: list[OfferSet]
+    _seller_refs: dict[Seller, int]
+    _price: float
+    _shipping: float
+
+    def __init__(self):
+        self._offer_sets = []
+        self._seller_refs = {}
+        self._price = 0.0
+        self._shipping = 0.0
+
+    def __len__(self):
+        return len(self._offer_sets)
+
+    @property
+    def price(self) -> float:
+        """Price of all offer sets without shipping"""
+        return self._price
+
+    @property
+    def seller_refs(self) -> dict[Seller, int]:
+        """Amount of offer sets per seller, must not be modified"""
+        return self._seller_refs
+
+    @property
+    def seller_count(self) -> int:
+        return len(self._seller_refs)
+
+    def has_seller(self, seller: Seller) -> bool:
+        return seller in self._seller_refs
+
+    def sum(self) -> float:
+        return self._price + self._shipping
+
+    def push(self, offer_set: OfferSet):
+        self._offer_sets.append(offer_set)
+        self._price += offer_set.price
+        for seller in offer_set.sellers:
+            refs = self._seller_refs.get(seller, 0)
+            if refs == 0:
+                self._shipping += seller.shipping
+            self._seller_refs[seller] = refs + 1
+
+    def pop(self) -> OfferSet:
+        offer_set = self._offer_sets.pop()
+        self._price -= offer_set.price
+        for seller in offer_set.sellers:
+            refs = self._seller_refs[seller] - 1
+            if refs == 0:
+                self._shipping -= seller.shipping
+                del self._seller_refs[seller]
+            else:
+                self._seller_refs[seller] = refs
+        return offer_set
+
+    def to_collection(self) -> OfferCollection:
+        return OfferCollection(list(self._offer_sets))
@@ -1,21 +1,31 @@
+from typing import Optional
+
+
 class Seller:
+    __slots__ = ("_name", "_shipping", "_registry_id", "_hash")
     _name: str
     _shipping: float
+    _registry_id: Optional[int]
+    _hash: int
 
-    def __init__(self, name: str, shipping: float):
+    def __init__(self, name: str, shipping: float, registry_id: Optional[int] = None):
         self._name = name
         self._shipping = shipping
+        self._registry_id = registry_id
+        self._hash = hash((self._name, self._shipping))
 
     def __str__(self):
         return f"{self._name} ({self._shipping})"
 
     def __hash__(self):
-        return hash(str(self))
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Seller):
             raise NotImplementedError()
-        return self.name == other.name and self.shipping == other.shipping
+        return self._name == other._name and self._shipping == other._shipping
 
     def __lt__(self, other):
         if not isinstance(other, Seller):
@@ -29,3 +39,8 @@ class Seller:
     @property
     def shipping(self) -> float:
         return self._shipping
+
+    @property
+    def registry_id(self) -> Optional[int]:
+        """Dense id assigned by the Registry, None if the seller was not interned"""
+        return self._registry_id
@@ -0,0 +1,114 @@
+import logging
+from typing import Optional
+
+from card import Card
+from offer import Offer
+from registry import Registry
+
+
+class SellerDominanceFilter:
+    """
+    Removes sellers that another seller beats on every card of the wantlist.
+    A seller is dominated if another seller has no higher shipping and, for every card the seller offers,
+    an offer at no higher price that covers all wanted copies on its own. Any combination using the dominated
+    seller can then buy the same copies from the other seller instead, without getting more expensive.
+    The replacement never adds a seller to the combination, so the filter also holds if the amount of sellers
+    is limited.
+    Of sellers dominating each other, the one appearing first is kept.
+    """
+    _logger: logging.Logger
+    _registry: Registry
+    _data: dict[Card, list[Offer]]
+    _removed_sellers: int
+    _removed_offers: int
+
+    def __init__(self, data: dict[Card, list[Offer]], registry: Optional[Registry] = None):
+        """
+        :param data: The offers per card
+        :param registry: Registry the offers were interned in, cards and sellers are compared by their id in it
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._registry = registry if registry is not None else Registry()
+        self._data = self._remove_dominated_sellers(data)
+
+    @property
+    def data(self) -> dict[Card, list[Offer]]:
+        return self._data
+
+    @property
+    def removed_sellers(self) -> int:
+        return self._removed_sellers
+
+    @property
+    def removed_offers(self) -> int:
+        return self._removed_offers
+
+    @staticmethod
+    def _dominates(prices: dict[int, float], covers: dict[int, float]) -> bool:
+        """
+        :param prices: Cheapest price per card of the dominated seller
+        :param covers: Cheapest price per card of an offer covering all wanted copies of the dominating seller
+        :return: If the covering offers are no more expensive for every card
+        """
+        for card, price in prices.items():
+            cover = covers.get(card)
+            if cover is None or cover > price:
+                return False
+        return True
+
+    def _remove_dominated_sellers(self, in_data: dict[Card, list[Offer]]) -> dict[Card, list[Offer]]:
+        seller_ids = {card: [self._registry.seller_id(x.seller) for x in offers] for card, offers in in_data.items()}
+        # Cheapest offer per card and seller, and cheapest offer able to cover all copies per card and seller
+        prices: dict[int, dict[int, float]] = {}
+        covers: dict[int, dict[int, float]] = {}
+        covering_sellers: dict[int, list[int]] = {}
+        for card, offers in in_data.items():
+            card_id = self._registry.card_id(card)
+            for offer, seller_id in zip(offers, seller_ids[card]):
+                seller_prices = prices.setdefault(seller_id, {})
+                seller_prices[card_id] = min(offer.price, seller_prices.get(card_id, offer.price))
+                if offer.amount >= card.amount:
+                    seller_covers = covers.setdefault(seller_id, {})
+                    if card_id not in seller_covers:
+                        covering_sellers.setdefault(card_id, []).append(seller_id)
+                    seller_covers[card_id] = min(offer.price, seller_covers.get(card_id, offer.price))
+
+        order = {x: i for i, x in enumerate(prices)}
+        dominated: set[int] = set()
+        for seller_id, seller_prices in prices.items():
+            dominator = self._find_dominator(seller_id, seller_prices, prices, covers, covering_sellers, order)
+            if dominator is not None:
+                self._logger.debug(f"Seller '{self._registry.sellers[seller_id].name}' is dominated by "
+                                   f"'{self._registry.sellers[dominator].name}'")
+                dominated.add(seller_id)
+
+        out_data = {}
+        self._removed_offers = 0
+        for card, offers in in_data.items():
+            out_data[card] = [x for x, seller_id in zip(offers, seller_ids[card]) if seller_id not in dominated]
+            self._removed_offers += len(offers) - len(out_data[card])
+        self._removed_sellers = len(dominated)
+        self._logger.info(f"Removed {self._removed_sellers} dominated sellers with {self._removed_offers} offers")
+        return out_data
+
+    def _find_dominator(self, seller: int, seller_prices: dict[int, float],
+                        prices: dict[int, dict[int, float]], covers: dict[int, dict[int, float]],
+                        covering_sellers: dict[int, list[int]], order: dict[int, int]) -> Optional[int]:
+        """
+        :return: Id of a seller dominating the seller with the given id, None if there is none
+        """
+        shipping = self._registry.sellers[seller].shipping
+        # Every dominating seller has to cover the first card of the seller
+        first_card = next(iter(seller_prices))
+        for other in covering_sellers.get(first_card, []):
+            other_shipping = self._registry.sellers[other].shipping
+            if other == seller or other_shipping > shipping:
+                continue
+            if not self._dominates(seller_prices, covers[other]):
+                continue
+            # Sellers dominating each other are equivalent, only the one appearing first is kept
+            if order[other] > order[seller] and other_shipping == shipping and \
+                    seller in covers and self._dominates(prices[other], covers[seller]):
+                continue
+            return other
+        return None
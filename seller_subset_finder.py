@@ -0,0 +1,131 @@
+import logging
+from typing import Optional
+
+from card import Card
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from seller import Seller
+
+# Maps the seller bitmask of a partial solution to its price and the state it was created from
+_States = dict[int, tuple[float, Optional[int], int]]
+
+# Amount of the cheapest kept states every state is checked for dominance against
+_dominance_window = 64
+
+
+class SellerSubsetFinder:
+    """
+    Finds the lowest combination by dynamic programming over subsets of sellers.
+    Fast as long as the amount of sellers remaining after filtering is small.
+    """
+    _logger: logging.Logger
+    _offer_sets: list[list[OfferSet]]
+    _sellers: list[Seller]
+    _masks: list[list[int]]
+    _shipping_cache: dict[int, float]
+    _remaining_min: list[float]
+    _states_checked: int
+
+    def __init__(self, all_offers: dict[Card, list[OfferSet]]):
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._offer_sets = [y for x, y in all_offers.items()]
+        self._offer_sets.sort(key=len)
+        self._states_checked = 0
+        self._shipping_cache = {}
+
+        seller_ids: dict[Seller, int] = {}
+        self._masks = []
+        for offer_sets in self._offer_sets:
+            card_masks = []
+            for offer_set in offer_sets:
+                mask = 0
+                for seller in offer_set.sellers:
+                    if seller not in seller_ids:
+                        seller_ids[seller] = len(seller_ids)
+                    mask |= 1 << seller_ids[seller]
+                card_masks.append(mask)
+            self._masks.append(card_masks)
+        self._sellers = list(seller_ids.keys())
+
+        # Lowest price of the cards after each card, without shipping
+        self._remaining_min = [0.0]
+        for offer_sets in reversed(self._offer_sets):
+            self._remaining_min.insert(0, self._remaining_min[0] + min([x.price for x in offer_sets]))
+        self._logger.info(f"Created SellerSubsetFinder for {len(all_offers)} cards and {len(self._sellers)} sellers")
+
+    @property
+    def seller_count(self) -> int:
+        return len(self._sellers)
+
+    @property
+    def states_checked(self) -> int:
+        """The amount of seller subsets evaluated during the search"""
+        return self._states_checked
+
+    def _shipping(self, mask: int) -> float:
+        if mask not in self._shipping_cache:
+            self._shipping_cache[mask] = sum([x.shipping for i, x in enumerate(self._sellers) if mask >> i & 1])
+        return self._shipping_cache[mask]
+
+    def _greedy_bound(self) -> float:
+        """
+        Builds a combination card by card, always taking the set that is cheapest including the shipping of the
+        sellers it adds. The lowest combination can not be more expensive.
+
+        :return: The total of the greedy combination
+        """
+        mask = 0
+        price = 0.0
+        for card_id, offer_sets in enumerate(self._offer_sets):
+            card_masks = self._masks[card_id]
+            best = min(range(len(offer_sets)),
+                       key=lambda i: offer_sets[i].price + self._shipping(card_masks[i] & ~mask))
+            price += offer_sets[best].price
+            mask |= card_masks[best]
+        return price + self._shipping(mask)
+
+    def _remove_dominated(self, states: _States) -> _States:
+        """
+        Removes states that can never be completed cheaper than another state.
+        A state is dominated if another state stays cheaper even when paying shipping for the sellers
+        only it contains, since every completion of the dominated state is available to the other one as well.
+        Every state is only compared to the cheapest kept states, which are the likeliest to dominate it,
+        so a step stays linear in the amount of states. Keeping a dominated state costs time, but no correctness.
+        """
+        kept: list[tuple[int, float]] = []
+        for mask in sorted(states, key=lambda x: states[x][0]):
+            price = states[mask][0]
+            if not any(other_price + self._shipping(other & ~mask) <= price
+                       for other, other_price in kept[:_dominance_window]):
+                kept.append((mask, price))
+        return {mask: states[mask] for mask, _ in kept}
+
+    def find_lowest_offer(self) -> OfferCollection:
+        self._logger.info(f"Searching for lowest combination over {len(self._sellers)} sellers")
+        # States that can not beat the greedy combination are dropped right away
+        upper_bound = self._greedy_bound() + 0.005
+        levels: list[_States] = []
+        states: _States = {0: (0.0, None, -1)}
+        for card_id, offer_sets in enumerate(self._offer_sets):
+            new_states: _States = {}
+            for mask, (price, _, _) in states.items():
+                for i, offer_set in enumerate(offer_sets):
+                    self._states_checked += 1
+                    new_mask = mask | self._masks[card_id][i]
+                    new_price = price + offer_set.price
+                    if new_price + self._shipping(new_mask) + self._remaining_min[card_id + 1] > upper_bound:
+                        continue
+                    if new_mask not in new_states or new_price < new_states[new_mask][0]:
+                        new_states[new_mask] = (new_price, mask, i)
+            states = self._remove_dominated(new_states)
+            levels.append(states)
+            self._logger.debug(f"{len(states)} seller subsets remaining after card {card_id + 1}")
+
+        best_mask = min(states, key=lambda x: states[x][0] + self._shipping(x))
+        chosen = []
+        mask = best_mask
+        for card_id in reversed(range(len(levels))):
+            _, parent, i = levels[card_id][mask]
+            chosen.append(self._offer_sets[card_id][i])
+            mask = parent
+        return OfferCollection(chosen)
@@ -1,43 +1,115 @@
+import heapq
+import itertools
 import logging
+from typing import Iterator, Optional
 
 from offer import Offer
 from offer_set import OfferSet
+from registry import Registry
 
 
 class OfferSetCreator:
+    """
+    Creates all distinct offer sets covering the wanted amount of a card.
+    Offers are combined in the order of their index, so every combination is only built once. Only combinations
+    that fall short of the wanted amount without their largest offer are created, any other combination would
+    contain an offer that is never needed.
+    """
     _logger: logging.Logger
+    _registry: Registry
     _offers: list[Offer]
-    _sets: list[OfferSet]
+    _sets: Optional[list[OfferSet]]
 
-    def __init__(self, offers: list[Offer]):
+    def __init__(self, offers: list[Offer], registry: Optional[Registry] = None):
+        """
+        :param offers: The offers for the card
+        :param registry: Registry the offers were interned in, cards and sellers are compared by their id in it
+        """
         self._logger = logging.getLogger(self.__class__.__name__)
-        self._sets = []
+        self._registry = registry if registry is not None else Registry()
+        self._sets = None
         self._logger.info(f"Initializing set creator...")
-        self._offers = offers
-        for offer in self._offers:
-            if offer.card != self._offers[0].card:
-                raise ValueError("All Offers must be for the same Card")
-        self._create_sets()
-        self._remove_doubles()
+        card_ids = {self._registry.card_id(x.card) for x in offers}
+        if len(card_ids) > 1:
+            raise ValueError("All Offers must be for the same Card")
+        # Equal offers can not be part of the same set
+        unique: dict[tuple[int, int, float], Offer] = {}
+        for offer in offers:
+            unique.setdefault((self._registry.seller_id(offer.seller), offer.amount, offer.price), offer)
+        self._offers = list(unique.values())
 
     @property
     def sets(self) -> list[OfferSet]:
+        if self._sets is None:
+            self._sets = []
+            self._create_sets()
         return self._sets
 
-    def _remove_doubles(self):
-        out_data = []
-        for x in self._sets:
-            if x not in out_data:
-                out_data.append(x)
-        self._sets = out_data
+    def sets_by_price(self) -> Iterator[OfferSet]:
+        """
+        Creates the same offer sets as `sets` lazily, in ascending order of their price.
+        The offers are sorted by price, so all offers of a set but the most expensive one are used completely.
+        Every heap entry is a combination with its last offer replaceable by the next one, popping it adds that
+        sibling and the combination extended by the next offer, which never cost less than the combination.
 
-    def _create_set(self, elem: OfferSet) -> None:
-        if elem.cards_available >= elem.card.amount:
-            self._sets.append(elem)
+        :return: Generator for the offer sets, only keeping one heap entry per set created so far
+        """
+        offers = sorted(self._offers, key=lambda x: (x.price, -x.amount))
+        target_amount = offers[0].card.amount
+        counter = itertools.count()
+        heap = []
+
+        def push(prefix: tuple[int, ...], price: float, available: int, index: int) -> None:
+            offer = offers[index]
+            missing = target_amount - available
+            if offer.amount >= missing:
+                bound = price + offer.price * missing
+            elif index + 1 < len(offers):
+                bound = price + offer.price * offer.amount + offers[index + 1].price * (missing - offer.amount)
+            else:
+                return
+            heapq.heappush(heap, (bound, next(counter), prefix, price, available, index))
+
+        push((), 0.0, 0, 0)
+        while heap:
+            _, _, prefix, price, available, index = heapq.heappop(heap)
+            if index + 1 < len(offers):
+                push(prefix, price, available, index + 1)
+            offer = offers[index]
+            if available + offer.amount >= target_amount:
+                yield OfferSet([offers[i] for i in prefix + (index,)])
+            elif index + 1 < len(offers):
+                push(prefix + (index,), price + offer.price * offer.amount, available + offer.amount, index + 1)
+
+    def _add_set(self, indices: list[int], created: set[tuple[int, ...]]) -> None:
+        key = tuple(indices)
+        if key in created:
             return
-        for offer in [x for x in self._offers if x not in elem.offers]:
-            self._create_set(OfferSet(elem.offers + [offer]))
+        offer_set = OfferSet([self._offers[i] for i in indices])
+        if len(offer_set.offers) < len(indices):
+            # The offers actually used form a smaller combination, which is created on its own
+            return
+        created.add(key)
+        self._sets.append(offer_set)
 
     def _create_sets(self) -> None:
-        for offer in self._offers:
-            self._create_set(OfferSet([offer]))
+        target_amount = self._offers[0].card.amount
+        created: set[tuple[int, ...]] = set()
+        chosen: list[int] = []
+
+        def extend(start: int, available: int, largest: int) -> None:
+            for i in range(start, len(self._offers)):
+                offer = self._offers[i]
+                new_available = available + offer.amount
+                new_largest = max(largest, offer.amount)
+                # Adding offers never lowers the amount available without the largest offer
+                if new_available - new_largest >= target_amount:
+                    continue
+                chosen.append(i)
+                if new_available >= target_amount:
+                    self._add_set(chosen, created)
+                extend(i + 1, new_available, new_largest)
+                chosen.pop()
+
+        extend(0, 0, 0)
+        self._logger.info(f"Created {len(self._sets)} offer-sets from {len(self._offers)} offers")
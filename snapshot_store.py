@@ -0,0 +1,176 @@
+import json
+import logging
+import sqlite3
+import time
+from typing import Optional
+
+from card import Card
+from offer import Offer
+from registry import Registry
+from seller import Seller
+
+_schema = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    expansions TEXT NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sellers (
+    id INTEGER PRIMARY KEY,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    name TEXT NOT NULL,
+    shipping REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS offers (
+    id INTEGER PRIMARY KEY,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    card_id INTEGER NOT NULL REFERENCES cards (id),
+    seller_id INTEGER NOT NULL REFERENCES sellers (id),
+    amount INTEGER NOT NULL,
+    price REAL NOT NULL,
+    expansion TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_created ON snapshots (created);
+CREATE INDEX IF NOT EXISTS cards_name ON cards (name);
+CREATE INDEX IF NOT EXISTS sellers_name ON sellers (name);
+CREATE INDEX IF NOT EXISTS offers_card ON offers (snapshot_id, card_id);
+CREATE INDEX IF NOT EXISTS offers_seller ON offers (snapshot_id, seller_id);
+"""
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotStore:
+    """
+    SQLite database holding the offers of every loading run as a snapshot, so the search can be repeated
+    with other settings without loading the offers again.
+    The database uses write-ahead logging, so any amount of read-only stores can load snapshots while
+    another store saves a new one.
+    """
+    _logger: logging.Logger
+    _file: str
+    _connection: sqlite3.Connection
+
+    def __init__(self, file: str, read_only: bool = False):
+        """
+        :param file: The database file, created if it does not exist and the store is not read-only
+        :param read_only: Opens the database for reading only, for searches running next to each other
+        :raises SnapshotError: If the database can not be opened
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._file = file
+        try:
+            if read_only:
+                self._connection = sqlite3.connect(f"file:{file}?mode=ro", uri=True)
+            else:
+                self._connection = sqlite3.connect(file)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.executescript(_schema)
+        except sqlite3.Error as err:
+            raise SnapshotError(f"Could not open snapshot database '{file}': {err}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def snapshots(self) -> list[tuple[int, float, int]]:
+        """
+        :return: Id, creation time and amount of offers of all snapshots, oldest first
+        :raises SnapshotError: If the database can not be read
+        """
+        try:
+            return self._connection.execute(
+                "SELECT s.id, s.created, (SELECT COUNT(*) FROM offers o WHERE o.snapshot_id = s.id) "
+                "FROM snapshots s ORDER BY s.created, s.id").fetchall()
+        except sqlite3.Error as err:
+            raise SnapshotError(f"Could not read snapshots from '{self._file}': {err}")
+
+    def save(self, data: dict[Card, list[Offer]], created: Optional[float] = None) -> int:
+        """
+        Stores the offers as a new snapshot in a single transaction
+
+        :param data: The loaded offers per card
+        :param created: Time the offers were loaded, now if not given
+        :return: Id of the new snapshot
+        :raises SnapshotError: If the database can not be written, nothing of the snapshot is stored then
+        """
+        created = created if created is not None else time.time()
+        try:
+            with self._connection:
+                snapshot_id = self._connection.execute("INSERT INTO snapshots (created) VALUES (?)",
+                                                       (created,)).lastrowid
+                seller_ids: dict[Seller, int] = {}
+                for position, (card, offers) in enumerate(data.items()):
+                    card_id = self._connection.execute(
+                        "INSERT INTO cards (snapshot_id, position, name, expansions, amount) VALUES (?, ?, ?, ?, ?)",
+                        (snapshot_id, position, card.name, json.dumps(card.expansions), card.amount)).lastrowid
+                    for offer in offers:
+                        if offer.seller not in seller_ids:
+                            seller_ids[offer.seller] = self._connection.execute(
+                                "INSERT INTO sellers (snapshot_id, name, shipping) VALUES (?, ?, ?)",
+                                (snapshot_id, offer.seller.name, offer.seller.shipping)).lastrowid
+                    self._connection.executemany(
+                        "INSERT INTO offers (snapshot_id, card_id, seller_id, amount, price, expansion) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(snapshot_id, card_id, seller_ids[x.seller], x.amount, x.price, x.expansion)
+                         for x in offers])
+        except sqlite3.Error as err:
+            raise SnapshotError(f"Could not save snapshot to '{self._file}': {err}")
+        self._logger.info(f"Saved snapshot {snapshot_id} with {sum([len(x) for x in data.values()])} offers")
+        return snapshot_id
+
+    def load(self, snapshot_id: Optional[int] = None, registry: Optional[Registry] = None) \
+            -> dict[Card, list[Offer]]:
+        """
+        Loads the offers of a snapshot, in the order they were saved in
+
+        :param snapshot_id: The snapshot to load, the newest one if not given
+        :param registry: Registry to intern the loaded cards, sellers and offers in
+        :return: The offers per card
+        :raises SnapshotError: If the snapshot does not exist or the database can not be read
+        """
+        registry = registry if registry is not None else Registry()
+        try:
+            if snapshot_id is None:
+                row = self._connection.execute(
+                    "SELECT id FROM snapshots ORDER BY created DESC, id DESC LIMIT 1").fetchone()
+            else:
+                row = self._connection.execute("SELECT id FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+            if row is None and snapshot_id is None:
+                raise SnapshotError(f"No snapshot found in '{self._file}'")
+            if row is None:
+                raise SnapshotError(f"Snapshot {snapshot_id} not found in '{self._file}'")
+            snapshot_id = row[0]
+
+            cards: dict[int, Card] = {}
+            for card_id, name, expansions, amount in self._connection.execute(
+                    "SELECT id, name, expansions, amount FROM cards WHERE snapshot_id = ? ORDER BY position",
+                    (snapshot_id,)):
+                cards[card_id] = registry.card(Card(json.loads(expansions), name, amount))
+            sellers = {seller_id: registry.seller(name, shipping) for seller_id, name, shipping in
+                       self._connection.execute("SELECT id, name, shipping FROM sellers WHERE snapshot_id = ?",
+                                                (snapshot_id,))}
+            data: dict[Card, list[Offer]] = {x: [] for x in cards.values()}
+            for card_id, seller_id, amount, price, expansion in self._connection.execute(
+                    "SELECT card_id, seller_id, amount, price, expansion FROM offers WHERE snapshot_id = ? "
+                    "ORDER BY id", (snapshot_id,)):
+                card = cards[card_id]
+                data[card].append(registry.offer(card, sellers[seller_id], amount, price, expansion))
+        except sqlite3.Error as err:
+            raise SnapshotError(f"Could not load snapshot from '{self._file}': {err}")
+        self._logger.info(f"Loaded snapshot {snapshot_id} with {sum([len(x) for x in data.values()])} offers")
+        return data
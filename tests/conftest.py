@@ -1,7 +1,49 @@
+import random
+
 import pytest
 
 from card import Card
 from offer import Offer
+from offer_set import OfferSet
+from offer_set_transformer import OfferSetTransformer
 from seller import Seller
 
+card1 = Card("expansion-1", "card-1", 2)
+card2 = Card(["expansion-1", "expansion-2"], "card-2", 1)
+card3 = Card("expansion-3", "card-3", 1)
+seller1 = Seller("seller-1", 1.15)
+seller2 = Seller("seller-2", 1.15)
+seller3 = Seller("seller-3", 1.15)
+seller4 = Seller("seller-4", 1.15)
+seller5 = Seller("seller-5", 1.15)
+seller6 = Seller("seller-6", 1.15)
+seller7 = Seller("seller-7", 1.15)
+seller8 = Seller("seller-8", 1.15)
+
+
+@pytest.fixture
+def f_all_offers() -> dict[Card, list[OfferSet]]:
+    offers = {
+        card1: [Offer(card1, seller1, 1, 0.10, "expansion-1"),
+                Offer(card1, seller2, 1, 0.12, "expansion-1"),
+                Offer(card1, seller3, 2, 0.30, "expansion-1"),
+                Offer(card1, seller4, 4, 0.34, "expansion-1")],
+        card2: [Offer(card2, seller5, 1, 0.40, "expansion-1"),
+                Offer(card2, seller6, 1, 0.48, "expansion-1")],
+        card3: [Offer(card3, seller8, 1, 0.47, "expansion-1"),
+                Offer(card3, seller6, 1, 0.55, "expansion-1"),
+                Offer(card3, seller7, 1, 1.10, "expansion-1")]
+    }
+    return OfferSetTransformer(offers).data
+
 
+@pytest.fixture
+def f_random_offers() -> dict[Card, list[OfferSet]]:
+    rng = random.Random(42)
+    sellers = [Seller(f"seller-{i}", rng.choice([1.15, 1.40, 2.00])) for i in range(12)]
+    offers = {}
+    for i in range(7):
+        card = Card("expansion", f"card-{i}", 1)
+        offers[card] = [Offer(card, seller, 1, round(rng.uniform(0.1, 3.0), 2), "expansion")
+                        for seller in rng.sample(sellers, 5)]
+    return OfferSetTransformer(offers).data
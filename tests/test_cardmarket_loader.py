@@ -1,11 +1,29 @@
+import http.server
+import os
+import re
+import threading
+import time
+import urllib.parse
+
 import pytest
 
 from card import Card
 from card_attributes import Language, CardCondition, SellerCountry, SellerType
-from cardmarket_loader import CardmarketLoader, ProductError, ExpansionError
+from cardmarket_loader import CardmarketLoader, ProductError, ExpansionError, DataLoadError, _CardLoad
+from offer import Offer
+from seller import Seller
+from response_cache import ResponseCache
 from settings_loader import SearchSettings
 
 
+_assets = os.path.join(os.path.dirname(__file__), "..", "test_assets")
+
+
+def _read_asset(name: str) -> str:
+    with open(os.path.join(_assets, name), "r", encoding="utf-8") as file_p:
+        return file_p.read()
+
+
 @pytest.fixture()
 def f_empty_loader():
     return CardmarketLoader(SearchSettings())
@@ -35,6 +53,65 @@ def test_param_format():
     assert len(param_dict.keys()) == 2
 
 
+def test_parse_offers(f_empty_loader):
+    offers = f_empty_loader._parse_offers(_read_asset("offers_page.html"), Card("expansion", "card"), "expansion")
+    assert len(offers) == 25
+    assert [(x.seller.name, x.amount, x.price) for x in offers[:3]] == [("Kartenhaus", 7, 0.94),
+                                                                       ("MagicMike_93", 4, 4.41),
+                                                                       ("Drachenhort", 4, 2.8)]
+    assert (offers[-1].seller.name, offers[-1].price) == ("Highroller", 1249.0)
+    assert all(x.expansion == "expansion" for x in offers)
+
+
+def test_parse_offers_errors(f_empty_loader):
+    card = Card("expansion", "card")
+    with pytest.raises(ExpansionError):
+        f_empty_loader._parse_offers(_read_asset("expansion_error_page.html"), card, "expansion")
+    with pytest.raises(ProductError):
+        f_empty_loader._parse_offers(_read_asset("product_error_page.html"), card, "expansion")
+
+
+def test_parse_offers_broken_row(f_empty_loader):
+    page = _read_asset("offers_page.html").replace("<span class=\"item-count small text-right\">7</span>", "", 1)
+    offers = f_empty_loader._parse_offers(page, Card("expansion", "card"), "expansion")
+    # The row is skipped instead of taking the count of the next row
+    assert len(offers) == 24
+    assert offers[0].seller.name == "MagicMike_93"
+
+
+def test_parse_offers_unclosed_row(f_empty_loader):
+    data = "<div>x<div>y</div><div>z"
+    assert CardmarketLoader._find_row_end(data, 5, 18) == 18
+    assert CardmarketLoader._find_row_end(data, 5, len(data)) == len(data)
+    assert CardmarketLoader._find_row_end(data + "</div></div>", 5, len(data) + 12) == len(data) + 12
+    page = _read_asset("offers_page.html")
+    rows = re.findall("<div id=\"articleRow\\d+\" class=\"row g-0 article-row\">.*?\n</div>\n", page, re.DOTALL)
+    # The first row is never closed, which ends it at the start of the second row
+    page = page.replace(rows[0], rows[0][:-len("</div>\n")], 1)
+    offers = f_empty_loader._parse_offers(page, Card("expansion", "card"), "expansion")
+    assert len(offers) == 25
+    assert offers[1].seller.name == "MagicMike_93"
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("row_count", [500, 5000])
+def test_parse_offers_throughput(f_empty_loader, row_count):
+    page = _read_asset("offers_page.html")
+    row_pattern = re.compile("<div id=\"articleRow\\d+\" class=\"row g-0 article-row\">.*?\n</div>\n", re.DOTALL)
+    rows = row_pattern.findall(page)
+    start = page.index(rows[0])
+    end = page.index(rows[-1]) + len(rows[-1])
+    body = "".join([re.sub("articleRow\\d+", f"articleRow{i}", rows[i % len(rows)], count=1)
+                    for i in range(row_count)])
+    page = page[:start] + body + page[end:]
+
+    started = time.perf_counter()
+    offers = f_empty_loader._parse_offers(page, Card("expansion", "card"), "expansion")
+    elapsed = time.perf_counter() - started
+    assert len(offers) == row_count
+    print(f"Parsed {row_count} rows with {round(row_count / elapsed)} rows/s")
+
+
 @pytest.mark.network
 def test_card_load(f_empty_loader):
     offers = f_empty_loader.load_offers_for_card(Card(expansion="Born-of-the-Gods", name="Plea-for-Guidance"))
@@ -51,3 +128,234 @@ def test_card_load_product_error(f_empty_loader):
 def test_card_load_expansion_error(f_empty_loader):
     with pytest.raises(ExpansionError):
         f_empty_loader.load_offers_for_card(Card(expansion="bongobob", name="Plea-for-Guidance"))
+
+
+_stub_row = ("<div id=\"articleRow{}\" class=\"row article-row\"><a href=\"/de/Magic/Users/{}\">{}</a>"
+             "<div><span class=\"item-count small text-right\">{}</span></div>"
+             "<span class=\"price\">{} €</span></div>")
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        time.sleep(0.05)
+        path, _, query = self.path.partition("?")
+        expansion, name = path.split("/")[-2:]
+        site = int(urllib.parse.parse_qs(query).get("site", ["1"])[0])
+        with self.server.lock:
+            self.server.pages.append((name, site))
+        status = 200
+        if name == "broken":
+            status = 500
+            body = ""
+        elif name.startswith("flaky") and self.server.pages.count((name, site)) <= 2:
+            # Overloaded for the first two requests
+            status = 429 if name == "flaky" else 503
+            body = ""
+        elif expansion == "bad-expansion":
+            body = "<h4 class=\"alert-heading\">Fehler: Ungültige Erweiterung</h4>"
+        elif name == "missing":
+            body = "<h4 class=\"alert-heading\">Ungültiges Produkt</h4>"
+        elif name.startswith("paged"):
+            # Three pages sorted by price, the last row of the first page moves to the second one while paging
+            ids = range(site * 3 - 3 if site == 2 else site * 3 - 2, site * 3 + 1)
+            price = "{},00" if name == "paged-expensive" else "0,{}0"
+            body = f"<span class=\"mx-1\">Seite {site} von 3</span>" + \
+                   "".join([_stub_row.format(i, f"seller{i}", f"seller{i}", 1, price.format(i)) for i in ids])
+        else:
+            body = "".join([_stub_row.format(i, f"{name}-seller{i}", f"{name}-seller{i}", i, f"0,{i}0")
+                            for i in range(1, 4)])
+        data = body.encode("utf-8")
+        etag = f"\"{self.server.version}\""
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status = 304
+            data = b""
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.lock:
+            self.server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def f_stub_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = 0
+    server.pages = []
+    server.version = "v1"
+    server.active = 0
+    server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_load_offers_for_cards(f_stub_server):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    cards = [Card("expansion", f"card{i}") for i in range(8)]
+    with CardmarketLoader(SearchSettings(), base_url=base_url, max_concurrency=4) as loader:
+        results = list(loader.load_offers_for_cards(cards, max_concurrency=4))
+        assert sorted([x.name for x, _, _ in results]) == sorted([x.name for x in cards])
+        for card, offers, error in results:
+            assert error is None
+            assert [x.price for x in offers] == [0.1, 0.2, 0.3]
+            assert offers[0].seller.name == f"{card.name}-seller1"
+        assert 1 < f_stub_server.max_active <= 4
+
+        # The second batch reuses the kept alive connections
+        connections = f_stub_server.connections
+        list(loader.load_offers_for_cards(cards, max_concurrency=4))
+        assert f_stub_server.connections == connections
+    assert connections <= 4
+
+
+def test_load_offers_for_cards_errors(f_stub_server):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    cards = [Card("expansion", "card"), Card("bad-expansion", "card2"), Card("expansion", "missing"),
+             Card("expansion", "broken")]
+    with CardmarketLoader(SearchSettings(), base_url=base_url, max_retries=0) as loader:
+        results = {card.name: (offers, error) for card, offers, error in loader.load_offers_for_cards(cards)}
+    assert len(results["card"][0]) == 3 and results["card"][1] is None
+    assert isinstance(results["card2"][1], ExpansionError)
+    assert isinstance(results["missing"][1], ProductError)
+    assert isinstance(results["broken"][1], DataLoadError) and results["broken"][1].code == 500
+
+
+def test_load_offers_for_cards_connection_error():
+    with CardmarketLoader(SearchSettings(), base_url="http://127.0.0.1:1/Singles", max_retries=0) as loader:
+        results = list(loader.load_offers_for_cards([Card("expansion", "card")]))
+    assert isinstance(results[0][2], DataLoadError)
+
+
+def test_load_offers_cached(f_stub_server, tmp_path):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    cards = [Card("expansion", f"card{i}") for i in range(4)]
+
+    def load(cache: ResponseCache) -> dict[str, list[float]]:
+        with CardmarketLoader(SearchSettings(), base_url=base_url, cache=cache) as loader:
+            return {card.name: [x.price for x in offers] for card, offers, _ in loader.load_offers_for_cards(cards)}
+
+    expected = load(ResponseCache(str(tmp_path)))
+    assert f_stub_server.requests == 4
+    # Fresh pages are not requested again, not even by a new cache on the same directory
+    cache = ResponseCache(str(tmp_path))
+    assert load(cache) == expected
+    assert f_stub_server.requests == 4
+    assert cache.hits == 4
+
+    # Stale pages are revalidated, the server confirms they are unchanged
+    cache = ResponseCache(str(tmp_path), max_age=0)
+    assert load(cache) == expected
+    assert f_stub_server.requests == 8
+    assert (cache.hits, cache.revalidations, cache.misses) == (0, 4, 0)
+
+    # Changed pages are downloaded again
+    f_stub_server.version = "v2"
+    cache = ResponseCache(str(tmp_path), max_age=0)
+    assert load(cache) == expected
+    assert (cache.revalidations, cache.misses) == (0, 4)
+
+
+def test_load_offers_errors_not_cached(f_stub_server, tmp_path):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    cache = ResponseCache(str(tmp_path))
+    with CardmarketLoader(SearchSettings(), base_url=base_url, cache=cache, max_retries=0) as loader:
+        for _ in range(2):
+            results = list(loader.load_offers_for_cards([Card("expansion", "broken")]))
+            assert isinstance(results[0][2], DataLoadError)
+    assert f_stub_server.requests == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_load_offers_paged(f_stub_server):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    with CardmarketLoader(SearchSettings(), base_url=base_url) as loader:
+        # The cheapest 20 copies can be on any page, so all of them are needed
+        offers = loader.load_offers_for_card(Card("expansion", "paged", 20))
+    assert sorted(f_stub_server.pages) == [("paged", 1), ("paged", 2), ("paged", 3)]
+    # The row on the first and the second page is only taken once
+    assert [x.price for x in offers] == [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+
+def test_load_offers_paged_early_stop(f_stub_server):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    with CardmarketLoader(SearchSettings(), base_url=base_url) as loader:
+        # Buying the cheapest copy costs 2.15€, the later pages only contain more expensive copies
+        offers = loader.load_offers_for_card(Card("expansion", "paged-expensive", 1))
+    assert f_stub_server.pages == [("paged-expensive", 1)]
+    assert [x.price for x in offers] == [1.0, 2.0, 3.0]
+
+
+def test_load_offers_paged_max_sellers(f_stub_server):
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    with CardmarketLoader(SearchSettings(), base_url=base_url, max_sellers=1) as loader:
+        # An expensive copy may be needed to buy from fewer sellers, so the later pages are loaded as well
+        offers = loader.load_offers_for_card(Card("expansion", "paged-expensive", 1))
+    assert sorted(f_stub_server.pages) == [("paged-expensive", 1), ("paged-expensive", 2), ("paged-expensive", 3)]
+    assert [x.price for x in offers] == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+
+
+def test_card_load_last_pages():
+    card = Card(["exp1", "exp2"], "card", 2)
+    seller = Seller("seller", 1.0)
+    load = _CardLoad(card, {})
+    load.pages[("exp2", 2)] = [("row1", Offer(card, seller, 1, 5.0, "exp2"))]
+    # Not enough copies to limit the price yet
+    assert load.last_pages() == {}
+
+    load.pages[("exp1", 1)] = [(f"row{i}", Offer(card, seller, 1, i, "exp1")) for i in range(2, 4)]
+    # Two copies for up to 3€ and the shipping of one seller, so 4€ at most
+    assert load.last_pages() == {"exp2": 2}
+    load.pages[("exp2", 1)] = [("row4", Offer(card, seller, 2, 1.5, "exp2"))]
+    # Two copies for 1.5€ and the shipping of one seller
+    assert load.last_pages() == {"exp1": 1, "exp2": 2}
+    load.pages[("exp1", 2)] = []
+    assert load.last_pages() == {"exp1": 1, "exp2": 2}
+    assert [x.price for x in load.offers()] == [2, 3, 1.5, 5.0]
+
+
+@pytest.mark.parametrize("name", ["flaky", "flaky-server"])
+def test_load_offers_retried(f_stub_server, monkeypatch, name):
+    monkeypatch.setattr("request_scheduler._backoff_base", 0.01)
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    host = f"127.0.0.1:{f_stub_server.server_address[1]}"
+    with CardmarketLoader(SearchSettings(), base_url=base_url) as loader:
+        initial_rate = loader.scheduler.rate(host)
+        offers = loader.load_offers_for_card(Card("expansion", name))
+        assert len(offers) == 3
+        assert (loader.scheduler.requests, loader.scheduler.retries, loader.scheduler.throttled) == (3, 2, 2)
+        assert loader.scheduler.rate(host) < initial_rate
+
+
+def test_load_offers_retries_exhausted(f_stub_server, monkeypatch):
+    monkeypatch.setattr("request_scheduler._backoff_base", 0.01)
+    base_url = f"http://127.0.0.1:{f_stub_server.server_address[1]}/Singles"
+    with CardmarketLoader(SearchSettings(), base_url=base_url, max_retries=2) as loader:
+        with pytest.raises(DataLoadError) as err:
+            loader.load_offers_for_card(Card("expansion", "broken"))
+        assert err.value.code == 500
+        assert loader.scheduler.retries == 2
+    assert f_stub_server.requests == 3
@@ -0,0 +1,97 @@
+import os
+import signal
+import sys
+
+import pytest
+
+import checkpoint_order_finder
+from card import Card
+from checkpoint_order_finder import CheckpointOrderFinder, CheckpointError
+from offer import Offer
+from offer_set import OfferSet
+from order_finder import OrderFinder, CardOrder, SetOrder
+from seller import Seller
+
+
+def test_checkpoint_order_finder(f_random_offers, tmp_path):
+    checkpoint = os.path.join(tmp_path, "checkpoint.json")
+    expected = OrderFinder(f_random_offers).find_lowest_offer(1)
+    finder = CheckpointOrderFinder(f_random_offers, checkpoint, branch_and_bound=False)
+    result = finder.find_lowest_offer()
+    assert result == expected
+    assert finder.performed_checks == finder.total_checks
+    assert not os.path.isfile(checkpoint)
+
+
+@pytest.mark.parametrize("branch_and_bound", [False, True])
+@pytest.mark.parametrize("set_order", list(SetOrder))
+def test_checkpoint_order_finder_resume(f_random_offers, tmp_path, monkeypatch, branch_and_bound, set_order):
+    monkeypatch.setattr(checkpoint_order_finder, "_check_interval", 16)
+    checkpoint = os.path.join(tmp_path, "checkpoint.json")
+    expected = OrderFinder(f_random_offers).find_lowest_offer(1)
+
+    finder = CheckpointOrderFinder(f_random_offers, checkpoint, branch_and_bound=branch_and_bound,
+                                   set_order=set_order)
+    finder._handle_interrupt(signal.SIGINT, None)
+    with pytest.raises(KeyboardInterrupt):
+        finder.find_lowest_offer()
+    assert os.path.isfile(checkpoint)
+    assert finder.performed_checks + finder.skipped_checks < finder.total_checks
+
+    resumed = CheckpointOrderFinder(f_random_offers, checkpoint, branch_and_bound=branch_and_bound,
+                                    set_order=set_order, resume=True)
+    result = resumed.find_lowest_offer()
+    assert result.sum() == expected.sum()
+    assert resumed.performed_checks + resumed.skipped_checks == resumed.total_checks
+
+
+def test_checkpoint_order_finder_wrong_checkpoint(f_random_offers, tmp_path):
+    checkpoint = os.path.join(tmp_path, "checkpoint.json")
+    finder = CheckpointOrderFinder(f_random_offers, checkpoint)
+    finder.save_checkpoint([0])
+
+    other_offers = dict(list(f_random_offers.items())[1:])
+    with pytest.raises(CheckpointError):
+        CheckpointOrderFinder(other_offers, checkpoint, resume=True).find_lowest_offer()
+
+
+def _changed_price(all_offers: dict[Card, list[OfferSet]]) -> dict[Card, list[OfferSet]]:
+    card, offer_sets = list(all_offers.items())[0]
+    offer = offer_sets[0].offers[0]
+    changed = OfferSet([Offer(card, offer.seller, offer.amount, offer.price + 0.01, offer.expansion)])
+    return {**all_offers, card: [changed] + offer_sets[1:]}
+
+
+@pytest.mark.parametrize("changes,other_offers", [
+    ({"set_order": SetOrder.MarginalPrice}, None),
+    ({"card_order": CardOrder.MostConstrained}, None),
+    ({"max_sellers": 6}, None),
+    ({}, _changed_price)
+])
+def test_checkpoint_order_finder_other_search(f_random_offers, tmp_path, changes, other_offers):
+    checkpoint = os.path.join(tmp_path, "checkpoint.json")
+    CheckpointOrderFinder(f_random_offers, checkpoint).save_checkpoint([0])
+    all_offers = other_offers(f_random_offers) if other_offers is not None else f_random_offers
+    finder = CheckpointOrderFinder(all_offers, checkpoint, resume=True, **changes)
+    with pytest.raises(CheckpointError):
+        finder.find_lowest_offer()
+    # The unchanged search can still be resumed
+    CheckpointOrderFinder(f_random_offers, checkpoint, resume=True).find_lowest_offer()
+
+
+def test_checkpoint_order_finder_deep_wantlist(tmp_path):
+    seller = Seller("seller", 1.15)
+    all_offers = {}
+    for i in range(sys.getrecursionlimit() + 100):
+        card = Card("expansion", f"card-{i}")
+        all_offers[card] = [OfferSet([Offer(card, seller, 1, 0.1, "expansion")])]
+    finder = CheckpointOrderFinder(all_offers, os.path.join(tmp_path, "checkpoint.json"), branch_and_bound=False)
+    result = finder.find_lowest_offer()
+    assert len(result.offer_sets) == len(all_offers)
+    assert finder.performed_checks == 1
+
+
+def test_checkpoint_order_finder_missing_checkpoint(f_random_offers, tmp_path):
+    finder = CheckpointOrderFinder(f_random_offers, os.path.join(tmp_path, "checkpoint.json"), resume=True)
+    with pytest.raises(CheckpointError):
+        finder.find_lowest_offer()
@@ -0,0 +1,61 @@
+import pytest
+
+from card import Card
+from component_splitter import ComponentSplitter
+from offer import Offer
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from offer_set_transformer import OfferSetTransformer
+from order_finder import OrderFinder
+from seller import Seller
+
+_card1 = Card("expansion", "card-1")
+_card2 = Card("expansion", "card-2")
+_card3 = Card("expansion", "card-3")
+_card4 = Card("expansion", "card-4")
+_seller1 = Seller("seller-1", 1.15)
+_seller2 = Seller("seller-2", 1.15)
+_seller3 = Seller("seller-3", 1.15)
+_seller4 = Seller("seller-4", 1.15)
+
+
+@pytest.fixture
+def f_all_offers() -> dict[Card, list[OfferSet]]:
+    offers = {
+        _card1: [Offer(_card1, _seller1, 1, 0.10, "expansion"),
+                 Offer(_card1, _seller2, 1, 0.20, "expansion")],
+        _card2: [Offer(_card2, _seller2, 1, 0.30, "expansion")],
+        _card3: [Offer(_card3, _seller3, 1, 0.10, "expansion"),
+                 Offer(_card3, _seller4, 1, 0.50, "expansion")],
+        _card4: [Offer(_card4, _seller4, 1, 0.10, "expansion")],
+    }
+    return OfferSetTransformer(offers).data
+
+
+def _optimal(data: dict[Card, list[OfferSet]]) -> OfferCollection:
+    return OrderFinder(data, branch_and_bound=True).find_lowest_offer(1)
+
+
+def test_component_splitter(f_all_offers):
+    splitter = ComponentSplitter(f_all_offers)
+    components = [set(x.keys()) for x in splitter.components]
+    assert len(components) == 2
+    assert {_card1, _card2} in components
+    assert {_card3, _card4} in components
+
+
+@pytest.mark.parametrize("process_count", [1, 2])
+def test_component_splitter_solve(f_all_offers, process_count):
+    result = ComponentSplitter(f_all_offers).solve(_optimal, process_count)
+    assert result == _optimal(f_all_offers)
+    assert result.sum() == round(0.20 + 0.30 + 0.50 + 0.10 + 1.15 + 1.15, 2)
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_component_splitter_merge_alternatives(f_all_offers, k):
+    splitter = ComponentSplitter(f_all_offers)
+    results = [OrderFinder(x, branch_and_bound=True).find_lowest_offers(k, 1) for x in splitter.components]
+    merged = splitter.merge_alternatives(results, k)
+    expected = OrderFinder(f_all_offers, branch_and_bound=True).find_lowest_offers(k, 1)
+    assert [x.sum() for x in merged] == [x.sum() for x in expected]
+    assert merged[0] == expected[0]
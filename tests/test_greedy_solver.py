@@ -0,0 +1,36 @@
+from card import Card
+from greedy_solver import GreedySolver
+from offer import Offer
+from offer_set import OfferSet
+from order_finder import OrderFinder
+from seller import Seller
+
+_card1 = Card("expansion", "card-1")
+_card2 = Card("expansion", "card-2")
+_seller1 = Seller("seller-1", 1.00)
+_seller2 = Seller("seller-2", 1.00)
+
+
+def test_greedy_solver_consolidates_sellers():
+    set1a = OfferSet([Offer(_card1, _seller1, 1, 0.50, "expansion")])
+    set1b = OfferSet([Offer(_card1, _seller2, 1, 0.40, "expansion")])
+    set2 = OfferSet([Offer(_card2, _seller1, 1, 0.20, "expansion")])
+    result = GreedySolver({_card1: [set1b, set1a], _card2: [set2]}).find_lowest_offer()
+    assert result.sellers == (_seller1,)
+    assert result.sum() == round(0.50 + 0.20 + 1.00, 2)
+
+
+def test_greedy_solver_valid_combination(f_random_offers):
+    result = GreedySolver(f_random_offers).find_lowest_offer()
+    assert {x.card for x in result.offer_sets} == set(f_random_offers.keys())
+    assert result.sum() >= OrderFinder(f_random_offers, branch_and_bound=True).find_lowest_offer(1).sum()
+
+
+def test_greedy_solver_marginal_price_same_seller():
+    card = Card("expansion", "card", 2)
+    offer_set = OfferSet([Offer(card, _seller1, 1, 0.50, "expansion-1"),
+                          Offer(card, _seller1, 1, 0.60, "expansion-2")])
+    assert offer_set.sellers == (_seller1, _seller1)
+    # The shipping of a seller is paid once, no matter how many offers are bought from it
+    assert GreedySolver.marginal_price(offer_set, {}) == round(1.10 + 1.00, 2)
+    assert GreedySolver.marginal_price(offer_set, {_seller1: 1}) == 1.10
@@ -0,0 +1,59 @@
+from card import Card
+from offer import Offer
+from offer_set import OfferSet
+from leaf_evaluator import LeafEvaluator
+from search_state import SearchState
+from seller import Seller
+
+_card1 = Card("expansion", "card-1")
+_card2 = Card("expansion", "card-2")
+_card3 = Card("expansion", "card-3")
+_seller1 = Seller("seller-1", 1.00)
+_seller2 = Seller("seller-2", 2.00)
+_seller3 = Seller("seller-3", 1.50)
+
+_set1 = OfferSet([Offer(_card1, _seller1, 1, 0.50, "expansion")])
+_set2a = OfferSet([Offer(_card2, _seller1, 1, 0.90, "expansion")])
+_set2b = OfferSet([Offer(_card2, _seller2, 1, 0.10, "expansion")])
+_set3a = OfferSet([Offer(_card3, _seller2, 1, 0.70, "expansion")])
+_set3b = OfferSet([Offer(_card3, _seller3, 1, 0.20, "expansion")])
+
+
+def test_leaf_evaluator():
+    evaluator = LeafEvaluator([[_set2a, _set2b], [_set3a, _set3b]])
+    assert evaluator.size == 4
+
+    state = SearchState()
+    (total, offer_sets), = evaluator.evaluate(state)
+    assert offer_sets == [_set2b, _set3a]
+    assert round(total, 4) == round(0.10 + 0.70 + 2.00, 4)
+
+    state.push(_set1)
+    (total, offer_sets), = evaluator.evaluate(state)
+    assert offer_sets == [_set2a, _set3b]
+    assert round(total, 4) == round(0.50 + 0.90 + 0.20 + 1.00 + 1.50, 4)
+
+
+def test_leaf_evaluator_count():
+    evaluator = LeafEvaluator([[_set2a, _set2b], [_set3a, _set3b]])
+    results = evaluator.evaluate(SearchState(), 3)
+    assert [x for _, x in results] == [[_set2b, _set3a], [_set2a, _set3b], [_set2b, _set3b]]
+    assert [round(x, 4) for x, _ in results] == [2.8, 3.6, round(0.10 + 0.20 + 2.00 + 1.50, 4)]
+
+
+def test_leaf_evaluator_max_sellers():
+    evaluator = LeafEvaluator([[_set2a, _set2b], [_set3a, _set3b]])
+    results = evaluator.evaluate(SearchState(), 4, max_sellers=1)
+    assert results[0] == (2.8, [_set2b, _set3a])
+    assert [x for x, _ in results[1:]] == [float("inf")] * 3
+
+    state = SearchState()
+    state.push(_set1)
+    results = evaluator.evaluate(state, 4, max_sellers=2)
+    assert [x for _, x in results[:3]] == [[_set2a, _set3b], [_set2b, _set3a], [_set2a, _set3a]]
+    assert results[3] == (float("inf"), [_set2b, _set3b])
+
+
+def test_leaf_evaluator_required_bytes():
+    assert LeafEvaluator.required_bytes([[_set2a, _set2b], [_set3a, _set3b]]) == 4 * (3 + 24)
+    assert LeafEvaluator.required_bytes([[_set2a], [_set3a]]) == 1 * (2 + 24)
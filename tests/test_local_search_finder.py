@@ -0,0 +1,26 @@
+import itertools
+
+from greedy_solver import GreedySolver
+from local_search_finder import LocalSearchFinder
+from order_finder import OrderFinder
+
+
+def test_local_search_finder(f_random_offers):
+    expected = OrderFinder(f_random_offers, branch_and_bound=True).find_lowest_offer(1)
+    greedy = GreedySolver(f_random_offers).find_lowest_offer()
+    finder = LocalSearchFinder(f_random_offers, time_budget=60, max_iterations=5000, seed=1)
+    result = finder.find_lowest_offer()
+    assert finder.iterations == 5000
+    assert {x.card for x in result.offer_sets} == set(f_random_offers.keys())
+    assert result.sum() == finder.best_total
+    assert expected.sum() <= result.sum() <= greedy.sum()
+
+
+def test_local_search_finder_time_budget(f_random_offers):
+    ticks = itertools.count()
+    # Every reading of the clock advances it by a millisecond
+    finder = LocalSearchFinder(f_random_offers, time_budget=0.2, seed=1, clock=lambda: next(ticks) / 1000)
+    result = finder.find_lowest_offer()
+    assert 0.2 <= finder.elapsed < 0.21
+    assert 0 < finder.iterations < 200
+    assert {x.card for x in result.offer_sets} == set(f_random_offers.keys())
@@ -0,0 +1,62 @@
+from card import Card
+from offer import Offer
+from offer_filter import OfferFilter
+from seller import Seller
+
+_card1 = Card("expansion", "card1", 1)
+_card2 = Card("expansion", "card2", 1)
+_card3 = Card("expansion", "card3", 3)
+_seller1 = Seller("seller-1", 1.15)
+_seller2 = Seller("seller-2", 1.15)
+_seller3 = Seller("seller-3", 1.15)
+_seller4 = Seller("seller-4", 1.15)
+
+
+def test_offer_filter_single_copies():
+    offers = {
+        _card1: [Offer(_card1, _seller3, 1, 0.50, "expansion"),
+                 Offer(_card1, _seller1, 1, 0.20, "expansion"),
+                 Offer(_card1, _seller4, 1, 0.30, "expansion"),
+                 Offer(_card1, _seller2, 1, 1.40, "expansion")],
+        _card2: [Offer(_card2, _seller1, 1, 0.10, "expansion"),
+                 Offer(_card2, _seller2, 1, 0.10, "expansion"),
+                 Offer(_card2, _seller3, 1, 0.10, "expansion")]
+    }
+    data = OfferFilter(offers).data
+    # seller-4 only sells one card, seller-2 costs more than the cheapest offer including shipping
+    assert [x.seller for x in data[_card1]] == [_seller1, _seller3]
+    assert [x.seller for x in data[_card2]] == [_seller1, _seller2, _seller3]
+
+
+def test_offer_filter_keeps_cheapest_single_seller():
+    offers = {_card1: [Offer(_card1, _seller2, 1, 0.60, "expansion"),
+                       Offer(_card1, _seller1, 1, 0.40, "expansion")]}
+    assert [x.seller for x in OfferFilter(offers).data[_card1]] == [_seller1]
+
+
+def test_offer_filter_multiple_copies():
+    offers = {
+        _card3: [Offer(_card3, _seller1, 2, 0.10, "expansion"),
+                 Offer(_card3, _seller2, 1, 0.30, "expansion"),
+                 Offer(_card3, _seller3, 1, 1.55, "expansion"),
+                 Offer(_card3, _seller4, 3, 2.70, "expansion")]
+    }
+    data = OfferFilter(offers).data
+    # The cheapest three copies cost 0.10 + 0.10 + 0.30 plus shipping for two sellers, so no offer above
+    # 0.30 + 2.30 can be part of a cheaper set
+    assert [x.seller for x in data[_card3]] == [_seller1, _seller2, _seller3]
+
+
+def test_offer_filter_not_enough_copies():
+    offers = {_card3: [Offer(_card3, _seller1, 1, 0.10, "expansion"),
+                       Offer(_card3, _seller2, 1, 5.00, "expansion")]}
+    assert len(OfferFilter(offers).data[_card3]) == 2
+
+
+def test_offer_filter_max_sellers():
+    offers = {_card1: [Offer(_card1, _seller2, 1, 0.60, "expansion"),
+                       Offer(_card1, _seller1, 1, 2.40, "expansion")],
+              _card2: [Offer(_card2, _seller1, 1, 0.10, "expansion")]}
+    # The more expensive offer may be needed to stay within the seller limit
+    assert [x.seller for x in OfferFilter(offers).data[_card1]] == [_seller2]
+    assert [x.seller for x in OfferFilter(offers, max_sellers=1).data[_card1]] == [_seller2, _seller1]
@@ -14,9 +14,9 @@ def f_card():
 @pytest.fixture
 def f_offers(f_card):
     return [
-        Offer(f_card, Seller("seller4", 1.15), 2, .1),
-        Offer(f_card, Seller("seller5", 1.15), 1, .1),
-        Offer(f_card, Seller("seller6", 1.15), 2, .1)
+        Offer(f_card, Seller("seller4", 1.15), 2, .1, "expansion"),
+        Offer(f_card, Seller("seller5", 1.15), 1, .1, "expansion"),
+        Offer(f_card, Seller("seller6", 1.15), 2, .1, "expansion")
     ]
 
 
@@ -24,13 +24,20 @@ def test_offer_set(f_offers, f_card):
     t_set = OfferSet(
         f_offers
     )
-    sellers = t_set.sellers
-    sellers.sort()
+    sellers = sorted(t_set.sellers)
     assert sellers == [Seller("seller4", 1.15), Seller("seller6", 1.15)]
 
     assert t_set.card == f_card
 
-    offers = t_set.offers
-    offers.sort()
-    assert offers == [Offer(f_card, Seller("seller4", 1.15), 2, .1),
-                      Offer(f_card, Seller("seller6", 1.15), 2, .1)]
+    offers = sorted(t_set.offers)
+    assert offers == [Offer(f_card, Seller("seller4", 1.15), 2, .1, "expansion"),
+                      Offer(f_card, Seller("seller6", 1.15), 2, .1, "expansion")]
+
+
+def test_offer_set_value_object(f_offers):
+    t_set = OfferSet(f_offers)
+    assert t_set.seller_set == frozenset(t_set.sellers)
+    assert hash(t_set) == hash(OfferSet(list(f_offers)))
+    assert t_set == OfferSet(list(f_offers))
+    with pytest.raises(AttributeError):
+        t_set.other = 1
@@ -0,0 +1,48 @@
+from card import Card
+from offer import Offer
+from offer_set import OfferSet
+from offer_set_transformer import OfferSetTransformer
+from seller import Seller
+
+_card = Card("expansion", "card", 2)
+_seller1 = Seller("seller-1", 1.15)
+_seller2 = Seller("seller-2", 1.15)
+_seller3 = Seller("seller-3", 1.15)
+
+
+def test_offer_set_transformer_removes_dominated_sets():
+    offers = {
+        _card: [Offer(_card, _seller1, 2, 0.10, "expansion"),
+                Offer(_card, _seller2, 1, 0.15, "expansion"),
+                Offer(_card, _seller3, 1, 0.20, "expansion")]
+    }
+    sets = OfferSetTransformer(offers).data[_card]
+    # seller-1 alone is cheaper than every other combination using it
+    assert sets == [OfferSet([Offer(_card, _seller1, 2, 0.10, "expansion")]),
+                    OfferSet([Offer(_card, _seller2, 1, 0.15, "expansion"),
+                              Offer(_card, _seller3, 1, 0.20, "expansion")])]
+
+
+def test_offer_set_transformer_no_dominated_sets(f_random_offers):
+    for card, offer_sets in f_random_offers.items():
+        for offer_set in offer_sets:
+            assert not any(x is not offer_set and x.price <= offer_set.price and
+                           set(x.sellers) <= set(offer_set.sellers) for x in offer_sets)
+
+
+def test_offer_set_transformer_stops_at_shipping_bound():
+    offers = {
+        _card: [Offer(_card, _seller1, 2, 0.10, "expansion"),
+                Offer(_card, _seller2, 1, 0.70, "expansion"),
+                Offer(_card, _seller3, 1, 0.80, "expansion")]
+    }
+    # seller-2 and seller-3 together cost more than seller-1 including its shipping
+    assert OfferSetTransformer(offers).data[_card] == [OfferSet([Offer(_card, _seller1, 2, 0.10, "expansion")])]
+
+
+def test_offer_set_transformer_max_sellers():
+    offers = {_card: [Offer(_card, _seller1, 1, 0.10, "expansion"),
+                      Offer(_card, _seller2, 2, 3.00, "expansion")]}
+    expensive_set = OfferSet([Offer(_card, _seller2, 2, 3.00, "expansion")])
+    assert expensive_set not in OfferSetTransformer(offers).data[_card]
+    assert expensive_set in OfferSetTransformer(offers, max_sellers=1).data[_card]
@@ -1,40 +1,20 @@
+import itertools
+import math
+import random
+
 import pytest
 
 from card import Card
+from conftest import card1, card2, card3, seller1, seller2, seller3, seller6
 from offer import Offer
 from offer_collection import OfferCollection
+from offer_filter import OfferFilter
 from offer_set import OfferSet
 from offer_set_transformer import OfferSetTransformer
-from order_finder import OrderFinder
+from order_finder import OrderFinder, CardOrder, SetOrder, NoCombinationError
 from seller import Seller
-
-_card1 = Card("expansion-1", "card-1", 2)
-_card2 = Card(["expansion-1", "expansion-2"], "card-2", 1)
-_card3 = Card("expansion-3", "card-3", 1)
-_seller1 = Seller("seller-1", 1.15)
-_seller2 = Seller("seller-2", 1.15)
-_seller3 = Seller("seller-3", 1.15)
-_seller4 = Seller("seller-4", 1.15)
-_seller5 = Seller("seller-5", 1.15)
-_seller6 = Seller("seller-6", 1.15)
-_seller7 = Seller("seller-7", 1.15)
-_seller8 = Seller("seller-8", 1.15)
-
-
-@pytest.fixture
-def f_all_offers() -> dict[Card, list[OfferSet]]:
-    offers = {
-        _card1: [Offer(_card1, _seller1, 1, 0.10, "expansion-1"),
-                 Offer(_card1, _seller2, 1, 0.12, "expansion-1"),
-                 Offer(_card1, _seller3, 2, 0.30, "expansion-1"),
-                 Offer(_card1, _seller4, 4, 0.34, "expansion-1")],
-        _card2: [Offer(_card2, _seller5, 1, 0.40, "expansion-1"),
-                 Offer(_card2, _seller6, 1, 0.48, "expansion-1")],
-        _card3: [Offer(_card3, _seller8, 1, 0.47, "expansion-1"),
-                 Offer(_card3, _seller6, 1, 0.55, "expansion-1"),
-                 Offer(_card3, _seller7, 1, 1.10, "expansion-1")]
-    }
-    return OfferSetTransformer(offers).data
+from seller_dominance_filter import SellerDominanceFilter
+from seller_subset_finder import SellerSubsetFinder
 
 
 @pytest.mark.parametrize("thread_count", [-1, 0, 1, 2, 3, 4, 5, 10000])
@@ -42,8 +22,154 @@ def test_order_finder(f_all_offers, thread_count):
     finder = OrderFinder(f_all_offers)
     result = finder.find_lowest_offer(thread_count)
     assert result == OfferCollection([
-        OfferSet([Offer(_card1, _seller3, 2, 0.30, "expansion-1")]),
-        OfferSet([Offer(_card2, _seller6, 1, 0.48, "expansion-1")]),
-        OfferSet([Offer(_card3, _seller6, 1, 0.55, "expansion-1")])
+        OfferSet([Offer(card1, seller3, 2, 0.30, "expansion-1")]),
+        OfferSet([Offer(card2, seller6, 1, 0.48, "expansion-1")]),
+        OfferSet([Offer(card3, seller6, 1, 0.55, "expansion-1")])
     ])
     assert finder.performed_checks == finder.total_checks
+
+
+@pytest.mark.parametrize("thread_count", [1, 2, 10000])
+def test_order_finder_branch_and_bound(f_all_offers, thread_count):
+    finder = OrderFinder(f_all_offers, branch_and_bound=True)
+    result = finder.find_lowest_offer(thread_count)
+    assert result == OfferCollection([
+        OfferSet([Offer(card1, seller3, 2, 0.30, "expansion-1")]),
+        OfferSet([Offer(card2, seller6, 1, 0.48, "expansion-1")]),
+        OfferSet([Offer(card3, seller6, 1, 0.55, "expansion-1")])
+    ])
+    assert finder.nodes_pruned > 0
+    assert finder.performed_checks < finder.total_checks
+    assert finder.performed_checks + finder.skipped_checks == finder.total_checks
+
+
+@pytest.mark.parametrize("vectorized_levels", [1, 2, 3])
+@pytest.mark.parametrize("branch_and_bound", [False, True])
+def test_order_finder_vectorized(f_all_offers, vectorized_levels, branch_and_bound):
+    finder = OrderFinder(f_all_offers, branch_and_bound=branch_and_bound, vectorized_levels=vectorized_levels)
+    result = finder.find_lowest_offer(2)
+    assert result == OfferCollection([
+        OfferSet([Offer(card1, seller3, 2, 0.30, "expansion-1")]),
+        OfferSet([Offer(card2, seller6, 1, 0.48, "expansion-1")]),
+        OfferSet([Offer(card3, seller6, 1, 0.55, "expansion-1")])
+    ])
+    assert finder.performed_checks + finder.skipped_checks == finder.total_checks
+
+
+@pytest.mark.parametrize("vectorized_levels", [2, 3])
+def test_order_finder_vectorized_matches_exhaustive(f_random_offers, vectorized_levels):
+    expected = OrderFinder(f_random_offers).find_lowest_offer(1)
+    result = OrderFinder(f_random_offers, branch_and_bound=True,
+                         vectorized_levels=vectorized_levels).find_lowest_offer(1)
+    assert result == expected
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+@pytest.mark.parametrize("branch_and_bound,vectorized_levels", [(False, 0), (True, 0), (True, 2)])
+def test_order_finder_top_k(f_random_offers, k, branch_and_bound, vectorized_levels):
+    encoded = [[(x.price, frozenset(x.sellers)) for x in y] for y in f_random_offers.values()]
+    all_totals = sorted(round(sum(x[0] for x in combination) +
+                              sum(x.shipping for x in frozenset().union(*[x[1] for x in combination])), 2)
+                        for combination in itertools.product(*encoded))
+    finder = OrderFinder(f_random_offers, branch_and_bound=branch_and_bound, vectorized_levels=vectorized_levels)
+    results = finder.find_lowest_offers(k, 2)
+    assert [x.sum() for x in results] == all_totals[:k]
+    assert len(set(frozenset(id(y) for y in x.offer_sets) for x in results)) == k
+
+
+@pytest.mark.parametrize("card_order", list(CardOrder))
+@pytest.mark.parametrize("set_order", list(SetOrder))
+@pytest.mark.parametrize("greedy_start", [False, True])
+def test_order_finder_search_order(f_random_offers, card_order, set_order, greedy_start):
+    expected = SellerSubsetFinder(f_random_offers).find_lowest_offer()
+    finder = OrderFinder(f_random_offers, branch_and_bound=True, card_order=card_order, set_order=set_order,
+                         greedy_start=greedy_start)
+    result = finder.find_lowest_offer(2)
+    assert result.sum() == expected.sum()
+    assert finder.performed_checks + finder.skipped_checks == finder.total_checks
+
+
+def test_order_finder_marginal_price_prunes_more(f_random_offers):
+    by_price = OrderFinder(f_random_offers, branch_and_bound=True, set_order=SetOrder.Price)
+    by_price.find_lowest_offer(1)
+    by_marginal_price = OrderFinder(f_random_offers, branch_and_bound=True, set_order=SetOrder.MarginalPrice,
+                                    greedy_start=True)
+    by_marginal_price.find_lowest_offer(1)
+    assert by_marginal_price.nodes_visited < by_price.nodes_visited
+
+
+def _lowest_total_with_sellers(all_offers, max_sellers):
+    encoded = [[(x.price, frozenset(x.sellers)) for x in y] for y in all_offers.values()]
+    totals = []
+    for combination in itertools.product(*encoded):
+        sellers = frozenset().union(*[x[1] for x in combination])
+        if len(sellers) <= max_sellers:
+            totals.append(round(sum(x[0] for x in combination) + sum(x.shipping for x in sellers), 2))
+    return min(totals, default=None)
+
+
+@pytest.mark.parametrize("max_sellers", [3, 4, 6])
+@pytest.mark.parametrize("branch_and_bound,vectorized_levels,set_order",
+                         [(False, 0, SetOrder.Price), (True, 0, SetOrder.MarginalPrice), (True, 2, SetOrder.Price)])
+def test_order_finder_max_sellers(f_random_offers, max_sellers, branch_and_bound, vectorized_levels, set_order):
+    finder = OrderFinder(f_random_offers, branch_and_bound=branch_and_bound, vectorized_levels=vectorized_levels,
+                         set_order=set_order, greedy_start=True, max_sellers=max_sellers)
+    result = finder.find_lowest_offer(2)
+    assert len(result.sellers) <= max_sellers
+    assert result.sum() == _lowest_total_with_sellers(f_random_offers, max_sellers)
+
+
+def test_order_finder_max_sellers_impossible(f_random_offers):
+    assert _lowest_total_with_sellers(f_random_offers, 1) is None
+    finder = OrderFinder(f_random_offers, branch_and_bound=True, max_sellers=1)
+    with pytest.raises(NoCombinationError):
+        finder.find_lowest_offer(1)
+    assert finder.find_lowest_offers(3, 1) == []
+
+
+@pytest.mark.parametrize("filtered", [False, True])
+def test_order_finder_max_sellers_keeps_expensive_offers(filtered):
+    card1 = Card("expansion", "card-1")
+    card2 = Card("expansion", "card-2")
+    offers = {
+        card1: [Offer(card1, seller1, 1, 1.00, "expansion")],
+        card2: [Offer(card2, seller1, 1, 5.00, "expansion"),
+                Offer(card2, seller2, 1, 0.50, "expansion")]
+    }
+    if filtered:
+        offers = SellerDominanceFilter(OfferFilter(offers, max_sellers=1).data).data
+    # Without a limit the offer of seller-1 for card-2 is too expensive to ever be part of the cheapest combination
+    all_offers = OfferSetTransformer(offers, max_sellers=1).data
+    result = OrderFinder(all_offers, branch_and_bound=True, greedy_start=True, max_sellers=1).find_lowest_offer(1)
+    assert result.sellers == (seller1,)
+    assert result.sum() == 7.15
+
+
+def _random_multi_offers(seed: int) -> dict[Card, list[OfferSet]]:
+    rng = random.Random(seed)
+    sellers = [Seller(f"seller-{i}", rng.choice([1.15, 1.40, 2.00])) for i in range(5)]
+    offers = {}
+    for i in range(4):
+        card = Card("expansion", f"card-{i}", rng.randint(1, 3))
+        # A seller may have several offers for the same card, so a set can hold more than one offer of a seller
+        offers[card] = [Offer(card, rng.choice(sellers), rng.randint(1, 2), round(rng.uniform(0.1, 3.0), 2),
+                              f"expansion-{j}") for j in range(5)]
+    return OfferSetTransformer(offers).data
+
+
+@pytest.mark.parametrize("seed", [18, 62, 125, 139, 144, 179, 270, 295])
+def test_order_finder_marginal_price_same_seller(seed):
+    all_offers = _random_multi_offers(seed)
+    assert any(len(x.sellers) > len(x.seller_set) for y in all_offers.values() for x in y)
+    expected = _lowest_total_with_sellers(all_offers, math.inf)
+    result = OrderFinder(all_offers, branch_and_bound=True, set_order=SetOrder.MarginalPrice,
+                         greedy_start=True).find_lowest_offer(1)
+    assert result.sum() == expected
+
+
+def test_order_finder_max_sellers_same_seller():
+    card = Card("expansion", "card", 2)
+    offers = {card: [Offer(card, seller1, 1, 0.50, "expansion-1"), Offer(card, seller1, 1, 0.60, "expansion-2")]}
+    # Both copies come from one seller, even though the set holds two offers
+    result = OrderFinder(OfferSetTransformer(offers).data, max_sellers=1).find_lowest_offer(1)
+    assert result.sum() == round(1.10 + 1.15, 2)
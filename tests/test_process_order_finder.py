@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from conftest import card1, card2, card3, seller3, seller6
+from offer import Offer
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from order_finder import OrderFinder
+import process_order_finder
+from process_order_finder import ProcessOrderFinder, SearchWorkerError
+
+
+@pytest.mark.parametrize("process_count", [0, 1, 2, 4])
+def test_process_order_finder(f_all_offers, process_count):
+    finder = ProcessOrderFinder(f_all_offers)
+    result = finder.find_lowest_offer(process_count)
+    assert result == OfferCollection([
+        OfferSet([Offer(card1, seller3, 2, 0.30, "expansion-1")]),
+        OfferSet([Offer(card2, seller6, 1, 0.48, "expansion-1")]),
+        OfferSet([Offer(card3, seller6, 1, 0.55, "expansion-1")])
+    ])
+    assert finder.performed_checks + finder.skipped_checks == finder.total_checks
+
+
+@pytest.mark.parametrize("process_count", [1, 3])
+def test_process_order_finder_matches_exhaustive(f_random_offers, process_count):
+    expected = OrderFinder(f_random_offers).find_lowest_offer(1)
+    finder = ProcessOrderFinder(f_random_offers)
+    result = finder.find_lowest_offer(process_count)
+    assert result.sum() == expected.sum()
+    assert finder.performed_checks + finder.skipped_checks == finder.total_checks
+
+
+def test_process_order_finder_max_sellers(f_random_offers):
+    expected = OrderFinder(f_random_offers, branch_and_bound=True, max_sellers=4).find_lowest_offer(1)
+    result = ProcessOrderFinder(f_random_offers, max_sellers=4).find_lowest_offer(2)
+    assert len(result.sellers) <= 4
+    assert result.sum() == expected.sum()
+
+
+def _crash(*args):
+    os._exit(3)
+
+
+def test_process_order_finder_worker_crash(f_all_offers, monkeypatch):
+    monkeypatch.setattr(process_order_finder, "_run_worker", _crash)
+    monkeypatch.setattr(process_order_finder, "_result_timeout", 0.05)
+    with pytest.raises(SearchWorkerError):
+        ProcessOrderFinder(f_all_offers).find_lowest_offer(2)
+
+
+def test_process_order_finder_default_process_count(f_all_offers):
+    expected = OrderFinder(f_all_offers).find_lowest_offer(1)
+    assert ProcessOrderFinder(f_all_offers).find_lowest_offer().sum() == expected.sum()
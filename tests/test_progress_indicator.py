@@ -0,0 +1,19 @@
+from utils.progress_indicator import ProgressIndicator
+
+
+def test_progress_indicator_update():
+    values = {"current": 0, "nodes": 0}
+    indicator = ProgressIndicator(1000, lambda: values["current"], lambda: values["nodes"], lambda: 0)
+    assert indicator.update(0.0) is None
+
+    values["current"] = 100
+    values["nodes"] = 50
+    assert indicator.update(1.0) == 9.0
+    assert indicator.node_rate == 50.0
+
+    # A jump in progress only moves the smoothed estimate partially
+    values["current"] = 600
+    values["nodes"] = 100
+    remaining = indicator.update(2.0)
+    assert round(remaining, 4) == round(400 / (0.1 * 500 + 0.9 * 100), 4)
+    assert indicator.node_rate == 50.0
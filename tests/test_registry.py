@@ -0,0 +1,62 @@
+from card import Card
+from cardmarket_loader import CardmarketLoader
+from offer import Offer
+from registry import Registry
+from seller import Seller
+from settings_loader import SearchSettings
+
+_row = ("<div id=\"articleRow{}\" class=\"row article-row\"><a href=\"/de/Magic/Users/{}\">{}</a>"
+        "<div><span class=\"item-count small text-right\">{}</span></div>"
+        "<span class=\"price\">{} €</span></div>")
+
+
+def test_registry_interns():
+    registry = Registry()
+    card = registry.card(Card("expansion", "card", 2))
+    assert registry.card(Card("expansion", "card", 2)) is card
+    seller = registry.seller("seller", 1.15)
+    assert registry.seller("seller", 1.15) is seller
+    assert registry.seller("other", 1.15).registry_id == 1
+    offer = registry.offer(Card("expansion", "card", 2), seller, 1, 0.5, "expansion")
+    assert offer.card is card
+    assert registry.offer(card, seller, 1, 0.5, "expansion") is offer
+    assert [x.registry_id for x in registry.offers] == [0]
+    assert registry.sellers[seller.registry_id] is seller
+
+
+def test_registry_parse_offers():
+    html = "".join([_row.format(1, "seller1", "seller1", 1, "0,50"),
+                    _row.format(2, "seller2", "seller2", 3, "1,20"),
+                    _row.format(3, "seller1", "seller1", 2, "0,70")])
+    loader = CardmarketLoader(SearchSettings())
+    offers = loader._parse_offers(html, Card("expansion", "card"), "expansion")
+    assert [x.price for x in offers] == [0.5, 1.2, 0.7]
+    assert offers[0].seller is offers[2].seller
+    assert [x.registry_id for x in offers] == [0, 1, 2]
+    assert [x.registry_id for x in loader.registry.sellers] == [0, 1]
+    assert offers[0].card is loader.registry.cards[0]
+
+
+def test_registry_foreign_card():
+    other_registry = Registry()
+    other_registry.card(Card("expansion", "card-1"))
+    card = other_registry.card(Card("expansion", "card-2"))
+    registry = Registry()
+    interned = registry.card(card)
+    assert interned == card and interned.registry_id == 0
+    assert registry.card(Card("expansion", "card-2")) is interned
+    assert registry.card_id(card) == 0
+    assert registry.card_id(interned) == 0
+
+
+def test_registry_ids():
+    registry = Registry()
+    seller = Seller("seller", 1.15)
+    assert registry.seller_id(seller) == 0
+    assert registry.seller_id(registry.seller("other", 1.15)) == 1
+    assert registry.seller_id(Seller("seller", 1.15)) == 0
+    offer = Offer(Card("expansion", "card"), seller, 1, 0.5, "expansion")
+    assert registry.offer_id(offer) == 0
+    assert registry.offers[0].seller is registry.sellers[0]
+    assert registry.offer_id(registry.offers[0]) == 0
+    assert len(registry.cards) == 1
@@ -0,0 +1,115 @@
+import email.utils
+import math
+import random
+import threading
+import time
+
+import pytest
+
+from request_scheduler import RequestScheduler
+
+
+def test_parse_retry_after():
+    assert RequestScheduler.parse_retry_after("3") == 3.0
+    assert RequestScheduler.parse_retry_after("-1") == 0.0
+    assert RequestScheduler.parse_retry_after(None) is None
+    assert RequestScheduler.parse_retry_after("soon") is None
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < RequestScheduler.parse_retry_after(date) <= 30
+    assert RequestScheduler.parse_retry_after(email.utils.formatdate(0, usegmt=True)) == 0.0
+
+
+def test_aimd():
+    scheduler = RequestScheduler(8, initial_rate=8)
+    scheduler.acquire("host")
+    scheduler.release("host", 200)
+    assert scheduler.rate("host") == 8.125
+    assert scheduler.concurrency("host") == 8
+
+    for _ in range(2):
+        scheduler.acquire("host")
+    scheduler.release("host", 429)
+    # Failures of requests sent at the same time count as a single overload
+    scheduler.release("host", 503)
+    assert scheduler.rate("host") == pytest.approx(4.0625)
+    assert scheduler.concurrency("host") == 4
+    assert (scheduler.requests, scheduler.throttled) == (3, 2)
+
+    # Client errors do not mean the host is overloaded
+    scheduler.acquire("host")
+    scheduler.release("host", 404)
+    assert scheduler.rate("host") > 4.0625
+    # Other hosts are not affected
+    assert scheduler.rate("other") == 8
+    assert scheduler.concurrency("other") == 8
+
+
+class _Clock:
+    """Monotonic clock that only advances when told to"""
+    now: float
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_concurrency_limit():
+    clock = _Clock()
+    scheduler = RequestScheduler(2, initial_rate=64, clock=clock)
+    scheduler.acquire("host")
+    scheduler.acquire("host")
+    # The window is full, so the next request has to wait for a release
+    assert scheduler.wait_time("host") == math.inf
+    # A different host has its own limit
+    assert scheduler.wait_time("other") == 0
+
+    thread = threading.Thread(target=scheduler.acquire, args=["host"])
+    thread.start()
+    clock.now += 1
+    scheduler.release("host", 200)
+    thread.join(10)
+    assert not thread.is_alive()
+    assert scheduler.requests == 3
+
+
+def test_token_bucket():
+    clock = _Clock()
+    scheduler = RequestScheduler(2, initial_rate=5, clock=clock)
+    # The bucket starts full with one token per concurrent request
+    for _ in range(2):
+        assert scheduler.wait_time("host") == 0
+        scheduler.acquire("host")
+        scheduler.release("host", 404)
+    assert scheduler.wait_time("host") == pytest.approx(1 / scheduler.rate("host"))
+    clock.now += 0.1
+    assert scheduler.wait_time("host") == pytest.approx(1 / scheduler.rate("host") - 0.1)
+    clock.now += 0.1
+    assert scheduler.wait_time("host") == 0
+    scheduler.acquire("host")
+    assert scheduler.requests == 3
+
+
+def test_retry_after_pauses_host():
+    clock = _Clock()
+    scheduler = RequestScheduler(2, initial_rate=64, clock=clock)
+    scheduler.acquire("host")
+    scheduler.release("host", 429, 0.3)
+    assert scheduler.wait_time("host") == pytest.approx(0.3)
+    clock.now += 0.3
+    assert scheduler.wait_time("host") == 0
+    scheduler.acquire("host")
+    # Overly long pauses are capped
+    scheduler.release("host", 429, 1000.0)
+    assert scheduler.wait_time("host") == pytest.approx(120.0)
+
+
+def test_retry_delay():
+    scheduler = RequestScheduler(2, rng=random.Random(3))
+    delays = [scheduler.retry_delay(x) for x in range(20)]
+    assert all(0 <= x <= 30 for x in delays)
+    assert max(delays[:2]) <= 1
+    assert scheduler.retries == 20
+    assert scheduler.retry_delay(0, 2.0) == 2.0
+    assert scheduler.retry_delay(0, 1000.0) == 120.0
@@ -0,0 +1,92 @@
+import json
+import os
+
+from response_cache import ResponseCache, CachedResponse
+
+
+def test_store_and_get(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get("http://host/page", {"language": "1"}) is None
+    cache.store("http://host/page", {"language": "1"}, CachedResponse("body", "\"v1\"", "yesterday"))
+
+    response = cache.get("http://host/page", {"language": "1"})
+    assert response.text == "body"
+    assert cache.is_fresh(response)
+    assert response.validators() == {"If-None-Match": "\"v1\"", "If-Modified-Since": "yesterday"}
+    # The parameters are part of the key, independent of their order
+    assert cache.get("http://host/page", {"language": "2"}) is None
+    assert cache.get("http://host/page", {}) is None
+    cache.store("http://host/page", {"a": "1", "b": "2"}, CachedResponse("other"))
+    assert cache.get("http://host/page", {"b": "2", "a": "1"}).text == "other"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_persisted(tmp_path):
+    ResponseCache(str(tmp_path)).store("http://host/page", {}, CachedResponse("body"))
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get("http://host/page", {}).text == "body"
+    assert cache.size > 0
+
+
+def test_stale_and_revalidated(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age=60)
+    cache.store("http://host/page", {}, CachedResponse("body", validated=0.0))
+    response = cache.get("http://host/page", {})
+    assert response.text == "body"
+    assert not cache.is_fresh(response)
+    assert cache.hits == 0
+
+    cache.revalidated("http://host/page", {}, response)
+    assert cache.revalidations == 1
+    assert cache.is_fresh(ResponseCache(str(tmp_path), max_age=60).get("http://host/page", {}))
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("http://host/page0", {}, CachedResponse("x" * 1000))
+    entry_size = cache.size
+    cache = ResponseCache(str(tmp_path), max_size=3 * entry_size + 10)
+    for i in range(1, 3):
+        cache.store(f"http://host/page{i}", {}, CachedResponse("x" * 1000))
+    # Using the oldest page makes the second one the least recently used
+    assert cache.get("http://host/page0", {}) is not None
+    cache.store("http://host/page3", {}, CachedResponse("x" * 1000))
+
+    assert cache.size == sum([os.path.getsize(os.path.join(tmp_path, x)) for x in os.listdir(tmp_path)])
+    assert len(os.listdir(tmp_path)) == 3
+    assert cache.get("http://host/page1", {}) is None
+    for i in [0, 2, 3]:
+        assert cache.get(f"http://host/page{i}", {}) is not None
+
+
+def test_oversized_page_is_kept(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size=10)
+    cache.store("http://host/page0", {}, CachedResponse("small"))
+    cache.store("http://host/page1", {}, CachedResponse("x" * 1000))
+    assert cache.get("http://host/page0", {}) is None
+    assert cache.get("http://host/page1", {}) is not None
+
+
+def test_unreadable_file_is_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("http://host/page", {}, CachedResponse("body"))
+    name = os.listdir(tmp_path)[0]
+    with open(os.path.join(tmp_path, name), "w") as file_p:
+        json.dump({"text": "body"}, file_p)
+    assert cache.get("http://host/page", {}) is None
+    assert os.listdir(tmp_path) == []
+    assert cache.size == 0
+
+
+def test_get_reads_without_lock(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+    cache.store("http://host/page", {}, CachedResponse("body"))
+    load = json.load
+
+    def unlocked_load(file_p):
+        assert not cache._lock.locked()
+        return load(file_p)
+
+    monkeypatch.setattr(json, "load", unlocked_load)
+    assert cache.get("http://host/page", {}).text == "body"
+    assert cache.hits == 1
@@ -0,0 +1,33 @@
+import threading
+
+from search_counters import SearchCounters
+
+
+def test_search_counters_threads():
+    counters = SearchCounters(2)
+
+    def count():
+        for _ in range(10000):
+            counters.add(0)
+        counters.add(1, 5)
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counters.get(0) == 40000
+    assert counters.get(1) == 20
+
+
+def test_search_counters_set():
+    counters = SearchCounters(1)
+    thread = threading.Thread(target=counters.add, args=[0, 3])
+    thread.start()
+    thread.join()
+    counters.add(0, 2)
+    assert counters.get(0) == 5
+
+    counters.set(0, 7)
+    assert counters.get(0) == 7
@@ -0,0 +1,45 @@
+from card import Card
+from offer import Offer
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from search_state import SearchState
+from seller import Seller
+
+seller1 = Seller("seller1", 1.40)
+seller2 = Seller("seller2", 1.15)
+
+_set1 = OfferSet([Offer(Card("expansion1", "card1"), seller1, 1, 0.1, "expansion1")])
+_set2 = OfferSet([Offer(Card("expansion2", "card2"), seller2, 1, 0.2, "expansion2")])
+_set3 = OfferSet([Offer(Card("expansion3", "card3"), seller2, 1, 0.3, "expansion3")])
+
+
+def test_search_state_push_pop():
+    state = SearchState()
+    assert state.sum() == 0
+
+    state.push(_set1)
+    state.push(_set2)
+    state.push(_set3)
+    assert len(state) == 3
+    assert state.seller_count == 2
+    assert round(state.sum(), 4) == round(0.1 + 0.2 + 0.3 + 1.40 + 1.15, 4)
+
+    assert state.pop() == _set3
+    assert state.seller_count == 2
+    assert round(state.sum(), 4) == round(0.1 + 0.2 + 1.40 + 1.15, 4)
+
+    assert state.pop() == _set2
+    assert state.seller_count == 1
+    assert round(state.sum(), 4) == round(0.1 + 1.40, 4)
+
+
+def test_search_state_to_collection():
+    state = SearchState()
+    state.push(_set1)
+    state.push(_set2)
+    collection = state.to_collection()
+    assert collection == OfferCollection([_set1, _set2])
+    assert collection.sum() == round(state.sum(), 2)
+
+    state.pop()
+    assert len(collection.offer_sets) == 2
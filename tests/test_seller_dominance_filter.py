@@ -0,0 +1,71 @@
+import random
+
+from card import Card
+from offer import Offer
+from offer_set_transformer import OfferSetTransformer
+from registry import Registry
+from seller import Seller
+from seller_dominance_filter import SellerDominanceFilter
+from seller_subset_finder import SellerSubsetFinder
+
+_card1 = Card("expansion", "card1", 1)
+_card2 = Card("expansion", "card2", 2)
+_seller1 = Seller("seller-1", 1.15)
+_seller2 = Seller("seller-2", 1.15)
+_seller3 = Seller("seller-3", 1.15)
+_seller4 = Seller("seller-4", 1.00)
+
+
+def test_seller_dominance_filter():
+    offers = {
+        _card1: [Offer(_card1, _seller1, 1, 0.20, "expansion"),
+                 Offer(_card1, _seller2, 1, 0.30, "expansion"),
+                 Offer(_card1, _seller3, 1, 0.10, "expansion")],
+        _card2: [Offer(_card2, _seller1, 2, 0.50, "expansion"),
+                 Offer(_card2, _seller2, 2, 0.50, "expansion"),
+                 Offer(_card2, _seller3, 1, 0.40, "expansion")]
+    }
+    dominance_filter = SellerDominanceFilter(offers)
+    # seller-1 beats seller-2 on every card, seller-3 can not cover both copies of card2
+    assert [x.seller for x in dominance_filter.data[_card1]] == [_seller1, _seller3]
+    assert [x.seller for x in dominance_filter.data[_card2]] == [_seller1, _seller3]
+    assert dominance_filter.removed_sellers == 1
+    assert dominance_filter.removed_offers == 2
+
+
+def test_seller_dominance_filter_equal_sellers():
+    offers = {_card1: [Offer(_card1, _seller1, 1, 0.20, "expansion"),
+                       Offer(_card1, _seller2, 1, 0.20, "expansion"),
+                       Offer(_card1, _seller4, 1, 0.20, "expansion")]}
+    # seller-1 and seller-2 are equal, but seller-4 has lower shipping
+    assert [x.seller for x in SellerDominanceFilter(offers).data[_card1]] == [_seller4]
+    offers = {_card1: offers[_card1][:2]}
+    assert [x.seller for x in SellerDominanceFilter(offers).data[_card1]] == [_seller1]
+
+
+def test_seller_dominance_filter_registry():
+    registry = Registry()
+    seller2 = registry.seller(_seller2.name, _seller2.shipping)
+    seller1 = registry.seller(_seller1.name, _seller1.shipping)
+    offers = {_card1: [registry.offer(_card1, seller1, 1, 0.20, "expansion"),
+                       registry.offer(_card1, seller2, 1, 0.20, "expansion"),
+                       Offer(_card1, _seller3, 1, 0.30, "expansion")]}
+    # The seller appearing first is kept, independent of the order of the registry ids
+    dominance_filter = SellerDominanceFilter(offers, registry)
+    assert [x.seller for x in dominance_filter.data[_card1]] == [seller1]
+    assert len(registry.sellers) == 3
+
+
+def test_seller_dominance_filter_keeps_optimum():
+    rng = random.Random(7)
+    for _ in range(20):
+        sellers = [Seller(f"seller-{i}", rng.choice([1.15, 1.40])) for i in range(10)]
+        offers = {}
+        for i in range(5):
+            card = Card("expansion", f"card-{i}", rng.choice([1, 2]))
+            offers[card] = [Offer(card, seller, rng.randint(1, 2), round(rng.uniform(0.1, 1.0), 1), "expansion")
+                            for seller in rng.sample(sellers, 6)]
+        dominance_filter = SellerDominanceFilter(offers)
+        expected = SellerSubsetFinder(OfferSetTransformer(offers).data).find_lowest_offer()
+        result = SellerSubsetFinder(OfferSetTransformer(dominance_filter.data).data).find_lowest_offer()
+        assert result.sum() == expected.sum()
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from card import Card
+from conftest import card1, card2, card3, seller3, seller6
+from offer import Offer
+from offer_collection import OfferCollection
+from offer_set import OfferSet
+from offer_set_transformer import OfferSetTransformer
+from order_finder import OrderFinder
+from seller import Seller
+from seller_subset_finder import SellerSubsetFinder
+
+
+def test_seller_subset_finder(f_all_offers):
+    finder = SellerSubsetFinder(f_all_offers)
+    assert finder.seller_count == 8
+    result = finder.find_lowest_offer()
+    assert result == OfferCollection([
+        OfferSet([Offer(card1, seller3, 2, 0.30, "expansion-1")]),
+        OfferSet([Offer(card2, seller6, 1, 0.48, "expansion-1")]),
+        OfferSet([Offer(card3, seller6, 1, 0.55, "expansion-1")])
+    ])
+
+
+def test_seller_subset_finder_matches_exhaustive(f_random_offers):
+    expected = OrderFinder(f_random_offers).find_lowest_offer(1)
+    finder = SellerSubsetFinder(f_random_offers)
+    result = finder.find_lowest_offer()
+    assert result.sum() == expected.sum()
+    assert len(result.offer_sets) == len(f_random_offers)
+    assert finder.states_checked < OrderFinder(f_random_offers).total_checks
+
+
+def _random_offers(seed: int) -> dict[Card, list[OfferSet]]:
+    rng = random.Random(seed)
+    sellers = [Seller(f"seller-{i}", rng.choice([1.15, 1.40, 2.00, 4.50])) for i in range(rng.randint(3, 7))]
+    offers = {}
+    for i in range(rng.randint(2, 5)):
+        card = Card("expansion", f"card-{i}", rng.randint(1, 3))
+        offers[card] = [Offer(card, seller, rng.randint(1, 3), round(rng.uniform(0.1, 3.0), 2), "expansion")
+                        for seller in rng.sample(sellers, rng.randint(2, len(sellers)))]
+    return OfferSetTransformer(offers).data
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_seller_subset_finder_random(seed):
+    offers = _random_offers(seed)
+    expected = OrderFinder(offers, branch_and_bound=True).find_lowest_offer(1)
+    finder = SellerSubsetFinder(offers)
+    assert finder._greedy_bound() >= expected.sum() - 0.005
+    assert finder.find_lowest_offer().sum() == expected.sum()
+
+
+def test_greedy_bound():
+    card1 = Card("expansion", "card-1")
+    card2 = Card("expansion", "card-2")
+    seller1 = Seller("seller-1", 1.0)
+    seller2 = Seller("seller-2", 1.0)
+    offers = OfferSetTransformer({
+        card1: [Offer(card1, seller1, 1, 0.5, "expansion"), Offer(card1, seller2, 1, 0.6, "expansion")],
+        card2: [Offer(card2, seller1, 1, 2.0, "expansion"), Offer(card2, seller2, 1, 1.2, "expansion")]
+    }).data
+    finder = SellerSubsetFinder(offers)
+    # seller-1 for the first card, then seller-2 costs 1.2 + 1.0 shipping, more than 2.0 from seller-1
+    assert finder._greedy_bound() == pytest.approx(3.5)
+    # Buying everything from seller-2 is cheaper
+    assert finder.find_lowest_offer().sum() == 2.8
+
+
+def test_remove_dominated():
+    card = Card("expansion", "card")
+    sellers = [Seller("seller-a", 1.0), Seller("seller-b", 1.0), Seller("seller-c", 1.0)]
+    finder = SellerSubsetFinder({card: [OfferSet([Offer(card, x, 1, 0.5, "expansion")]) for x in sellers]})
+    a, b, c = 1, 2, 4
+    states = {a: (1.0, None, 0), b: (2.5, None, 1), c: (1.8, None, 2), a | b: (1.5, None, 0)}
+    # b stays more expensive than a with the shipping of a, a | b contains all sellers of a,
+    # while c is cheaper than a as long as the shipping of a is not paid
+    assert sorted(finder._remove_dominated(states)) == [a, c]
@@ -2,6 +2,7 @@ import pytest
 
 from card import Card
 from offer import Offer
+from offer_set import OfferSet
 from seller import Seller
 from set_creator import OfferSetCreator
 
@@ -14,18 +15,60 @@ def f_card():
 @pytest.fixture
 def f_offers(f_card):
     return [
-        Offer(f_card, Seller("seller1", 1.15), 1, .10),
-        Offer(f_card, Seller("seller2", 1.15), 1, .10),
-        Offer(f_card, Seller("seller3", 1.15), 1, .30),
-        Offer(f_card, Seller("seller4", 1.15), 1, .20),
-        Offer(f_card, Seller("seller5", 1.15), 2, .32),
-        Offer(f_card, Seller("seller6", 1.15), 2, .12),
-        Offer(f_card, Seller("seller7", 1.15), 3, .17),
-        Offer(f_card, Seller("seller8", 1.15), 4, .10),
-        Offer(f_card, Seller("seller9", 1.15), 5, .12)
+        Offer(f_card, Seller("seller1", 1.15), 1, .10, "expansion"),
+        Offer(f_card, Seller("seller2", 1.15), 1, .10, "expansion"),
+        Offer(f_card, Seller("seller3", 1.15), 1, .30, "expansion"),
+        Offer(f_card, Seller("seller4", 1.15), 1, .20, "expansion"),
+        Offer(f_card, Seller("seller5", 1.15), 2, .32, "expansion"),
+        Offer(f_card, Seller("seller6", 1.15), 2, .12, "expansion"),
+        Offer(f_card, Seller("seller7", 1.15), 3, .17, "expansion"),
+        Offer(f_card, Seller("seller8", 1.15), 4, .10, "expansion"),
+        Offer(f_card, Seller("seller9", 1.15), 5, .12, "expansion")
     ]
 
 
+def _create_sets_by_permutation(offers: list[Offer]) -> list[OfferSet]:
+    sets = []
+
+    def create_set(elem: OfferSet):
+        if elem.cards_available >= elem.card.amount:
+            if elem not in sets:
+                sets.append(elem)
+            return
+        for offer in [x for x in offers if x not in elem.offers]:
+            create_set(OfferSet(list(elem.offers) + [offer]))
+
+    for offer in offers:
+        create_set(OfferSet([offer]))
+    return sets
+
+
 def test_set_creator(f_offers):
     creator = OfferSetCreator(f_offers)
     assert len(creator.sets) > 0
+    for offer_set in creator.sets:
+        assert offer_set.cards_available >= 4
+
+
+def test_set_creator_matches_permutations(f_offers):
+    expected = _create_sets_by_permutation(f_offers[-5:])
+    sets = OfferSetCreator(f_offers[-5:]).sets
+    assert len(sets) == len(expected)
+    for offer_set in sets:
+        assert offer_set in expected
+
+
+def test_set_creator_no_doubles(f_offers, f_card):
+    sets = OfferSetCreator(f_offers + [Offer(f_card, Seller("seller1", 1.15), 1, .10, "expansion")]).sets
+    keys = [frozenset(x.offers) for x in sets]
+    assert len(keys) == len(set(keys))
+    assert len(sets) == len(OfferSetCreator(f_offers).sets)
+
+
+def test_set_creator_sets_by_price(f_offers):
+    sets = list(OfferSetCreator(f_offers).sets_by_price())
+    expected = OfferSetCreator(f_offers).sets
+    assert len(sets) == len(expected)
+    for offer_set in sets:
+        assert offer_set in expected
+    assert [x.price for x in sets] == sorted([x.price for x in sets])
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from card import Card
+from offer import Offer
+from registry import Registry
+from seller import Seller
+from snapshot_store import SnapshotStore, SnapshotError
+
+
+@pytest.fixture()
+def f_offers() -> dict[Card, list[Offer]]:
+    sellers = [Seller("seller1", 1.15), Seller("seller2", 2.0)]
+    card1 = Card(["exp1", "exp2"], "card1", 2)
+    card2 = Card("exp1", "card2")
+    return {
+        card1: [Offer(card1, sellers[0], 1, 0.5, "exp1"), Offer(card1, sellers[1], 3, 0.7, "exp2")],
+        card2: [Offer(card2, sellers[1], 1, 1.5, "exp1")],
+        Card("exp3", "card3"): []
+    }
+
+
+def _as_tuples(data: dict[Card, list[Offer]]) -> list:
+    return [(card.name, card.expansions, card.amount,
+             [(x.seller.name, x.seller.shipping, x.amount, x.price, x.expansion) for x in offers])
+            for card, offers in data.items()]
+
+
+def test_save_and_load(tmp_path, f_offers):
+    file = str(tmp_path / "snapshots.db")
+    with SnapshotStore(file) as store:
+        assert store.save(f_offers, created=10.0) == 1
+    registry = Registry()
+    with SnapshotStore(file, read_only=True) as store:
+        data = store.load(registry=registry)
+        assert store.snapshots() == [(1, 10.0, 3)]
+    assert _as_tuples(data) == _as_tuples(f_offers)
+    # The loaded objects are interned
+    card1 = list(data)[0]
+    assert all(x.card is card1 for x in data[card1])
+    assert data[list(data)[1]][0].seller is data[card1][1].seller
+    assert len(registry.sellers) == 2
+
+
+def test_newest_snapshot(tmp_path, f_offers):
+    file = str(tmp_path / "snapshots.db")
+    with SnapshotStore(file) as store:
+        store.save(f_offers, created=20.0)
+        store.save({Card("exp1", "card1"): []}, created=10.0)
+        store.save({Card("exp1", "card4"): []}, created=30.0)
+        assert [x.name for x in store.load()] == ["card4"]
+        assert [x.name for x in store.load(2)] == ["card1"]
+        assert len(store.load(1)) == 3
+        assert [x for x, _, _ in store.snapshots()] == [2, 1, 3]
+
+
+def test_errors(tmp_path):
+    file = str(tmp_path / "snapshots.db")
+    with pytest.raises(SnapshotError):
+        SnapshotStore(file, read_only=True)
+    with SnapshotStore(file) as store:
+        with pytest.raises(SnapshotError):
+            store.load()
+        store.save({})
+        with pytest.raises(SnapshotError):
+            store.load(5)
+    with SnapshotStore(file, read_only=True) as store:
+        with pytest.raises(SnapshotError):
+            store.save({})
+        assert len(store.snapshots()) == 1
+
+
+def test_concurrent_readers(tmp_path, f_offers):
+    file = str(tmp_path / "snapshots.db")
+    writer = SnapshotStore(file)
+    writer.save(f_offers)
+    expected = _as_tuples(f_offers)
+    errors = []
+
+    def read():
+        try:
+            with SnapshotStore(file, read_only=True) as store:
+                for _ in range(20):
+                    assert _as_tuples(store.load(1)) == expected
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # Writing does not block the readers
+    for _ in range(20):
+        writer.save(f_offers)
+    for thread in threads:
+        thread.join()
+    writer.close()
+    assert errors == []
@@ -0,0 +1,89 @@
+import datetime
+import time
+from typing import Callable, Optional
+
+from utils.loading_indicator import LoadingIndicator
+
+# Weight of the newest measurement in the moving averages of the rates
+_smoothing = 0.1
+
+
+class ProgressIndicator(LoadingIndicator):
+    """
+    Shows the progress of a search together with the nodes searched per second, the pruned subtrees and
+    an estimate of the remaining time. The rates are exponential moving averages, so the estimate does not
+    jump whenever a large subtree gets pruned.
+    """
+    _max_value: int
+    _current_value: Callable[[], int]
+    _nodes: Callable[[], int]
+    _pruned: Callable[[], int]
+    _precision: int
+    _message: str
+
+    _last_time: Optional[float]
+    _last_value: int
+    _last_nodes: int
+    _value_rate: Optional[float]
+    _node_rate: Optional[float]
+
+    def __init__(self, max_value: int, current_value: Callable[[], int], nodes: Callable[[], int],
+                 pruned: Callable[[], int], precision: int = 0, message: str = ""):
+        super().__init__(message)
+        self._max_value = max_value
+        self._current_value = current_value
+        self._nodes = nodes
+        self._pruned = pruned
+        self._precision = precision
+        self._message = " " + message.strip()
+        self._last_time = None
+        self._last_value = 0
+        self._last_nodes = 0
+        self._value_rate = None
+        self._node_rate = None
+
+    @property
+    def node_rate(self) -> float:
+        """Smoothed amount of search nodes per second"""
+        return self._node_rate or 0.0
+
+    @staticmethod
+    def _smooth(average: Optional[float], value: float) -> float:
+        if average is None:
+            return value
+        return _smoothing * value + (1 - _smoothing) * average
+
+    def update(self, now: float) -> Optional[float]:
+        """
+        Updates the rates with the current values
+
+        :param now: Monotonic time of the measurement in seconds
+        :return: The estimated remaining seconds, None if there is no estimate yet
+        """
+        value = self._current_value()
+        nodes = self._nodes()
+        if self._last_time is not None and now > self._last_time:
+            elapsed = now - self._last_time
+            self._value_rate = self._smooth(self._value_rate, (value - self._last_value) / elapsed)
+            self._node_rate = self._smooth(self._node_rate, (nodes - self._last_nodes) / elapsed)
+        self._last_time = now
+        self._last_value = value
+        self._last_nodes = nodes
+
+        if not self._value_rate:
+            return None
+        return max(0.0, (self._max_value - value) / self._value_rate)
+
+    @staticmethod
+    def _format_rate(rate: float) -> str:
+        for limit, suffix in [(1e9, "G"), (1e6, "M"), (1e3, "k")]:
+            if rate >= limit:
+                return f"{rate / limit:.1f}{suffix}"
+        return f"{rate:.0f}"
+
+    def _thread_method(self) -> None:
+        remaining = self.update(time.monotonic())
+        percent = round(self._last_value / self._max_value * 100, self._precision)
+        eta = "--:--:--" if remaining is None else str(datetime.timedelta(seconds=int(remaining)))
+        print(f"[{percent}%] {self._format_rate(self.node_rate)} nodes/s, {self._pruned()} pruned, ETA {eta}"
+              f"{self._format_message()}{' ' * 20}", end="\r")